@@ -1,14 +1,26 @@
-from typing import List, Any, Dict
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Any, Dict, Iterator, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from uuid import UUID
-from crud import network, content
+from crud import network, content, change, data_version
+from crud.data_version import NETWORKS_SCOPE, contents_scope
 from schemas.network import Network, NetworkUpdate
 from schemas.content import Content, ContentCreate
 from core.firebase import get_current_user
 from core.vector_store import get_vector_store
-from database.db import get_db
+from database.db import session_for_user
+from database.deps import get_db
+from core.metrics import VECTOR_STORE_ERRORS
+from core.name_index import get_name_index
+from core.plaintext_cache import get_plaintext_cache, decrypt_content
+from core.streaming import stream_json_array
+from core.etag import make_etag, etag_matches, cache_headers, not_modified
+from services.llm import with_timestamp
+from services.profile import refresh_profile
+from utils.temporal import to_timestamp
+from config import TRANSFER_BATCH_SIZE
 import logging
 
 router = APIRouter()
@@ -27,28 +39,79 @@ class ContentUpdate(BaseModel):
     content: str
 
 
+def _network_rows(user_id: str) -> Iterator[dict]:
+    """
+    Yield a user's networks as plain dicts, with names served from the index
+    so only new or renamed rows are decrypted. Uses its own session because
+    the response body is produced after the request's dependencies close.
+    """
+    db = session_for_user(user_id)
+    try:
+        names = get_name_index()
+        for net in network.iter_by_user(db, user_id=user_id, batch_size=TRANSFER_BATCH_SIZE):
+            yield {
+                "name": names.resolve_one(user_id, net.nid, net.name),
+                "nid": net.nid,
+                "created_at": net.created_at,
+                "updated_at": net.updated_at
+            }
+    except Exception as e:
+        logger.error(f"Failed to stream networks for user {user_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def _content_rows(user_id: str, nid: UUID) -> Iterator[dict]:
+    """Yield a network's contents as plain dicts, decrypted through the plaintext cache."""
+    db = session_for_user(user_id)
+    try:
+        for cont in content.iter_by_network(
+                db, network_id=nid, user_id=user_id, batch_size=TRANSFER_BATCH_SIZE):
+            yield {
+                "content": decrypt_content(cont, user_id),
+                "cid": cont.cid,
+                "network_id": cont.network_id,
+                "created_at": cont.created_at,
+                "updated_at": cont.updated_at
+            }
+    except Exception as e:
+        logger.error(f"Failed to stream contents for network {nid}, user {user_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
 @router.get("/", response_model=List[Network])
 async def read_networks(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ) -> Any:
     """
-    Get all networks for the current user.
+    Get all networks for the current user, streamed as a JSON array.
+    Answers 304 when the client's ETag is current, without decrypting anything.
     """
     try:
-        networks = network.get_by_user(db, user_id=current_user["uid"])
-        # Decrypt network names before sending to client
-        for net in networks:
-            net.name = net.get_decrypted_name(current_user["uid"])
-        return networks
+        version = data_version.get_version(
+            db, user_id=current_user["uid"], scope=NETWORKS_SCOPE)
     except Exception as e:
-        logger.error(f"Failed to get networks for user {
+        logger.error(f"Failed to get networks version for user {
                      current_user['uid']}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Failed to get networks"
         )
 
+    etag = make_etag(current_user["uid"], NETWORKS_SCOPE, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return StreamingResponse(
+        stream_json_array(_network_rows(current_user["uid"])),
+        media_type="application/json",
+        headers=cache_headers(etag)
+    )
+
 
 @router.delete("/{nid}", response_model=Response)
 async def delete_network(
@@ -69,31 +132,17 @@ async def delete_network(
 
         # Delete from vector store first
         try:
-            vector_store = get_vector_store()
-
-            # Get all documents for this network
-            results = vector_store.vectorstore.get(
-                where={"network_id": str(nid)}
-            )
-            if results and results['ids']:
-                # Delete all documents for this network by their IDs
-                vector_store.vectorstore._collection.delete(
-                    ids=results['ids']
-                )
-                logger.info(f"Deleted {len(results['ids'])} documents for network {
-                            nid} from vector store")
-            else:
-                logger.info(f"No documents found for network {
-                            nid} in vector store")
-
+            await get_vector_store().adelete(nid)
         except Exception as e:
             logger.error(f"Failed to delete network {
                          nid} documents from vector store: {str(e)}")
+            VECTOR_STORE_ERRORS.inc(operation="delete_network")
             # Continue with SQL deletion even if vector store deletion fails
 
         # Delete network from SQL database
         # This will automatically delete all associated contents due to CASCADE delete
         network.remove(db, id=nid)
+        get_plaintext_cache().purge_network(current_user["uid"], nid)
         logger.info(f"Deleted network {
                     nid} and all its contents (CASCADE) from SQL database")
         return {"message": "Network and all its contents deleted successfully"}
@@ -140,10 +189,12 @@ async def read_network_contents(
     *,
     db: Session = Depends(get_db),
     nid: UUID,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ) -> Any:
     """
-    Get all contents for a network.
+    Get all contents for a network, streamed as a JSON array.
+    Answers 304 when the client's ETag is current, without decrypting anything.
     """
     try:
         db_network = network.get_user_network(
@@ -151,12 +202,18 @@ async def read_network_contents(
         if not db_network:
             raise HTTPException(status_code=404, detail="Network not found")
 
-        contents = content.get_by_network(
-            db, network_id=nid, user_id=current_user["uid"])
-        # Decrypt content before sending to client
-        for cont in contents:
-            cont.content = cont.get_decrypted_content(current_user["uid"])
-        return contents
+        scope = contents_scope(nid)
+        etag = make_etag(current_user["uid"], scope, data_version.get_version(
+            db, user_id=current_user["uid"], scope=scope))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        # Stream rows one at a time; decryption happens as the body is sent
+        return StreamingResponse(
+            stream_json_array(_content_rows(current_user["uid"], nid)),
+            media_type="application/json",
+            headers=cache_headers(etag)
+        )
     except Exception as e:
         logger.error(f"Failed to fetch contents for network {
                      nid}, user {current_user['uid']}: {str(e)}")
@@ -172,7 +229,8 @@ async def create_content(
     db: Session = Depends(get_db),
     nid: UUID,
     content_in: ContentCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    background_tasks: BackgroundTasks
 ) -> Any:
     """
     Create new content in network.
@@ -185,6 +243,10 @@ async def create_content(
 
         db_content = content.create_with_user(
             db, obj_in=content_in, user_id=current_user["uid"])
+        background_tasks.add_task(
+            refresh_profile, current_user["uid"], db_content.network_id,
+            added=[with_timestamp(content_in.content, db_content.created_at)],
+            seq=change.last_recorded(db))
         # Decrypt content before sending response
         db_content.content = db_content.get_decrypted_content(
             current_user["uid"])
@@ -204,7 +266,8 @@ async def delete_content(
     db: Session = Depends(get_db),
     nid: UUID,
     cid: UUID,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    background_tasks: BackgroundTasks
 ) -> Any:
     """
     Delete content from both SQL database and vector store.
@@ -217,37 +280,24 @@ async def delete_content(
 
         # Delete from vector store first
         try:
-            vector_store = get_vector_store()
-
-            # Debug: Get and print all documents for this content
-            results = vector_store.vectorstore.get(
-                where={"network_id": str(nid)}
-            )
-            if results and results['metadatas']:
-                logger.info(
-                    f"Current documents in vector store for network {nid}:")
-                for metadata in results['metadatas']:
-                    logger.info(f"Document metadata: {metadata}")
-
-                # Find the document ID for this content
-                for i, metadata in enumerate(results['metadatas']):
-                    if metadata.get('content_id') == str(cid):
-                        doc_id = results['ids'][i]
-                        # Delete by ID
-                        vector_store.vectorstore._collection.delete(
-                            ids=[doc_id]
-                        )
-                        logger.info(f"Deleted content {
-                                    cid} (doc_id: {doc_id}) from vector store")
-                        break
-
+            await get_vector_store().adelete(nid, [cid])
         except Exception as e:
             logger.error(f"Failed to delete content {
                          cid} from vector store: {str(e)}")
+            VECTOR_STORE_ERRORS.inc(operation="delete_content")
             # Continue with SQL deletion even if vector store deletion fails
 
+        # Keep the note's text so the profile can drop what came from it
+        db_content = content.get(db, id=cid)
+        removed = [with_timestamp(decrypt_content(db_content, current_user["uid"]),
+                                  db_content.created_at)] if db_content else []
+
         # Then delete from SQL database
         content.remove(db, id=cid)
+        get_plaintext_cache().purge_content(current_user["uid"], cid)
+        background_tasks.add_task(
+            refresh_profile, current_user["uid"], nid, removed=removed,
+            seq=change.last_recorded(db))
         return {"message": "Content deleted successfully"}
     except Exception as e:
         logger.error(f"Failed to delete content {cid} from network {
@@ -265,7 +315,8 @@ async def update_content(
     nid: UUID,
     cid: UUID,
     content_update: ContentUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    background_tasks: BackgroundTasks
 ) -> Any:
     """
     Update content message and its corresponding vector embedding.
@@ -282,49 +333,45 @@ async def update_content(
         if not db_content:
             raise HTTPException(status_code=404, detail="Content not found")
 
+        previous = with_timestamp(decrypt_content(
+            db_content, current_user["uid"]), db_content.created_at)
+
         # Set encrypted content
         db_content.set_encrypted_content(
             content_update.content, current_user["uid"])
         db.add(db_content)
         db.commit()
         db.refresh(db_content)
+        get_plaintext_cache().purge_content(current_user["uid"], cid)
+        background_tasks.add_task(
+            refresh_profile, current_user["uid"], nid,
+            added=[with_timestamp(content_update.content, db_content.created_at)],
+            removed=[previous], seq=change.last_recorded(db))
 
         try:
             # Update in vector store
             vector_store = get_vector_store()
 
-            # Find and delete old vector
-            results = vector_store.vectorstore.get(
-                where={"network_id": str(nid)}
-            )
-            if results and results['metadatas']:
-                # Find the document ID for this content
-                for i, metadata in enumerate(results['metadatas']):
-                    if metadata.get('content_id') == str(cid):
-                        doc_id = results['ids'][i]
-                        # Delete by ID
-                        vector_store.vectorstore._collection.delete(
-                            ids=[doc_id]
-                        )
-                        logger.info(f"Deleted old content {
-                                    cid} (doc_id: {doc_id}) from vector store")
-                        break
+            # Delete old vector
+            await vector_store.adelete(nid, [cid])
 
             # Create new vector with updated content
-            vector_store.add_or_update_documents(
+            await vector_store.aupsert(
                 documents=[content_update.content],
                 network_id=nid,
                 metadata=[{
                     "network_id": str(nid),
                     "content_id": str(cid),
                     "user_id": current_user["uid"],
-                    "created_at": db_content.created_at.isoformat()
+                    "created_at": db_content.created_at.isoformat(),
+                    "created_at_ts": to_timestamp(db_content.created_at)
                 }]
             )
             logger.info(f"Updated content {cid} in vector store")
         except Exception as e:
             logger.error(f"Failed to update content {
                          cid} in vector store: {str(e)}")
+            VECTOR_STORE_ERRORS.inc(operation="update_content")
             # Don't raise exception here as SQL update was successful
 
         # Decrypt content before sending response
@@ -0,0 +1,37 @@
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from core.profiling import get_profiling_admin, list_profiles, get_profile_path
+
+router = APIRouter()
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    size: int
+    created_at: str
+
+
+@router.get("/", response_model=List[ProfileInfo])
+async def read_profiles(
+    admin: dict = Depends(get_profiling_admin)
+) -> Any:
+    """
+    List stored request profiles, newest first.
+    """
+    return list_profiles()
+
+
+@router.get("/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    admin: dict = Depends(get_profiling_admin)
+) -> Any:
+    """
+    Download a profile as folded stacks, ready for flamegraph.pl or speedscope.
+    """
+    path = get_profile_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
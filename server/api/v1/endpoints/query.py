@@ -1,36 +1,106 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Header
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Set, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+import asyncio
+import math
 import pytz
 from uuid import UUID
-from crud import network, content
+from crud import network, content, change, vector_outbox
 from schemas.network import NetworkCreate
 from schemas.content import ContentCreate
 from core.firebase import get_current_user
-from database.db import get_db
+from database.db import session_for_user, unit_of_work
 from core.vector_store import get_vector_store
-from services.llm import extract_information, answer_question, Message, summarize_content, determine_action_type
+from services.llm import extract_information, extract_information_batch, answer_question, Message, summarize_content, determine_action_type, with_timestamp
+from services.llm_scheduler import LLMUnavailableError
 import logging
-from config import N_RESULTS
+from config import N_RESULTS, BATCH_SAVE_MAX_ITEMS, BATCH_EXTRACT_CHUNK_SIZE, CROSS_NETWORK_MAX_NETWORKS, TIME_RANGE_MAX_NOTES
+from core.metrics import FALLBACKS, VECTOR_STORE_ERRORS
+from core.singleflight import SingleFlight, make_key
+from core.name_index import get_name_index, match_name
+from core.plaintext_cache import decrypt_content
+from core.rate_limit import enforce_rate_limit
+from services.profile import load_profile, refresh_profile
+from services.outbox import deliver
+from services.prefetch import get_prefetch_slots, contents_for_docs, PREFETCH_ENABLED
+from services.intent import predict_intent, INTENT_CONFIDENCE_THRESHOLD, INTENT_DECISIONS
+from utils.temporal import parse_time_range
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Concurrent duplicate submissions (double clicks, client retries) share one run
+request_flight = SingleFlight("request")
+# Deferred work of finished runs, referenced until it completes
+_deferred_runs: Set[asyncio.Task] = set()
+
+
+async def _coalesced(key: str, user_id: str, endpoint: str, cost: float,
+                     fn: Callable[[Session, BackgroundTasks], Awaitable[Any]]) -> Any:
+    """
+    Run fn once for all concurrent identical requests. The run outlives any
+    single caller, so it gets its own session instead of a request's, and its
+    deferred work runs on its own instead of after one caller's response.
+    Only the caller that starts the run is charged to the rate limits.
+    """
+    async def run():
+        await enforce_rate_limit(user_id, endpoint, cost=cost)
+        deferred = BackgroundTasks()
+        db = session_for_user(user_id)
+        try:
+            result = await fn(db, deferred)
+        finally:
+            db.close()
+        if deferred.tasks:
+            task = asyncio.create_task(deferred())
+            _deferred_runs.add(task)
+
+            def finished(t: asyncio.Task):
+                _deferred_runs.discard(t)
+                if not t.cancelled() and t.exception():
+                    logger.error(f"Deferred work for {endpoint} of user {user_id} failed: {str(t.exception())}")
+            task.add_done_callback(finished)
+        return result
+    return await request_flight.do(key, run)
+
+
+def llm_unavailable(e: LLMUnavailableError) -> HTTPException:
+    """Map an exhausted LLM budget to 503 so clients back off instead of failing hard."""
+    return HTTPException(
+        status_code=503,
+        detail="The assistant is busy, please try again shortly",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+# Stands in for a person's name when a question spans the whole network
+ALL_NETWORKS_NAME = "the people in my network"
+
 
 class QueryRequest(BaseModel):
     query: str
     name: str = "Assistant"
     nid: Optional[UUID] = None
+    # Search every network of the user instead of one nid
+    search_all: bool = False
     messages: List[Message]
 
 
+class NetworkMatch(BaseModel):
+    nid: UUID
+    name: str
+    relevance_score: float
+
+
 class QueryResponse(BaseModel):
     answer: str
     message: str
     date: str
+    networks: Optional[List[NetworkMatch]] = None
 
 
 class SaveRequest(BaseModel):
@@ -38,26 +108,75 @@ class SaveRequest(BaseModel):
     text: str
 
 
+class SaveResponse(BaseModel):
+    message: str
+    nid: UUID
+    cid: UUID
+    # Without a nid: the network the note went to, the name extracted from
+    # the text and how they were paired, so clients can show and undo a match
+    name: Optional[str] = None
+    extracted_name: Optional[str] = None
+    match: Optional[Literal["exact", "partial", "fuzzy", "new"]] = None
+
+
+class BatchSaveItem(BaseModel):
+    nid: Optional[UUID] = None
+    text: str
+
+
+class BatchSaveRequest(BaseModel):
+    items: List[BatchSaveItem] = Field(
+        min_length=1, max_length=BATCH_SAVE_MAX_ITEMS)
+
+
+class BatchSaveResult(BaseModel):
+    index: int
+    status: Literal["saved", "error"]
+    nid: Optional[UUID] = None
+    cid: Optional[UUID] = None
+    # As in SaveResponse, for items saved without a nid
+    name: Optional[str] = None
+    extracted_name: Optional[str] = None
+    match: Optional[Literal["exact", "partial", "fuzzy", "new"]] = None
+    error: Optional[str] = None
+
+
+class BatchSaveResponse(BaseModel):
+    message: str
+    results: List[BatchSaveResult]
+
+
 class ActionTypeRequest(BaseModel):
     text: str
+    # Selected network; if the text is a question, its retrieval starts right away
+    nid: Optional[UUID] = None
 
 
 class ActionTypeResponse(BaseModel):
     action_type: str
+    confidence: Optional[float] = None  # Local classifier confidence, None when the LLM decided
 
 
 @router.post("/query", response_model=QueryResponse)
 async def process_query(
     *,
-    db: Session = Depends(get_db),
     query_in: QueryRequest,
     current_user: dict = Depends(get_current_user),
     timezone: str = "UTC"
 ) -> Any:
     """
     Process a query using semantic search for network content if provided, 
+    across all networks if search_all is set,
     or general knowledge if no network is selected.
     """
+    # Instructions (new chats only), context, each history message and the question
+    key = make_key(current_user["uid"], "query", query_in, timezone)
+    return await _coalesced(
+        key, current_user["uid"], "query", 2 + max(1, len(query_in.messages)),
+        lambda db, background_tasks: _process_query(db, query_in, current_user, timezone, background_tasks))
+
+
+async def _process_query(db: Session, query_in: QueryRequest, current_user: dict, timezone: str, background_tasks: BackgroundTasks) -> Any:
     try:
         # Parse the timezone
         try:
@@ -71,7 +190,15 @@ async def process_query(
         now = datetime.now(tz)
         formatted_date = now.strftime("%B %d, %Y")
 
+        # Period the question is about ("last month", "in March"), if any
+        time_range = parse_time_range(query_in.query, now)
+        created_between = time_range.timestamps() if time_range else None
+
+        if query_in.search_all:
+            return await _query_all_networks(db, query_in, current_user, formatted_date, created_between)
+
         relevant_contents = []
+        profile = None
 
         # Only query network content if nid is provided
         if query_in.nid:
@@ -83,52 +210,66 @@ async def process_query(
                 raise HTTPException(
                     status_code=404, detail="Network not found")
 
+            # Rolling summary of the whole network, built lazily for older networks
+            profile = load_profile(db, current_user["uid"], query_in.nid)
+            if profile is None:
+                background_tasks.add_task(
+                    refresh_profile, current_user["uid"], query_in.nid)
+
             # Get all relevant contents, either from vector store or traditional retrieval
             # Try vector store first
             try:
-                vector_store = get_vector_store()
-                relevant_docs = vector_store.query_documents(
-                    query_text=query_in.query,
-                    network_id=query_in.nid,
-                    min_relevance_score=0.3  # Only include somewhat relevant matches
-                )
-
-                # Get content IDs from the results
-                content_ids = [doc['metadata']['content_id']
-                               for doc in relevant_docs]
-
-                # Fetch full content from database for these IDs
-                for content_id in content_ids:
-                    db_content = content.get(db, id=content_id)
-                    if db_content and db_content.network_id == query_in.nid:
-                        decrypted_content = db_content.get_decrypted_content(
-                            current_user["uid"])
-                        # Add timestamp if not already present
-                        if not decrypted_content.startswith("[20"):
-                            timestamp = db_content.created_at.strftime(
-                                "[%Y-%m-%d %H:%M:%S]")
-                            decrypted_content = f"{
-                                timestamp} {decrypted_content}"
-                        relevant_contents.append(decrypted_content)
+                # Started by /determine_action if it saw this question coming
+                prefetched = await get_prefetch_slots().claim(
+                    current_user["uid"], query_in.nid, query_in.query, created_between)
+                if prefetched is not None:
+                    relevant_contents = prefetched
+                else:
+                    vector_store = get_vector_store()
+                    relevant_docs = await vector_store.aquery(
+                        query_text=query_in.query,
+                        network_id=query_in.nid,
+                        min_relevance_score=0.3,  # Only include somewhat relevant matches
+                        created_between=created_between
+                    )
+
+                    # Fetch full content from database for these IDs in one query
+                    relevant_contents = contents_for_docs(
+                        db, current_user["uid"], query_in.nid, relevant_docs)
+
+                if time_range and not relevant_contents:
+                    # Vectors written before created_at_ts existed never match the
+                    # range, and a question like "what did we discuss last month"
+                    # rarely resembles any note, so read the period from SQL
+                    FALLBACKS.inc(kind="time_range_sql")
+                    contents = content.get_by_network_between(
+                        db, network_id=query_in.nid, user_id=current_user["uid"],
+                        start=time_range.start, end=time_range.end, limit=TIME_RANGE_MAX_NOTES)
+                    for c in contents:
+                        relevant_contents.append(with_timestamp(
+                            decrypt_content(c, current_user["uid"]), c.created_at))
 
             except Exception as e:
                 logger.error(f"Error querying vector store for network {
                              query_in.nid}: {str(e)}")
                 logger.info("Falling back to traditional content retrieval")
+                VECTOR_STORE_ERRORS.inc(operation="query")
+                FALLBACKS.inc(kind="traditional_retrieval")
 
                 # Fallback to traditional content retrieval
-                contents = content.get_by_network(
-                    db, network_id=query_in.nid, user_id=current_user["uid"])
+                relevant_contents = []
+                if time_range:
+                    contents = content.get_by_network_between(
+                        db, network_id=query_in.nid, user_id=current_user["uid"],
+                        start=time_range.start, end=time_range.end)
+                else:
+                    contents = content.get_by_network(
+                        db, network_id=query_in.nid, user_id=current_user["uid"])
                 for c in contents:
-                    decrypted_content = c.get_decrypted_content(
-                        current_user["uid"])
-                    if not decrypted_content.startswith("[20"):
-                        timestamp = c.created_at.strftime(
-                            "[%Y-%m-%d %H:%M:%S]")
-                        decrypted_content = f"{timestamp} {decrypted_content}"
-                    relevant_contents.append(decrypted_content)
-
-            if not relevant_contents:
+                    relevant_contents.append(with_timestamp(
+                        decrypt_content(c, current_user["uid"]), c.created_at))
+
+            if not relevant_contents and not profile:
                 logger.warning(
                     f"No relevant content found for query in network {query_in.nid}")
                 return {
@@ -140,18 +281,20 @@ async def process_query(
         # Process query using LLM with relevant content (or none if no network selected)
         try:
             # If no content is available, pass a special empty context message
-            if not relevant_contents:
+            if not relevant_contents and not profile:
                 relevant_contents = [
                     "NO_NETWORK_SELECTED - Use general knowledge to answer this question."]
                 name = "No One Selected"  # Clear indication that no network/person is selected
             else:
                 name = query_in.name if query_in.name and query_in.name.strip() else "Network"
 
-            answer = answer_question(
+            answer = await run_in_threadpool(
+                answer_question,
                 name=name,  # Use context-appropriate name
                 question=query_in.query,
                 messages=query_in.messages,
-                content_array=relevant_contents
+                content_array=relevant_contents,
+                profile=profile
             )
 
             return {
@@ -159,6 +302,9 @@ async def process_query(
                 "message": "Query processed successfully",
                 "date": formatted_date
             }
+        except LLMUnavailableError as e:
+            logger.error(f"LLM unavailable while processing query: {str(e)}")
+            raise llm_unavailable(e)
         except Exception as e:
             logger.error(f"Error processing query with LLM: {str(e)}")
             raise HTTPException(
@@ -172,10 +318,91 @@ async def process_query(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/save")
+async def _query_all_networks(db: Session, query_in: QueryRequest, current_user: dict, formatted_date: str, created_between: Optional[Tuple[float, float]] = None) -> Any:
+    """
+    Answer a question across the user's whole network: embed once, run one
+    vector search filtered by user_id, group hits by network, then decrypt
+    only the best networks' names and notes for a single answer call.
+    """
+    user_id = current_user["uid"]
+    try:
+        relevant_docs = await get_vector_store().aquery_user(
+            query_text=query_in.query,
+            user_id=user_id,
+            network_ids=network.get_ids_by_user(db, user_id=user_id),
+            min_relevance_score=0.3,  # Only include somewhat relevant matches
+            created_between=created_between
+        )
+    except Exception as e:
+        logger.error(f"Error querying vector store across networks of user {
+                     user_id}: {str(e)}")
+        VECTOR_STORE_ERRORS.inc(operation="query_all")
+        raise HTTPException(status_code=500, detail="Failed to search networks")
+
+    # Hits are sorted by relevance, so networks are ordered by their best hit
+    groups: Dict[str, List[dict]] = {}
+    for doc in relevant_docs:
+        groups.setdefault(doc["metadata"]["network_id"], []).append(doc)
+    top_groups = [(UUID(nid), hits[:N_RESULTS])
+                  for nid, hits in list(groups.items())[:CROSS_NETWORK_MAX_NETWORKS]]
+
+    # Ownership is checked again in SQL; vectors of deleted networks drop out here
+    db_networks = network.get_user_networks(
+        db, user_id=user_id, nids=[nid for nid, _ in top_groups])
+    names = get_name_index().resolve(user_id, [(net.nid, net.name) for net in db_networks])
+    db_contents = content.get_user_contents(
+        db, user_id=user_id,
+        cids=[UUID(doc["metadata"]["content_id"]) for nid, hits in top_groups if nid in names for doc in hits])
+    contents_by_id = {c.cid: c for c in db_contents}
+
+    relevant_contents, matches = [], []
+    for nid, hits in top_groups:
+        if nid not in names:
+            continue
+        for doc in hits:
+            db_content = contents_by_id.get(UUID(doc["metadata"]["content_id"]))
+            if db_content:
+                note = with_timestamp(decrypt_content(db_content, user_id), db_content.created_at)
+                relevant_contents.append(f"[{names[nid]}] {note}")
+        matches.append({"nid": nid, "name": names[nid],
+                        "relevance_score": hits[0]["relevance_score"]})
+
+    if not relevant_contents:
+        logger.warning(f"No relevant content found across networks of user {user_id}")
+        return {
+            "answer": "I couldn't find any relevant information to answer your question.",
+            "message": "No relevant content found",
+            "date": formatted_date,
+            "networks": []
+        }
+
+    try:
+        answer = await run_in_threadpool(
+            answer_question,
+            name=ALL_NETWORKS_NAME,
+            question=query_in.query,
+            messages=query_in.messages,
+            content_array=relevant_contents
+        )
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable while processing query: {str(e)}")
+        raise llm_unavailable(e)
+    except Exception as e:
+        logger.error(f"Error processing query with LLM: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Failed to process query")
+
+    return {
+        "answer": answer,
+        "message": "Query processed successfully",
+        "date": formatted_date,
+        "networks": matches
+    }
+
+
+@router.post("/save", response_model=SaveResponse)
 async def save_content(
     *,
-    db: Session = Depends(get_db),
     save_in: SaveRequest,
     current_user: dict = Depends(get_current_user),
     x_timezone: str = Header(default="UTC", alias="X-Timezone")
@@ -183,6 +410,13 @@ async def save_content(
     """
     Save content to a network.
     """
+    key = make_key(current_user["uid"], "save", save_in, x_timezone)
+    return await _coalesced(
+        key, current_user["uid"], "save", 1,
+        lambda db, background_tasks: _save_content(db, save_in, current_user, x_timezone, background_tasks))
+
+
+async def _save_content(db: Session, save_in: SaveRequest, current_user: dict, x_timezone: str, background_tasks: BackgroundTasks) -> Any:
     try:
         # Parse the timezone from header
         try:
@@ -192,46 +426,64 @@ async def save_content(
                            x_timezone}, defaulting to UTC. Error: {str(e)}")
             tz = pytz.UTC
 
-        vector_store = get_vector_store()
         now = datetime.now(tz)  # Get current time in user's timezone
 
         if not save_in.nid:
             # Create new network flow - extract both name and content
             try:
                 # Extract information using Gemini
-                extracted_info = extract_information(save_in.text)
-
-                # Network name will be encrypted in create_with_user
-                network_create = NetworkCreate(name=extracted_info.name)
-                db_network = network.create_with_user(
-                    db, obj_in=network_create, user_id=current_user["uid"], created_at=now)
-                logger.info(f"Created new network {
-                            db_network.nid} for user {current_user['uid']}")
-
-                # Content will be encrypted in create_with_user
-                content_create = ContentCreate(
-                    content=extracted_info.content, network_id=db_network.nid)
-                db_content = content.create_with_user(
-                    db, obj_in=content_create, user_id=current_user["uid"], created_at=now)
+                extracted_info = await run_in_threadpool(
+                    extract_information, save_in.text)
+
+                # Attach to an existing contact for the same person if there is one
+                db_network = None
+                name_match = get_name_index().find(
+                    db, current_user["uid"], extracted_info.name)
+                if name_match:
+                    db_network = network.get_user_network(
+                        db, user_id=current_user["uid"], nid=name_match.nid)
+
+                # Network, content and outbox entry in one commit
+                with unit_of_work(db):
+                    if db_network:
+                        logger.info(f"Matched '{extracted_info.name}' to existing network {
+                                    db_network.nid} ({name_match.match}) for user {current_user['uid']}")
+                    else:
+                        name_match = None
+                        # Network name will be encrypted in create_with_user
+                        network_create = NetworkCreate(name=extracted_info.name)
+                        db_network = network.create_with_user(
+                            db, obj_in=network_create, user_id=current_user["uid"],
+                            created_at=now, commit=False)
+                        logger.info(f"Created new network {
+                                    db_network.nid} for user {current_user['uid']}")
+
+                    # Content will be encrypted in create_with_user
+                    content_create = ContentCreate(
+                        content=extracted_info.content, network_id=db_network.nid)
+                    db_content = content.create_with_user(
+                        db, obj_in=content_create, user_id=current_user["uid"],
+                        created_at=now, commit=False)
+                    entry = vector_outbox.enqueue(
+                        db, content_id=db_content.cid, user_id=current_user["uid"])
 
                 # Index the content in vector store
-                try:
-                    vector_store.add_or_update_documents(
-                        documents=[extracted_info.content],
-                        network_id=db_network.nid,
-                        metadata=[{
-                            "network_id": db_network.nid,
-                            "content_id": db_content.cid,
-                            "user_id": current_user["uid"],
-                            "created_at": db_content.created_at.isoformat()
-                        }]
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to index content in vector store: {str(e)}")
-                    # Don't raise here - we still saved to SQL DB successfully
+                await deliver(background_tasks, [entry], [extracted_info.content], [db_content])
+
+                background_tasks.add_task(
+                    refresh_profile, current_user["uid"], db_network.nid,
+                    added=[with_timestamp(extracted_info.content, db_content.created_at)],
+                    seq=change.last_recorded(db))
 
-                return {"message": "Information saved successfully"}
+                return {
+                    "message": "Information added successfully" if name_match
+                    else "Information saved successfully",
+                    "nid": db_network.nid,
+                    "cid": db_content.cid,
+                    "name": name_match.name if name_match else extracted_info.name,
+                    "extracted_name": extracted_info.name,
+                    "match": name_match.match if name_match else "new"
+                }
             except Exception as e:
                 logger.error(f"Failed to create new network for user {
                              current_user['uid']}: {str(e)}")
@@ -248,32 +500,33 @@ async def save_content(
 
             try:
                 # Summarize the content first
-                summarized_content = summarize_content(save_in.text)
-
-                # Content will be encrypted in create_with_user
-                content_create = ContentCreate(
-                    content=summarized_content, network_id=save_in.nid)
-                db_content = content.create_with_user(
-                    db, obj_in=content_create, user_id=current_user["uid"], created_at=now)
+                summarized_content = await run_in_threadpool(
+                    summarize_content, save_in.text)
+
+                # Content and outbox entry in one commit
+                with unit_of_work(db):
+                    # Content will be encrypted in create_with_user
+                    content_create = ContentCreate(
+                        content=summarized_content, network_id=save_in.nid)
+                    db_content = content.create_with_user(
+                        db, obj_in=content_create, user_id=current_user["uid"],
+                        created_at=now, commit=False)
+                    entry = vector_outbox.enqueue(
+                        db, content_id=db_content.cid, user_id=current_user["uid"])
 
                 # Index the content in vector store
-                try:
-                    vector_store.add_or_update_documents(
-                        documents=[summarized_content],
-                        network_id=save_in.nid,
-                        metadata=[{
-                            "network_id": save_in.nid,
-                            "content_id": db_content.cid,
-                            "user_id": current_user["uid"],
-                            "created_at": db_content.created_at.isoformat()
-                        }]
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to index content in vector store: {str(e)}")
-                    # Don't raise here - we still saved to SQL DB successfully
+                await deliver(background_tasks, [entry], [summarized_content], [db_content])
+
+                background_tasks.add_task(
+                    refresh_profile, current_user["uid"], save_in.nid,
+                    added=[with_timestamp(summarized_content, db_content.created_at)],
+                    seq=change.last_recorded(db))
 
-                return {"message": "Information added successfully"}
+                return {
+                    "message": "Information added successfully",
+                    "nid": save_in.nid,
+                    "cid": db_content.cid
+                }
             except Exception as e:
                 logger.error(f"Failed to add content to network {
                              save_in.nid} for user {current_user['uid']}: {str(e)}")
@@ -281,24 +534,184 @@ async def save_content(
 
     except HTTPException:
         raise
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable while saving content for user {
+                     current_user['uid']}: {str(e)}")
+        raise llm_unavailable(e)
     except Exception as e:
         logger.error(f"Error saving content for user {
                      current_user['uid']}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/save/batch", response_model=BatchSaveResponse)
+async def save_content_batch(
+    *,
+    batch_in: BatchSaveRequest,
+    current_user: dict = Depends(get_current_user),
+    x_timezone: str = Header(default="UTC", alias="X-Timezone")
+) -> Any:
+    """
+    Save many interactions at once: one structured extraction call per chunk,
+    one SQL transaction and batched embedding. Returns a result per item.
+    """
+    key = make_key(current_user["uid"], "save_batch", batch_in, x_timezone)
+    return await _coalesced(
+        key, current_user["uid"], "save_batch", math.ceil(len(batch_in.items) / BATCH_EXTRACT_CHUNK_SIZE),
+        lambda db, background_tasks: _save_content_batch(db, batch_in, current_user, x_timezone, background_tasks))
+
+
+async def _save_content_batch(db: Session, batch_in: BatchSaveRequest, current_user: dict, x_timezone: str, background_tasks: BackgroundTasks) -> Any:
+    user_id = current_user["uid"]
+    items = batch_in.items
+    results: List[Optional[BatchSaveResult]] = [None] * len(items)
+
+    try:
+        tz = pytz.timezone(x_timezone)
+    except pytz.exceptions.UnknownTimeZoneError as e:
+        logger.warning(f"Invalid timezone {
+                       x_timezone}, defaulting to UTC. Error: {str(e)}")
+        tz = pytz.UTC
+    now = datetime.now(tz)
+
+    # Check every referenced network in one query
+    requested_nids = {item.nid for item in items if item.nid}
+    owned_nids = {
+        n.nid for n in network.get_user_networks(db, user_id=user_id, nids=list(requested_nids))
+    } if requested_nids else set()
+    pending = []
+    for i, item in enumerate(items):
+        if item.nid and item.nid not in owned_nids:
+            results[i] = BatchSaveResult(
+                index=i, status="error", nid=item.nid, error="Network not found")
+        else:
+            pending.append(i)
+
+    try:
+        extracted = await run_in_threadpool(
+            extract_information_batch, [items[i].text for i in pending])
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable while saving batch for user {
+                     user_id}: {str(e)}")
+        raise llm_unavailable(e)
+
+    try:
+        # The user's contacts plus those created by earlier items, matched as
+        # separate /save calls would be; loaded once and only when needed
+        known: Optional[Dict[UUID, str]] = None
+        created = 0
+        documents, db_contents, entries, saved = [], [], [], []
+        # Networks, contents and outbox entries in one commit
+        with unit_of_work(db):
+            for i, info in zip(pending, extracted):
+                if info is None:
+                    results[i] = BatchSaveResult(
+                        index=i, status="error", nid=items[i].nid,
+                        error="Could not extract information")
+                    continue
+
+                nid, name, match = items[i].nid, None, None
+                if not nid:
+                    if known is None:
+                        known = dict(get_name_index().names(db, user_id))
+                    name_match = match_name(info.name, known)
+                    if name_match:
+                        nid, name, match = name_match
+                    else:
+                        db_network = network.create_with_user(
+                            db, obj_in=NetworkCreate(name=info.name), user_id=user_id,
+                            created_at=now, commit=False)
+                        known[db_network.nid] = info.name
+                        created += 1
+                        nid, name, match = db_network.nid, info.name, "new"
+
+                db_content = content.create_with_user(
+                    db, obj_in=ContentCreate(content=info.content, network_id=nid),
+                    user_id=user_id, created_at=now, commit=False)
+                documents.append(info.content)
+                db_contents.append(db_content)
+                entries.append(vector_outbox.enqueue(db, content_id=db_content.cid, user_id=user_id))
+                saved.append((i, nid, db_content.cid, name,
+                              info.name if not items[i].nid else None, match))
+        logger.info(f"Saved {len(saved)} contents and {
+                    created} new networks for user {user_id}")
+    except Exception as e:
+        logger.error(f"Failed to save batch for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to save batch")
+
+    added: Dict[Any, List[str]] = {}
+    # documents holds the saved notes in the same order as saved
+    for (i, nid, cid, name, extracted_name, match), document in zip(saved, documents):
+        results[i] = BatchSaveResult(
+            index=i, status="saved", nid=nid, cid=cid, name=name,
+            extracted_name=extracted_name, match=match)
+        added.setdefault(nid, []).append(with_timestamp(document, now))
+    for nid, notes in added.items():
+        background_tasks.add_task(refresh_profile, user_id, nid, added=notes,
+                                  seq=change.last_recorded(db))
+
+    if documents:
+        await deliver(background_tasks, entries, documents, db_contents)
+
+    return {
+        "message": f"Saved {len(saved)} of {len(items)} items",
+        "results": results
+    }
+
+
 @router.post("/determine_action", response_model=ActionTypeResponse)
 async def determine_action(
     *,
     request: ActionTypeRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    timezone: str = "UTC"
 ) -> Any:
     """
     Determine if the input text is a question (ask) or information to save.
+    Confident local predictions answer directly; the rest go to the LLM.
+    With a nid, a likely question's retrieval is prefetched for /query.
     """
+    # The shared LLM budget is only charged if the local classifier is unsure
+    await enforce_rate_limit(current_user["uid"], "determine_action", llm_cost=0)
+    user_id = current_user["uid"]
+    slots = get_prefetch_slots()
+
+    def prefetch():
+        if not (PREFETCH_ENABLED and request.nid):
+            return
+        try:
+            tz = pytz.timezone(timezone)
+        except pytz.exceptions.UnknownTimeZoneError:
+            tz = pytz.UTC
+        # Same range /query will derive from the same text and timezone
+        time_range = parse_time_range(request.text, datetime.now(tz))
+        slots.start(user_id, request.nid, request.text,
+                    time_range.timestamps() if time_range else None)
+
     try:
-        action_type = determine_action_type(request.text)
+        prediction = predict_intent(request.text)
+        if prediction.confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            INTENT_DECISIONS.inc(source=prediction.source)
+            if prediction.action == "ask":
+                prefetch()
+            return {"action_type": "send" if prediction.action == "ask" else "save",
+                    "confidence": prediction.confidence}
+
+        await enforce_rate_limit(user_id, "llm")
+        # Undecided: retrieve while the LLM classifies, and drop it if it says save
+        prefetch()
+        action_type = await run_in_threadpool(
+            determine_action_type, request.text)
+        INTENT_DECISIONS.inc(source="llm")
+        if action_type != "ask" and request.nid:
+            slots.discard(user_id)
         return {"action_type": "send" if action_type == "ask" else "save"}
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable while determining action type for user {
+                     current_user['uid']}: {str(e)}")
+        raise llm_unavailable(e)
     except Exception as e:
         logger.error(f"Error determining action type for user {
                      current_user['uid']}: {str(e)}")
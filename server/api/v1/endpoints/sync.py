@@ -0,0 +1,83 @@
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from uuid import UUID
+import logging
+from crud import network, content, change
+from schemas.network import Network
+from schemas.content import Content
+from core.firebase import get_current_user
+from core.name_index import get_name_index
+from core.plaintext_cache import decrypt_content
+from database.deps import get_db
+from config import SYNC_PAGE_SIZE
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+class SyncResponse(BaseModel):
+    cursor: int
+    has_more: bool
+    networks: List[Network]
+    contents: List[Content]
+    deleted_networks: List[UUID]
+    deleted_contents: List[UUID]
+
+
+@router.get("/sync", response_model=SyncResponse)
+async def sync(
+    since: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Get the networks and contents created, updated or deleted after a cursor.
+
+    Pass the returned cursor as `since` on the next call, and call again right
+    away while `has_more` is true. Start with since=0 for a full sync.
+    Contents removed together with their network are not listed one by one:
+    a network in `deleted_networks` implies all of its contents are gone.
+    """
+    user_id = current_user["uid"]
+    try:
+        changes = change.since(db, user_id=user_id, cursor=since, limit=SYNC_PAGE_SIZE + 1)
+        has_more = len(changes) > SYNC_PAGE_SIZE
+        changes = changes[:SYNC_PAGE_SIZE]
+
+        live = {"network": [], "content": []}
+        deleted = {"network": [], "content": []}
+        for row in changes:
+            (deleted if row.deleted else live)[row.entity_type].append(row.entity_id)
+
+        # Rows that vanished since being logged are covered by a later tombstone
+        networks = network.get_user_networks(db, user_id=user_id, nids=live["network"])
+        names = get_name_index().resolve(user_id, [(net.nid, net.name) for net in networks])
+        contents = content.get_user_contents(db, user_id=user_id, cids=live["content"])
+
+        return {
+            "cursor": changes[-1].seq if changes else since,
+            "has_more": has_more,
+            "networks": [{
+                "name": names[net.nid],
+                "nid": net.nid,
+                "created_at": net.created_at,
+                "updated_at": net.updated_at
+            } for net in networks],
+            "contents": [{
+                "content": decrypt_content(cont, user_id),
+                "cid": cont.cid,
+                "network_id": cont.network_id,
+                "created_at": cont.created_at,
+                "updated_at": cont.updated_at
+            } for cont in contents],
+            "deleted_networks": deleted["network"],
+            "deleted_contents": deleted["content"]
+        }
+    except Exception as e:
+        logger.error(f"Failed to sync changes since {since} for user {user_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to sync changes"
+        )
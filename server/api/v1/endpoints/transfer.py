@@ -0,0 +1,188 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from datetime import datetime, timezone
+from uuid import UUID
+import json
+import logging
+from crud import network, content, vector_outbox
+from schemas.network import NetworkCreate
+from schemas.content import ContentCreate
+from core.firebase import get_current_user
+from core.streaming import dumps
+from database.db import session_for_user, unit_of_work
+from database.deps import get_db
+from config import TRANSFER_BATCH_SIZE
+from services.outbox import deliver
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT_VERSION = 1
+
+
+class ImportResponse(BaseModel):
+    message: str
+    networks: int
+    contents: int
+    skipped: int
+
+
+def _dump(record: dict) -> bytes:
+    return dumps(record) + b"\n"
+
+
+def _export_lines(user_id: str) -> Iterator[bytes]:
+    """
+    Yield a user's networks, each followed by its contents, as NDJSON.
+    Rows are streamed from SQLite and decrypted one at a time, so memory
+    stays constant regardless of account size. Uses its own session because
+    the response body is produced after the request's dependencies close.
+    """
+    db = session_for_user(user_id)
+    try:
+        yield _dump({
+            "type": "meta",
+            "version": EXPORT_FORMAT_VERSION,
+            "exported_at": datetime.now(timezone.utc).isoformat()
+        })
+        for net in network.iter_by_user(db, user_id=user_id, batch_size=TRANSFER_BATCH_SIZE):
+            yield _dump({
+                "type": "network",
+                "nid": net.nid,
+                "name": net.get_decrypted_name(user_id),
+                "created_at": net.created_at.isoformat() if net.created_at else None,
+                "updated_at": net.updated_at.isoformat() if net.updated_at else None
+            })
+            for cont in content.iter_by_network(
+                    db, network_id=net.nid, user_id=user_id, batch_size=TRANSFER_BATCH_SIZE):
+                yield _dump({
+                    "type": "content",
+                    "cid": cont.cid,
+                    "network_id": cont.network_id,
+                    "content": cont.get_decrypted_content(user_id),
+                    "created_at": cont.created_at.isoformat() if cont.created_at else None,
+                    "updated_at": cont.updated_at.isoformat() if cont.updated_at else None
+                })
+    except Exception as e:
+        logger.error(f"Export failed for user {user_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+@router.get("/export")
+async def export_data(
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Stream all networks and contents of the current user as NDJSON.
+    """
+    return StreamingResponse(
+        _export_lines(current_user["uid"]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="hae-export.ndjson"'}
+    )
+
+
+async def _ndjson_records(request: Request) -> AsyncIterator[dict]:
+    """Parse the request body line by line as it arrives."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _write_batch(db: Session, user_id: str, records: List[dict], nid_map: Dict[str, UUID]) -> Tuple[Dict[str, int], List[Any], List[str], List[Any]]:
+    """
+    Insert one batch of records and their vector outbox entries in a single
+    transaction. Returns the counts and the entries, documents and contents
+    still to index.
+    """
+    counts = {"networks": 0, "contents": 0, "skipped": 0}
+    entries, documents, db_contents = [], [], []
+    with unit_of_work(db):
+        for record in records:
+            if record["type"] == "network":
+                db_network = network.create_with_user(
+                    db, obj_in=NetworkCreate(name=record["name"]), user_id=user_id,
+                    created_at=_parse_timestamp(record.get("created_at")), commit=False)
+                nid_map[str(record["nid"])] = db_network.nid
+                counts["networks"] += 1
+            else:
+                nid = nid_map.get(str(record["network_id"]))
+                if nid is None:
+                    counts["skipped"] += 1
+                    continue
+                db_content = content.create_with_user(
+                    db, obj_in=ContentCreate(content=record["content"], network_id=nid),
+                    user_id=user_id, created_at=_parse_timestamp(record.get("created_at")),
+                    commit=False)
+                entries.append(vector_outbox.enqueue(db, content_id=db_content.cid, user_id=user_id))
+                documents.append(record["content"])
+                db_contents.append(db_content)
+                counts["contents"] += 1
+    return counts, entries, documents, db_contents
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_data(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    background_tasks: BackgroundTasks
+) -> Any:
+    """
+    Import networks and contents from an NDJSON export, streaming the body
+    and inserting and embedding in batches. Imported rows get new IDs.
+    """
+    user_id = current_user["uid"]
+    totals = {"networks": 0, "contents": 0, "skipped": 0}
+    nid_map: Dict[str, UUID] = {}
+    batch: List[dict] = []
+
+    async def write(batch: List[dict]):
+        counts, entries, documents, db_contents = await run_in_threadpool(
+            _write_batch, db, user_id, batch, nid_map)
+        for key in totals:
+            totals[key] += counts[key]
+        if documents:
+            # Entries that fail to index stay in the outbox for the startup replay
+            await deliver(background_tasks, entries, documents, db_contents)
+
+    try:
+        async for record in _ndjson_records(request):
+            if record.get("type") not in ("network", "content"):
+                continue
+            batch.append(record)
+            if len(batch) >= TRANSFER_BATCH_SIZE:
+                await write(batch)
+                batch = []
+        if batch:
+            await write(batch)
+    except (json.JSONDecodeError, KeyError, ValueError) as e:
+        logger.error(f"Invalid import data for user {user_id}: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid import data after {totals['networks']} networks and {totals['contents']} contents"
+        )
+    except Exception as e:
+        logger.error(f"Import failed for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to import data")
+
+    logger.info(f"Imported {totals['networks']} networks and {
+                totals['contents']} contents for user {user_id}")
+    return {"message": "Import completed", **totals}
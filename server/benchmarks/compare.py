@@ -0,0 +1,63 @@
+"""
+Compare two load-test reports produced by `benchmarks/load_test.py`.
+
+Prints per-endpoint throughput and latency deltas and exits non-zero when any
+endpoint's p95 regresses by more than `--threshold` percent.
+
+Usage (from the `server` directory):
+    python benchmarks/compare.py baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def pct_change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two load-test reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Allowed p95 regression in percent")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    print(f"baseline {baseline['meta']['revision']}  ->  candidate {candidate['meta']['revision']}")
+    print(f"{'endpoint':<40} {'rps':>16} {'p50 ms':>20} {'p95 ms':>20} {'p99 ms':>20}")
+
+    regressions = []
+    for label in sorted(set(baseline["endpoints"]) | set(candidate["endpoints"])):
+        old = baseline["endpoints"].get(label)
+        new = candidate["endpoints"].get(label)
+        if not old or not new:
+            print(f"{label:<40} (only in {'candidate' if new else 'baseline'})")
+            continue
+
+        cells = [f"{old['throughput_rps']:.1f}->{new['throughput_rps']:.1f}"]
+        for key in ("p50", "p95", "p99"):
+            before, after = old["latency_ms"][key], new["latency_ms"][key]
+            cells.append(f"{before:.1f}->{after:.1f} ({pct_change(before, after):+.0f}%)")
+        print(f"{label:<40} {cells[0]:>16} {cells[1]:>20} {cells[2]:>20} {cells[3]:>20}")
+
+        if pct_change(old["latency_ms"]["p95"], new["latency_ms"]["p95"]) > args.threshold:
+            regressions.append(label)
+
+    if regressions:
+        print(f"\np95 regression above {args.threshold}% in: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+End-to-end HTTP load test for the FastAPI backend.
+
+Starts `main.app` with stubbed Firebase auth, a stubbed Gemini LLM and a local
+embedder (see `benchmarks/stubs.py`), seeds synthetic users, networks and
+contents, then drives a weighted mix of `/save`, `/query`, `/networks` and
+`/contents` traffic at a fixed concurrency. Throughput and latency percentiles
+per endpoint are written as JSON so runs can be compared across commits with
+`benchmarks/compare.py`.
+
+Usage (from the `server` directory):
+    python benchmarks/load_test.py --users 20 --networks-per-user 10 \\
+        --contents-per-network 20 --concurrency 16 --duration 30 \\
+        --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import stubs  # noqa: E402
+
+FIRST_NAMES = ["Alex", "Sarah", "Jordan", "Priya", "Mateo", "Yuki", "Omar",
+               "Chloe", "Daniel", "Amara", "Lucas", "Mei", "Noah", "Leila"]
+LAST_NAMES = ["Zhang", "Kim", "Patel", "Garcia", "Tanaka", "Haddad", "Martin",
+              "Okafor", "Silva", "Chen", "Nguyen", "Rossi", "Cohen", "Smith"]
+TOPICS = ["a promotion at Google", "a trip to Japan", "their new startup",
+          "marathon training", "a book on distributed systems", "moving to Berlin",
+          "the AI team reorg", "their wedding plans", "a piano recital",
+          "learning Korean", "a hiking trip", "a job offer in Toronto"]
+QUESTIONS = ["What did we talk about last time?", "Where is {first} travelling?",
+             "What is {first} working on?", "When did I last see {first}?",
+             "What hobbies does {first} have?"]
+
+# Interactions per /save/batch request
+BATCH_SIZE = 10
+
+ENDPOINTS = {
+    "save": "POST /api/v1/save",
+    "save_batch": "POST /api/v1/save/batch",
+    "query": "POST /api/v1/query",
+    "networks": "GET /api/v1/networks/",
+    "contents": "GET /api/v1/networks/{nid}/contents",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--networks-per-user", type=int, default=10)
+    parser.add_argument("--contents-per-network", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0,
+                        help="Seconds of traffic after warm-up")
+    parser.add_argument("--warmup", type=float, default=2.0,
+                        help="Seconds of traffic excluded from the results")
+    parser.add_argument("--mix", default="save=1,query=3,networks=2,contents=2",
+                        help="Relative weights per endpoint")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated latency of each Gemini call")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0,
+                        help="Simulated latency of each embedding call")
+    parser.add_argument("--transport", choices=["asgi", "http"], default="asgi",
+                        help="Drive the app in-process (asgi) or through uvicorn on a local port (http)")
+    parser.add_argument("--data-dir", default=None,
+                        help="Where to put the SQLite and Chroma files (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None,
+                        help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def configure_environment(data_dir: str):
+    """Point the app at throwaway storage and fake credentials before import."""
+    os.environ["SQLITE_DB_PATH"] = os.path.join(data_dir, "db.sqlite")
+    os.environ["CHROMA_DB_PATH"] = os.path.join(data_dir, "chroma")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("FIREBASE_SERVICE_ACCOUNT_KEY", "{}")
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    # Synthetic users exceed any per-user budget by design
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+def interaction_text(rng: random.Random, name: str) -> str:
+    return f"Had coffee with {name} and talked about {rng.choice(TOPICS)}."
+
+
+def seed(args, rng: random.Random) -> Dict[str, List[dict]]:
+    """Insert synthetic users, networks and contents directly through the CRUD layer."""
+    from main import init_db
+    from database.db import session_for_user
+    from crud import network, content
+    from schemas.network import NetworkCreate
+    from schemas.content import ContentCreate
+    from core.vector_store import get_vector_store
+    from utils.temporal import to_timestamp
+
+    init_db()
+    vector_store = get_vector_store()
+    users: Dict[str, List[dict]] = {}
+
+    for u in range(args.users):
+        uid = f"user{u:05d}"
+        users[uid] = []
+        # Each user's rows live on the shard their UID hashes to
+        db = session_for_user(uid)
+        try:
+            for _ in range(args.networks_per_user):
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                db_network = network.create_with_user(
+                    db, obj_in=NetworkCreate(name=name), user_id=uid)
+                documents, metadata = [], []
+                for _ in range(args.contents_per_network):
+                    text = interaction_text(rng, name)
+                    db_content = content.create_with_user(
+                        db, obj_in=ContentCreate(content=text, network_id=db_network.nid), user_id=uid)
+                    documents.append(text)
+                    metadata.append({
+                        "network_id": str(db_network.nid),
+                        "content_id": str(db_content.cid),
+                        "user_id": uid,
+                        "created_at": db_content.created_at.isoformat(),
+                        "created_at_ts": to_timestamp(db_content.created_at)
+                    })
+                if documents:
+                    vector_store.add_or_update_documents(
+                        documents=documents,
+                        network_id=db_network.nid,
+                        document_ids=[m["content_id"] for m in metadata],
+                        metadata=metadata
+                    )
+                users[uid].append({"nid": str(db_network.nid), "name": name})
+        finally:
+            db.close()
+    return users
+
+
+def build_request(kind: str, rng: random.Random, users: Dict[str, List[dict]]):
+    """Return (endpoint label, method, path, uid, json body) for one request."""
+    uid = rng.choice(list(users))
+    networks = users[uid]
+    target = rng.choice(networks) if networks else None
+
+    if kind == "networks" or target is None and kind != "save":
+        return ENDPOINTS["networks"], "GET", "/api/v1/networks/", uid, None
+    if kind == "contents":
+        return ENDPOINTS["contents"], "GET", f"/api/v1/networks/{target['nid']}/contents", uid, None
+    if kind == "query":
+        first = target["name"].split()[0]
+        body = {
+            "query": rng.choice(QUESTIONS).format(first=first),
+            "name": target["name"],
+            "nid": target["nid"],
+            "messages": []
+        }
+        return ENDPOINTS["query"], "POST", "/api/v1/query", uid, body
+
+    if kind == "save_batch":
+        items = []
+        for _ in range(BATCH_SIZE):
+            if networks and rng.random() < 0.5:
+                existing = rng.choice(networks)
+                items.append({"nid": existing["nid"], "text": interaction_text(rng, existing["name"])})
+            else:
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                items.append({"text": interaction_text(rng, name)})
+        return ENDPOINTS["save_batch"], "POST", "/api/v1/save/batch", uid, {"items": items}
+
+    # save: half the time add to an existing network, otherwise create one
+    if target is not None and rng.random() < 0.5:
+        body = {"nid": target["nid"], "text": interaction_text(rng, target["name"])}
+    else:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        body = {"text": interaction_text(rng, name)}
+    return ENDPOINTS["save"], "POST", "/api/v1/save", uid, body
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> dict:
+    endpoints = {}
+    total = 0
+    for label in sorted(set(samples) | set(errors)):
+        latencies = sorted(samples.get(label, []))
+        total += len(latencies)
+        endpoints[label] = {
+            "count": len(latencies),
+            "errors": errors.get(label, 0),
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+                "max": round(latencies[-1], 3) if latencies else 0.0,
+            },
+        }
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 3) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def drive(client, args, users, weights: Dict[str, float]) -> dict:
+    """Run `concurrency` workers for warm-up plus duration seconds."""
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    kinds = list(weights)
+    kind_weights = [weights[k] for k in kinds]
+
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            kind = rng.choices(kinds, kind_weights)[0]
+            label, method, path, uid, body = build_request(kind, rng, users)
+            headers = {"Authorization": f"Bearer {stubs.token_for(uid)}", "X-Timezone": "UTC"}
+            began = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            finished = time.perf_counter()
+            if began < measure_from:
+                continue
+            if ok:
+                samples[label].append((finished - began) * 1000.0)
+            else:
+                errors[label] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    return summarize(samples, errors, elapsed)
+
+
+def start_uvicorn(app):
+    """Serve the app on an ephemeral local port in a background thread."""
+    import socket
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(args, users, weights) -> dict:
+    import httpx
+    from main import app
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    if args.transport == "http":
+        server, base_url = start_uvicorn(app)
+        try:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+                return await drive(client, args, users, weights)
+        finally:
+            server.should_exit = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=120) as client:
+        return await drive(client, args, users, weights)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    weights = parse_mix(args.mix)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="hae-bench-")
+    os.makedirs(data_dir, exist_ok=True)
+
+    configure_environment(data_dir)
+    stubs.install()
+    stubs.configure(args.llm_latency_ms, args.embed_latency_ms)
+
+    try:
+        rng = random.Random(args.seed)
+        seed_started = time.perf_counter()
+        users = seed(args, rng)
+        seed_seconds = time.perf_counter() - seed_started
+
+        results = asyncio.run(run(args, users, weights))
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "seed_seconds": round(seed_seconds, 3),
+                "config": {k: v for k, v in vars(args).items() if k not in ("output", "data_dir")},
+            },
+            **results,
+        }
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Offline stand-ins for the external services the backend talks to.
+
+The benchmark suite installs these into ``sys.modules`` before ``main`` is
+imported so the real endpoint, CRUD, encryption and Chroma code paths run
+unchanged while Firebase, Gemini and the Gemini embedding API are replaced by
+deterministic local fakes.
+"""
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+import types
+from typing import List
+
+# Token prefix understood by the fake `auth.verify_id_token`
+TOKEN_PREFIX = "bench-"
+
+EMBEDDING_DIMENSIONS = 256
+
+_settings = {
+    "llm_latency": 0.0,
+    "embed_latency": 0.0,
+}
+
+
+def configure(llm_latency_ms: float = 0.0, embed_latency_ms: float = 0.0):
+    """Set the simulated upstream latencies (milliseconds)."""
+    _settings["llm_latency"] = llm_latency_ms / 1000.0
+    _settings["embed_latency"] = embed_latency_ms / 1000.0
+
+
+def token_for(uid: str) -> str:
+    """Bearer token the fake Firebase accepts for the given user."""
+    return f"{TOKEN_PREFIX}{uid}"
+
+
+# --- Firebase ---------------------------------------------------------------
+
+def _verify_id_token(token: str, *args, **kwargs) -> dict:
+    if not token.startswith(TOKEN_PREFIX):
+        raise ValueError("Invalid benchmark token")
+    uid = token[len(TOKEN_PREFIX):]
+    return {"uid": uid, "user_id": uid}
+
+
+def _build_firebase_modules() -> dict:
+    firebase_admin = types.ModuleType("firebase_admin")
+    credentials = types.ModuleType("firebase_admin.credentials")
+    auth = types.ModuleType("firebase_admin.auth")
+
+    credentials.Certificate = lambda cred: cred
+    auth.verify_id_token = _verify_id_token
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    firebase_admin.credentials = credentials
+    firebase_admin.auth = auth
+
+    return {
+        "firebase_admin": firebase_admin,
+        "firebase_admin.credentials": credentials,
+        "firebase_admin.auth": auth,
+    }
+
+
+# --- Gemini -----------------------------------------------------------------
+
+_NAME_PATTERN = re.compile(r"with ([A-Z][a-z]+(?: [A-Z][a-z]+)?)")
+_INTERACTION_PATTERN = re.compile(r"Interaction: (.*?)\n", re.DOTALL)
+_TEXT_PATTERN = re.compile(r"Text: (.*?)\n", re.DOTALL)
+_NUMBERED_PATTERN = re.compile(r"^\[(\d+)\] (.*)$", re.MULTILINE)
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _simulate_llm_latency():
+    if _settings["llm_latency"]:
+        time.sleep(_settings["llm_latency"])
+
+
+def _respond(prompt: str) -> str:
+    """Produce a plausible canned answer for each prompt used in services.llm."""
+    if "Determine if the following text" in prompt:
+        match = _TEXT_PATTERN.search(prompt)
+        text = match.group(1).strip() if match else ""
+        action = "ask" if text.endswith("?") else "save"
+        return json.dumps({"action": action})
+
+    if "For each numbered interaction" in prompt:
+        items = []
+        for index, interaction in _NUMBERED_PATTERN.findall(prompt):
+            name_match = _NAME_PATTERN.search(interaction)
+            name = name_match.group(1) if name_match else "Unknown Person"
+            items.append({"index": int(index), "content": interaction[:200], "name": name})
+        return json.dumps(items)
+
+    if "Keep a compact profile" in prompt:
+        return "Synthetic profile."
+
+    match = _INTERACTION_PATTERN.search(prompt)
+    interaction = match.group(1).strip() if match else prompt.strip()
+
+    if "identify the main person" in prompt:
+        name_match = _NAME_PATTERN.search(interaction)
+        name = name_match.group(1) if name_match else "Unknown Person"
+        return json.dumps({"content": interaction[:200], "name": name})
+
+    if "Summarize the following interaction" in prompt:
+        return interaction[:200]
+
+    return "Synthetic answer."
+
+
+class _FakeChat:
+    def send_message(self, message: str, **kwargs) -> _FakeResponse:
+        _simulate_llm_latency()
+        if "Respond with 'UNDERSTOOD'" in message:
+            return _FakeResponse("UNDERSTOOD")
+        return _FakeResponse("Synthetic answer.")
+
+
+class _FakeGenerativeModel:
+    def __init__(self, model_name: str = "", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, **kwargs) -> _FakeResponse:
+        _simulate_llm_latency()
+        return _FakeResponse(_respond(prompt))
+
+    def start_chat(self, **kwargs) -> _FakeChat:
+        return _FakeChat()
+
+
+def _build_genai_modules() -> dict:
+    try:
+        # Keep the real `google` namespace package (protobuf lives there)
+        import google
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda *args, **kwargs: None
+    genai.GenerativeModel = _FakeGenerativeModel
+    google.generativeai = genai
+    return {"google": google, "google.generativeai": genai}
+
+
+# --- Embeddings -------------------------------------------------------------
+
+def embed_text(text: str) -> List[float]:
+    """Deterministic hashed bag-of-words embedding, L2-normalised."""
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for token in re.findall(r"\w+", text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class LocalEmbeddings:
+    """Drop-in replacement for `GoogleGenerativeAIEmbeddings`."""
+
+    def __init__(self, model: str = "", google_api_key: str = "", **kwargs):
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if _settings["embed_latency"]:
+            time.sleep(_settings["embed_latency"])
+        return [embed_text(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if _settings["embed_latency"]:
+            time.sleep(_settings["embed_latency"])
+        return embed_text(text)
+
+
+def _build_embedding_modules() -> dict:
+    module = types.ModuleType("langchain_google_genai")
+    module.GoogleGenerativeAIEmbeddings = LocalEmbeddings
+    return {"langchain_google_genai": module}
+
+
+def install():
+    """Register every fake module. Must run before importing `main`."""
+    for modules in (_build_firebase_modules(), _build_genai_modules(), _build_embedding_modules()):
+        sys.modules.update(modules)
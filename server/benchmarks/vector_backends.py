@@ -0,0 +1,160 @@
+"""
+Compare vector-store backends on per-network top-k search.
+
+Fills each backend with random embeddings spread over networks of
+`--network-size` documents, for every total corpus size in `--sizes`, then
+times `query_by_embedding` against random networks. Embedding calls are
+excluded so only index/search cost is measured. Also reports the recall of
+each backend's top N_RESULTS against exact float64 search.
+
+Usage (from the `server` directory):
+    python benchmarks/vector_backends.py --sizes 1000 10000 50000 \\
+        --network-size 200 --queries 200 --output vectors.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import stubs  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+
+# Dimension of models/embedding-001
+DIM = 768
+
+
+def build_backends(data_dir: str, names: List[str]) -> Dict[str, object]:
+    from services.vector_store import VectorStore
+    from services.numpy_vector_store import NumpyVectorStore
+
+    factories = {
+        "chroma": lambda: VectorStore(persist_directory=os.path.join(data_dir, "chroma"), server_url=None),
+        "numpy-float32": lambda: NumpyVectorStore(os.path.join(data_dir, "np32"), dtype="float32"),
+        "numpy-float16": lambda: NumpyVectorStore(os.path.join(data_dir, "np16"), dtype="float16"),
+        "numpy-int8": lambda: NumpyVectorStore(os.path.join(data_dir, "np8"), dtype="int8"),
+        "numpy-int8-rescore": lambda: NumpyVectorStore(os.path.join(data_dir, "np8r"), dtype="int8", rescore=True),
+    }
+    return {name: factories[name]() for name in names}
+
+
+def fill(backend, vectors: np.ndarray, networks: List[str]) -> Dict[str, List[str]]:
+    """Insert all vectors network by network; returns each network's IDs in row order."""
+    per_network = len(vectors) // len(networks)
+    row_ids = {}
+    for n, nid in enumerate(networks):
+        ids = row_ids[nid] = [str(uuid.uuid4()) for _ in range(per_network)]
+        metadata = [{"network_id": nid, "content_id": doc_id, "user_id": "bench"} for doc_id in ids]
+        block = vectors[n * per_network:(n + 1) * per_network]
+        for chunk in range(0, per_network, 1000):
+            backend._add_embeddings(ids[chunk:chunk + 1000], block[chunk:chunk + 1000].tolist(),
+                                    metadata[chunk:chunk + 1000])
+    return row_ids
+
+
+def exact_top(vectors: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    distances = ((vectors.astype(np.float64) - query) ** 2).sum(axis=1)
+    return list(np.argsort(distances)[:k])
+
+
+def run(args) -> dict:
+    from config import N_RESULTS
+
+    rng = np.random.default_rng(args.seed)
+    picker = random.Random(args.seed)
+    results = {}
+    for size in args.sizes:
+        n_networks = max(1, size // args.network_size)
+        networks = [str(uuid.uuid4()) for _ in range(n_networks)]
+        vectors = rng.standard_normal((n_networks * args.network_size, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = [(picker.randrange(n_networks), rng.standard_normal(DIM).astype(np.float32))
+                   for _ in range(args.queries)]
+
+        data_dir = tempfile.mkdtemp(prefix="hae-vectors-")
+        try:
+            for name, backend in build_backends(data_dir, args.backends).items():
+                start = time.perf_counter()
+                row_ids = fill(backend, vectors, networks)
+                build_seconds = time.perf_counter() - start
+
+                latencies, hits = [], 0
+                for n, query in queries:
+                    nid = networks[n]
+                    start = time.perf_counter()
+                    documents = backend.query_by_embedding(query.tolist(), nid)
+                    latencies.append((time.perf_counter() - start) * 1000.0)
+
+                    block = vectors[n * args.network_size:(n + 1) * args.network_size]
+                    truth = {row_ids[nid][i] for i in exact_top(block, query, N_RESULTS)}
+                    hits += len(truth & {doc["metadata"]["content_id"] for doc in documents})
+                latencies.sort()
+
+                report = results.setdefault(str(size), {})[name] = {
+                    "networks": n_networks,
+                    "build_seconds": round(build_seconds, 3),
+                    "latency_ms": {
+                        "mean": round(sum(latencies) / len(latencies), 3),
+                        "p50": round(percentile(latencies, 50), 3),
+                        "p95": round(percentile(latencies, 95), 3),
+                        "p99": round(percentile(latencies, 99), 3),
+                    },
+                    "recall": round(hits / (len(queries) * N_RESULTS), 4),
+                }
+                print(f"size={size:>7} {name:<18} p50={report['latency_ms']['p50']:.3f}ms "
+                      f"p95={report['latency_ms']['p95']:.3f}ms recall={report['recall']}",
+                      file=sys.stderr)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector-store backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Total documents across all networks")
+    parser.add_argument("--network-size", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy-float32", "numpy-float16",
+                                                   "numpy-int8", "numpy-int8-rescore"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    stubs.install()
+
+    report = {
+        "meta": {
+            "dim": DIM,
+            "network_size": args.network_size,
+            "queries": args.queries,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "results": run(args),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
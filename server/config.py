@@ -1 +1,22 @@
 N_RESULTS = 3  # Number of results to return from vector store queries
+BATCH_SAVE_MAX_ITEMS = 100  # Maximum number of interactions accepted by /save/batch
+BATCH_EXTRACT_CHUNK_SIZE = 20  # Interactions per structured extraction call
+EMBED_BATCH_SIZE = 100  # Documents per embed_documents call
+TRANSFER_BATCH_SIZE = 200  # Rows per batch when streaming exports and imports
+SYNC_PAGE_SIZE = 500  # Maximum changes returned by one /sync call
+CROSS_NETWORK_N_RESULTS = 20  # Vector hits considered by a query across all networks
+CROSS_NETWORK_MAX_NETWORKS = 5  # Networks whose notes are passed to the LLM in that mode
+TIME_RANGE_MAX_NOTES = 10  # Notes read from SQL for a time-scoped question no vector hit answered
+PROFILE_MAX_WORDS = 150  # Target length of a network's rolling profile summary
+PROFILE_REBUILD_CHUNK_SIZE = 50  # Notes folded per LLM call when a profile is built from scratch
+# Per-user token buckets: scope -> (capacity, tokens refilled per second).
+# A token is one estimated LLM call; every request is charged to its endpoint's
+# bucket and to the user-wide "llm" bucket
+RATE_LIMITS = {
+    "llm": (60, 0.5),
+    "query": (40, 0.3),
+    "save": (30, 0.2),
+    "save_batch": (10, 0.05),
+    "determine_action": (60, 1.0),
+}
+OUTBOX_REPLAY_BATCH_SIZE = 200  # Outbox entries re-indexed per batch at startup
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Optional
+from fastapi import Response
+
+# Bump when the listing JSON format changes, so old cached bodies are not reused
+ETAG_FORMAT_VERSION = 1
+
+
+def make_etag(user_id: str, scope: str, version: int) -> str:
+    # Versions are per user, so the owner is part of the tag
+    owner = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:12]
+    return f'W/"{owner}-{scope}-{ETAG_FORMAT_VERSION}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: str) -> dict:
+    # Clients may keep the body but must revalidate before every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
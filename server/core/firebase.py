@@ -5,6 +5,7 @@ from firebase_admin import credentials, auth
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dotenv import load_dotenv
+from core.metrics import track
 
 load_dotenv()
 
@@ -27,7 +28,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(
     """
     try:
         token = credentials.credentials
-        decoded_token = auth.verify_id_token(token)
+        with track("auth"):
+            decoded_token = auth.verify_id_token(token)
         return decoded_token
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,166 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, Literal, NamedTuple, Optional, Tuple
+from uuid import UUID
+import logging
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from models.network import Network
+from utils.encryption import decrypt
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Minimum similarity of the first names in a fuzzy match (0 to 1); the rest
+# of the name must be identical
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.88"))
+# Number of users whose decrypted names are kept in memory
+NAME_INDEX_MAX_USERS = int(os.getenv("NAME_INDEX_MAX_USERS", "10000"))
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", without_accents.lower()).split())
+
+
+class NameMatch(NamedTuple):
+    """An existing network a name was attached to, and by which rule."""
+    nid: UUID
+    name: str
+    match: Literal["exact", "partial", "fuzzy"]
+
+
+def match_name(name: str, names: Dict[UUID, str]) -> Optional[NameMatch]:
+    """
+    Find the network for a person name among nid -> name: exact normalized
+    match first, then the unique contact whose name contains every token of
+    the name ("Alex" -> "Alex Zhang", never the reverse), then the unique
+    contact with the same surname and a similar first name.
+    """
+    target = normalize_name(name)
+    if not target:
+        return None
+    candidates = {nid: normalize_name(n) for nid, n in names.items()}
+
+    for nid, candidate in candidates.items():
+        if candidate == target:
+            return NameMatch(nid, names[nid], "exact")
+
+    # A longer name is more specific, so "Alex Kim" never lands in "Alex"
+    target_tokens = target.split()
+    partial = [nid for nid, candidate in candidates.items()
+               if set(target_tokens) <= set(candidate.split())]
+    if len(partial) == 1:
+        return NameMatch(partial[0], names[partial[0]], "partial")
+
+    # Typos in the first name only: "Christoper Lee" vs "Christopher Lee",
+    # but not "Alex Zhang" vs "Alex Chang" or "John Smith" vs "Joan Smith"
+    scores: Dict[UUID, float] = {}
+    for nid, candidate in candidates.items():
+        candidate_tokens = candidate.split()
+        if len(candidate_tokens) != len(target_tokens) or candidate_tokens[1:] != target_tokens[1:]:
+            continue
+        score = SequenceMatcher(None, target_tokens[0], candidate_tokens[0]).ratio()
+        if score >= NAME_MATCH_THRESHOLD:
+            scores[nid] = score
+    if scores:
+        best = max(scores.values())
+        best_nids = [nid for nid, score in scores.items() if score == best]
+        if len(best_nids) == 1:
+            return NameMatch(best_nids[0], names[best_nids[0]], "fuzzy")
+    return None
+
+
+class NetworkNameIndex:
+    """
+    Per-user in-memory index of decrypted network names.
+
+    Entries remember the ciphertext they were decrypted from, so a row that
+    was renamed elsewhere (e.g. by another worker) is detected by a string
+    comparison and re-decrypted; unchanged names are never decrypted twice.
+    """
+
+    def __init__(self, max_users: int = NAME_INDEX_MAX_USERS):
+        self.max_users = max_users
+        # user_id -> {nid: (ciphertext, plaintext name)}
+        self._users: "OrderedDict[str, Dict[UUID, Tuple[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entries(self, user_id: str) -> Dict[UUID, Tuple[str, str]]:
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is None:
+                entries = self._users[user_id] = {}
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+            return entries
+
+    def resolve(self, user_id: str, rows: Iterable[Tuple[UUID, str]]) -> Dict[UUID, str]:
+        """
+        Map (nid, encrypted name) rows to plaintext names, decrypting only
+        rows that are new or changed since they were last seen.
+        """
+        entries = self._entries(user_id)
+        return {nid: self._lookup(entries, user_id, nid, ciphertext) for nid, ciphertext in rows}
+
+    def resolve_one(self, user_id: str, nid: UUID, ciphertext: str) -> str:
+        """Single-row variant of resolve, for callers streaming rows."""
+        return self._lookup(self._entries(user_id), user_id, nid, ciphertext)
+
+    @staticmethod
+    def _lookup(entries: Dict[UUID, Tuple[str, str]], user_id: str, nid: UUID, ciphertext: str) -> str:
+        cached = entries.get(nid)
+        if cached is None or cached[0] != ciphertext:
+            cached = entries[nid] = (ciphertext, decrypt(ciphertext, user_id))
+        return cached[1]
+
+    def names(self, db: Session, user_id: str) -> Dict[UUID, str]:
+        """All current network names of a user; costs one SQL query and no decrypts when warm."""
+        rows = db.query(Network.nid, Network.name).filter(
+            Network.user_id == user_id).all()
+        names = self.resolve(user_id, rows)
+        # Drop networks deleted since the index was built
+        entries = self._entries(user_id)
+        for nid in [nid for nid in entries if nid not in names]:
+            entries.pop(nid, None)
+        return names
+
+    def find(self, db: Session, user_id: str, name: str) -> Optional[NameMatch]:
+        """Find an existing network of the user for a person name (see match_name)."""
+        if not normalize_name(name):
+            return None
+        return match_name(name, self.names(db, user_id))
+
+    def remember(self, user_id: str, nid: UUID, ciphertext: str, name: str):
+        """Record a created or renamed network without a decrypt."""
+        with self._lock:
+            entries = self._users.get(user_id)
+        if entries is not None:
+            entries[nid] = (ciphertext, name)
+
+    def forget(self, user_id: str, nid: UUID):
+        with self._lock:
+            entries = self._users.get(user_id)
+        if entries is not None:
+            entries.pop(nid, None)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+# Shared index for this process
+name_index = NetworkNameIndex()
+
+
+def get_name_index() -> NetworkNameIndex:
+    return name_index
@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from core.metrics import Counter, Gauge
+
+load_dotenv()
+
+# Hard cap on memory held by cached plaintext (approximate, in bytes)
+PLAINTEXT_CACHE_MAX_BYTES = int(os.getenv("PLAINTEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PLAINTEXT_CACHE_TTL_SECONDS = float(os.getenv("PLAINTEXT_CACHE_TTL_SECONDS", "300"))
+
+# Per-entry bookkeeping on top of the string itself
+_ENTRY_OVERHEAD = 200
+
+CACHE_HITS = Counter(
+    "hae_plaintext_cache_hits_total", "Decrypted content served from the plaintext cache")
+CACHE_MISSES = Counter(
+    "hae_plaintext_cache_misses_total", "Content that had to be decrypted")
+CACHE_EVICTIONS = Counter(
+    "hae_plaintext_cache_evictions_total", "Entries evicted to stay under the memory cap")
+CACHE_BYTES = Gauge(
+    "hae_plaintext_cache_bytes", "Approximate memory held by the plaintext cache")
+
+Key = Tuple[str, UUID]
+
+
+class _Entry:
+    __slots__ = ("version", "plaintext", "network_id", "expires_at", "size")
+
+    def __init__(self, version, plaintext: str, network_id: UUID, expires_at: float):
+        self.version = version
+        self.plaintext = plaintext
+        self.network_id = network_id
+        self.expires_at = expires_at
+        self.size = sys.getsizeof(plaintext) + _ENTRY_OVERHEAD
+
+
+class PlaintextCache:
+    """
+    Bounded LRU cache of decrypted content, keyed by (user, cid) and
+    validated against the row version (updated_at plus a ciphertext hash),
+    so an edit made by another process is never served stale.
+    """
+
+    def __init__(self, max_bytes: int = PLAINTEXT_CACHE_MAX_BYTES, ttl: float = PLAINTEXT_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._by_network: Dict[Tuple[str, UUID], Set[UUID]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key: Key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        cids = self._by_network.get((key[0], entry.network_id))
+        if cids is not None:
+            cids.discard(key[1])
+            if not cids:
+                del self._by_network[(key[0], entry.network_id)]
+
+    def get(self, user_id: str, cid: UUID, version) -> Optional[str]:
+        key = (user_id, cid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                CACHE_HITS.inc()
+                return entry.plaintext
+            if entry is not None:
+                self._drop(key)
+                CACHE_BYTES.set(self._bytes)
+        CACHE_MISSES.inc()
+        return None
+
+    def put(self, user_id: str, cid: UUID, network_id: UUID, version, plaintext: str):
+        entry = _Entry(version, plaintext, network_id, time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return
+        key = (user_id, cid)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._by_network.setdefault((user_id, network_id), set()).add(cid)
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                CACHE_EVICTIONS.inc()
+            CACHE_BYTES.set(self._bytes)
+
+    def purge_content(self, user_id: str, cid: UUID):
+        with self._lock:
+            self._drop((user_id, cid))
+            CACHE_BYTES.set(self._bytes)
+
+    def purge_network(self, user_id: str, network_id: UUID):
+        with self._lock:
+            for cid in list(self._by_network.get((user_id, network_id), ())):
+                self._drop((user_id, cid))
+            CACHE_BYTES.set(self._bytes)
+
+
+# Shared cache for this process
+plaintext_cache = PlaintextCache()
+
+
+def get_plaintext_cache() -> PlaintextCache:
+    return plaintext_cache
+
+
+def decrypt_content(db_content, user_id: str) -> str:
+    """Decrypt a Content row through the plaintext cache."""
+    version = (db_content.updated_at or db_content.created_at, hash(db_content.content))
+    plaintext = plaintext_cache.get(user_id, db_content.cid, version)
+    if plaintext is None:
+        plaintext = db_content.get_decrypted_content(user_id)
+        plaintext_cache.put(user_id, db_content.cid, db_content.network_id, version, plaintext)
+    return plaintext
@@ -0,0 +1,230 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+from fastapi import Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from firebase_admin import auth
+from dotenv import load_dotenv
+from core.firebase import get_current_user
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Profiling is opt-in; when disabled the middleware is never installed
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Firebase UIDs allowed to request profiles and download them
+PROFILING_ADMIN_UIDS = {
+    uid.strip() for uid in os.getenv("PROFILING_ADMIN_UIDS", "").split(",") if uid.strip()
+}
+# Fraction of all requests profiled without being asked to (0 disables sampling)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# Sampled profiles faster than this are discarded; requested profiles are always kept
+PROFILING_MIN_DURATION_MS = float(os.getenv("PROFILING_MIN_DURATION_MS", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "50"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "./profiles")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SUFFIX = ".folded"
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+# Threads whose stacks belong to request handling besides the event loop
+WORKER_THREAD_PREFIXES = ("AnyIO worker thread", "ThreadPoolExecutor")
+
+_slots = threading.BoundedSemaphore(PROFILING_MAX_CONCURRENT)
+
+
+class StackSampler(threading.Thread):
+    """
+    Statistical profiler: periodically snapshots the stacks of the event loop
+    thread and the worker thread pools and counts them in folded-stack form.
+    Work from other requests running concurrently on the same threads is
+    captured as well, as with any sampling profiler.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def _target_threads(self) -> Dict[int, str]:
+        targets = {}
+        for thread in threading.enumerate():
+            if thread.ident == self.loop_thread_id:
+                targets[thread.ident] = "event-loop"
+            elif thread.name.startswith(WORKER_THREAD_PREFIXES):
+                targets[thread.ident] = "worker"
+        return targets
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            targets = self._target_threads()
+            frames = sys._current_frames()
+            for thread_id, root in targets.items():
+                frame = frames.get(thread_id)
+                if frame is None or (root == "worker" and _is_idle(frame)):
+                    continue
+                self.stacks[_fold(root, frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _is_idle(frame) -> bool:
+    """True when a pool thread is parked waiting for work."""
+    for _ in range(4):
+        if frame is None:
+            break
+        code = frame.f_code
+        if code.co_name == "get" and os.path.basename(code.co_filename) == "queue.py":
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _fold(root: str, frame) -> str:
+    """Render a frame chain root-first as `root;module:function;...`."""
+    names: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _is_admin_token(authorization: Optional[bytes]) -> bool:
+    if not authorization or not PROFILING_ADMIN_UIDS:
+        return False
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return auth.verify_id_token(token).get("uid") in PROFILING_ADMIN_UIDS
+    except Exception:
+        return False
+
+
+def _safe_path(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+
+
+def _write_profile(sampler: StackSampler, scope, duration_ms: float) -> str:
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    profile_id = (f"{stamp}_{scope['method']}_{_safe_path(scope['path'])}"
+                  f"_{int(duration_ms)}ms_{uuid.uuid4().hex[:8]}")
+    with open(os.path.join(PROFILING_DIR, profile_id + PROFILE_SUFFIX), "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    _enforce_retention()
+    return profile_id
+
+
+def _enforce_retention():
+    """Keep only the newest PROFILING_MAX_FILES profiles on disk."""
+    profiles = list_profiles()
+    for stale in profiles[PROFILING_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILING_DIR, stale["id"] + PROFILE_SUFFIX))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[dict]:
+    """Stored profiles, newest first."""
+    if not os.path.isdir(PROFILING_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILING_DIR):
+        if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            profiles.append({
+                "id": entry.name[:-len(PROFILE_SUFFIX)],
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+            })
+    profiles.sort(key=lambda p: p["created_at"], reverse=True)
+    return profiles
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILING_DIR, profile_id + PROFILE_SUFFIX)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a request when an admin sends
+    `X-Profile: 1`, or when it falls into the PROFILING_SAMPLE_RATE fraction.
+    Requests that are not selected only pay for a header lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def _requested(self, scope) -> bool:
+        if _header(scope, PROFILE_HEADER) not in (b"1", b"true"):
+            return False
+        return await run_in_threadpool(_is_admin_token, _header(scope, b"authorization"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = await self._requested(scope)
+        sampled = not requested and PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+        if not (requested or sampled) or not _slots.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(threading.get_ident(), PROFILING_INTERVAL_MS / 1000.0)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            _slots.release()
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            if requested or duration_ms >= PROFILING_MIN_DURATION_MS:
+                try:
+                    profile_id = await run_in_threadpool(_write_profile, sampler, scope, duration_ms)
+                    logger.info(f"Stored profile {profile_id} ({sampler.samples} samples)")
+                except Exception as e:
+                    logger.error(f"Failed to store profile: {str(e)}")
+
+
+async def get_profiling_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Allow only PROFILING_ADMIN_UIDS to list and download profiles
+    """
+    if current_user["uid"] not in PROFILING_ADMIN_UIDS:
+        raise HTTPException(status_code=403, detail="Not allowed to access profiles")
+    return current_user
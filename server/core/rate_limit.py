@@ -0,0 +1,180 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import logging
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from config import RATE_LIMITS
+from core.metrics import Counter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" (per process) or "sqlite" (shared by all workers on the host)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./database/rate_limits.sqlite")
+# In-memory buckets kept before full, idle ones are dropped
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+RATE_LIMITED = Counter(
+    "hae_rate_limited_total",
+    "Requests rejected with 429 by the per-user token buckets",
+    ["endpoint"])
+
+# (tokens, time of last refill)
+Bucket = Tuple[float, float]
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets per (user, scope) held in process memory. A request is
+    granted only if every scope it is charged to has enough tokens, and then
+    all of them are charged at once.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Tuple[str, str], Bucket] = {}
+        self._lock = threading.Lock()
+
+    def _take(self, buckets: Dict[str, Optional[Bucket]], costs: Dict[str, float], now: float) -> Tuple[Dict[str, Bucket], float]:
+        """
+        Refill and charge buckets. Returns the new bucket states and 0 if
+        granted, or the seconds until it would be (states are then unused).
+        """
+        refilled, retry_after = {}, 0.0
+        for scope, cost in costs.items():
+            capacity, rate = self.limits[scope]
+            tokens, updated_at = buckets.get(scope) or (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+            # A request costing more than a full bucket waits for a full bucket
+            cost = min(cost, capacity)
+            if tokens < cost:
+                retry_after = max(retry_after, (cost - tokens) / rate)
+            refilled[scope] = (tokens - cost, now)
+        return refilled, retry_after
+
+    def acquire(self, user_id: str, costs: Dict[str, float]) -> float:
+        """Charge costs per scope; returns 0 if granted, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            current = {scope: self._buckets.get((user_id, scope)) for scope in costs}
+            states, retry_after = self._take(current, costs, now)
+            if not retry_after:
+                for scope, bucket in states.items():
+                    self._buckets[(user_id, scope)] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._drop_full(now)
+        return retry_after
+
+    def _drop_full(self, now: float):
+        """Forget buckets that have refilled completely; they equal a fresh bucket."""
+        for key, (tokens, updated_at) in list(self._buckets.items()):
+            capacity, rate = self.limits[key[1]]
+            if tokens + (now - updated_at) * rate >= capacity:
+                del self._buckets[key]
+
+
+class SQLiteTokenBucketLimiter(TokenBucketLimiter):
+    """Same buckets kept in a SQLite file, so every worker process shares them."""
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, limits: Dict[str, Tuple[float, float]] = RATE_LIMITS):
+        super().__init__(limits)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    user_id TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, scope)
+                )""")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self, user_id: str, costs: Dict[str, float]) -> float:
+        # Wall-clock time, since buckets are shared between processes
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" for _ in costs)
+            rows = conn.execute(
+                f"SELECT scope, tokens, updated_at FROM rate_buckets WHERE user_id = ? AND scope IN ({placeholders})",
+                (user_id, *costs)).fetchall()
+            states, retry_after = self._take(
+                {scope: (tokens, updated_at) for scope, tokens, updated_at in rows}, costs, now)
+            if not retry_after:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_buckets (user_id, scope, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                    [(user_id, scope, tokens, updated_at) for scope, (tokens, updated_at) in states.items()])
+            conn.execute("COMMIT")
+            return retry_after
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def create_rate_limiter() -> TokenBucketLimiter:
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteTokenBucketLimiter()
+    if RATE_LIMIT_BACKEND != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+    return TokenBucketLimiter()
+
+
+rate_limiter = create_rate_limiter()
+
+
+def get_rate_limiter() -> TokenBucketLimiter:
+    return rate_limiter
+
+
+async def enforce_rate_limit(user_id: str, endpoint: str, cost: float = 1.0, llm_cost: Optional[float] = None):
+    """
+    Charge a request to the user's bucket for the endpoint and the shared
+    "llm" bucket, weighted by its estimated number of LLM calls (llm_cost,
+    by default the same as cost). Endpoints that only sometimes call the LLM
+    pass llm_cost=0 and charge endpoint "llm" once they do. Raises 429 with
+    Retry-After when a bucket is empty.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    llm_cost = cost if llm_cost is None else llm_cost
+    costs = {endpoint: cost}
+    if llm_cost:
+        costs["llm"] = llm_cost
+    try:
+        if isinstance(rate_limiter, SQLiteTokenBucketLimiter):
+            # May wait on the file lock held by another worker
+            retry_after = await run_in_threadpool(rate_limiter.acquire, user_id, costs)
+        else:
+            retry_after = rate_limiter.acquire(user_id, costs)
+    except Exception as e:
+        # Limiter trouble must not take the endpoint down with it
+        logger.error(f"Rate limiter failed for user {user_id}: {str(e)}")
+        return
+    if retry_after:
+        RATE_LIMITED.inc(endpoint=endpoint)
+        logger.warning(f"Rate limited user {user_id} on {endpoint} for {retry_after:.1f}s")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+import threading
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict
+from core.metrics import Counter
+
+COALESCED = Counter(
+    "hae_singleflight_coalesced_total",
+    "Calls that joined an identical in-flight computation instead of running their own",
+    ["scope"])
+
+
+def _normalize(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        # Whitespace differences should not defeat coalescing
+        return " ".join(value.split())
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return str(value)
+
+
+def make_key(*parts: Any) -> str:
+    """Stable digest of arbitrary (JSON-able or Pydantic) parts."""
+    payload = json.dumps(_normalize(list(parts)), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical coroutines on the event loop:
+    the first caller runs the computation, later callers with the same key
+    await the same task and receive its result (or exception).
+    """
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def forget(done: asyncio.Task):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+            task.add_done_callback(forget)
+        else:
+            COALESCED.inc(scope=self.scope)
+        # A cancelled caller must not cancel the computation others are waiting on
+        return await asyncio.shield(task)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class ThreadSingleFlight:
+    """Thread-safe variant of `SingleFlight` for blocking calls."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED.inc(scope=self.scope)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def coalesce(scope: str):
+    """Decorator coalescing concurrent calls with identical arguments."""
+    flight = ThreadSingleFlight(scope)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return flight.do(make_key(func.__name__, args, kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorator
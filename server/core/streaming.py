@@ -0,0 +1,46 @@
+import json
+from typing import Any, Iterable, Iterator
+from uuid import UUID
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Bytes buffered before a chunk is handed to the server
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def stream_json_array(items: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Serialize items one by one into a JSON array, yielding roughly
+    STREAM_CHUNK_BYTES at a time so memory stays flat for large lists.
+    """
+    buffer = bytearray(b"[")
+    first = True
+    for item in items:
+        if not first:
+            buffer += b","
+        buffer += dumps(item)
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
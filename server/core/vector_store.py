@@ -8,8 +8,23 @@ load_dotenv()
 # Get ChromaDB path from environment variable
 CHROMA_DB_PATH = os.getenv('CHROMA_DB_PATH', './database')
 
+# "chroma" (default) or "numpy" for exact per-network search over memory-mapped files
+VECTOR_STORE_BACKEND = os.getenv('VECTOR_STORE_BACKEND', 'chroma')
+NUMPY_VECTOR_PATH = os.getenv(
+    'NUMPY_VECTOR_PATH', os.path.join(CHROMA_DB_PATH, 'numpy_vectors'))
+
+
+def create_vector_store() -> VectorStore:
+    if VECTOR_STORE_BACKEND == 'numpy':
+        from services.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore(directory=NUMPY_VECTOR_PATH)
+    if VECTOR_STORE_BACKEND != 'chroma':
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+    return VectorStore(persist_directory=CHROMA_DB_PATH)
+
+
 # Create a global instance of the vector store
-vector_store = VectorStore(persist_directory=CHROMA_DB_PATH)
+vector_store = create_vector_store()
 
 
 def get_vector_store() -> VectorStore:
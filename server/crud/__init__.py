@@ -0,0 +1,6 @@
+from crud.network import network
+from crud.content import content
+from crud.data_version import data_version
+from crud.change import change
+from crud.network_profile import network_profile
+from crud.vector_outbox import vector_outbox
@@ -0,0 +1,83 @@
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import and_, event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from crud.base import CRUDBase
+from crud.data_version import data_version, changed_rows
+from models.change import Change
+from models.data_version import DataVersion
+from models.network import Network
+from models.content import Content
+
+# data_versions scope holding each user's change sequence
+SYNC_SCOPE = "changes"
+# Session.info key of the latest sequence number the session recorded
+_LAST_SEQ = "last_change_seq"
+
+
+class CRUDChange(CRUDBase[Change, Change, Change]):
+    def record(self, db: Session, *, user_id: str, entity_type: str, entity_id: UUID,
+               network_id: UUID, deleted: bool) -> int:
+        """Upsert the latest change of an entity under the user's next sequence number."""
+        seq = data_version.bump(db, user_id=user_id, scope=SYNC_SCOPE)
+        values = {"network_id": network_id, "deleted": deleted, "seq": seq}
+        stmt = insert(Change).values(
+            user_id=user_id, entity_type=entity_type, entity_id=entity_id, **values)
+        db.connection().execute(stmt.on_conflict_do_update(
+            index_elements=[Change.user_id, Change.entity_type, Change.entity_id],
+            set_={**values, "changed_at": func.now()}
+        ))
+        return seq
+
+    def last_recorded(self, db: Session) -> Optional[int]:
+        """Sequence number of the latest write of this session, to tag follow-up work with."""
+        return db.info.get(_LAST_SEQ)
+
+    def current_seq(self, user_id: str):
+        """The user's latest sequence number as a scalar subquery, read in the same statement as other rows."""
+        return select(DataVersion.version).where(
+            DataVersion.user_id == user_id, DataVersion.scope == SYNC_SCOPE
+        ).scalar_subquery()
+
+    def since(self, db: Session, *, user_id: str, cursor: int, limit: int) -> List[Change]:
+        return db.query(self.model).filter(
+            Change.user_id == user_id, Change.seq > cursor
+        ).order_by(Change.seq).limit(limit).all()
+
+    def backfill(self, db: Session) -> int:
+        """Record rows written before the change log existed, oldest first."""
+        missing = []
+        for model, entity_type, pk in ((Network, "network", Network.nid), (Content, "content", Content.cid)):
+            network_col = Network.nid if model is Network else Content.network_id
+            rows = db.query(model.user_id, pk, network_col, model.created_at).outerjoin(
+                Change, and_(Change.user_id == model.user_id,
+                             Change.entity_type == entity_type,
+                             Change.entity_id == pk)
+            ).filter(Change.seq.is_(None)).all()
+            missing += [(created_at, entity_type, user_id, entity_id, nid)
+                        for user_id, entity_id, nid, created_at in rows]
+        # Networks before their contents when timestamps tie
+        missing.sort(key=lambda row: (row[0] is None, row[0], row[1] != "network"))
+        for _, entity_type, user_id, entity_id, nid in missing:
+            self.record(db, user_id=user_id, entity_type=entity_type,
+                        entity_id=entity_id, network_id=nid, deleted=False)
+        db.commit()
+        return len(missing)
+
+
+change = CRUDChange(Change)
+
+
+@event.listens_for(Session, "after_flush")
+def record_changes(session, flush_context):
+    """Log every network and content write, including deletes, in the same transaction."""
+    for obj, deleted in changed_rows(session):
+        if isinstance(obj, Network):
+            seq = change.record(session, user_id=obj.user_id, entity_type="network",
+                                entity_id=obj.nid, network_id=obj.nid, deleted=deleted)
+        else:
+            seq = change.record(session, user_id=obj.user_id, entity_type="content",
+                                entity_id=obj.cid, network_id=obj.network_id, deleted=deleted)
+        session.info[_LAST_SEQ] = seq
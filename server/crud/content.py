@@ -1,4 +1,6 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, Iterator, List, Optional
+from uuid import uuid4
 from sqlalchemy.orm import Session
 from crud.base import CRUDBase
 from models.content import Content
@@ -13,15 +15,55 @@ class CRUDContent(CRUDBase[Content, ContentCreate, ContentCreate]):
         ).all()
         return contents
 
-    def create_with_user(self, db: Session, *, obj_in: ContentCreate, user_id: str, created_at=None) -> Content:
+    def get_by_network_between(self, db: Session, *, network_id: Any, user_id: str, start: datetime, end: datetime, limit: Optional[int] = None) -> List[Content]:
+        """A network's contents created in [start, end): the newest `limit` of them, oldest first."""
+        query = db.query(self.model).filter(
+            Content.network_id == network_id,
+            Content.user_id == user_id,
+            Content.created_at >= start,
+            Content.created_at < end
+        ).order_by(Content.created_at.desc())
+        if limit:
+            query = query.limit(limit)
+        return query.all()[::-1]
+
+    def get_by_ids(self, db: Session, *, ids: List[Any], network_id: Any, user_id: str) -> List[Content]:
+        """Fetch several contents of one network in a single query, in the order of `ids`."""
+        if not ids:
+            return []
+        rows = db.query(self.model).filter(
+            Content.cid.in_(ids),
+            Content.network_id == network_id,
+            Content.user_id == user_id
+        ).all()
+        by_id = {str(row.cid): row for row in rows}
+        return [by_id[str(i)] for i in ids if str(i) in by_id]
+
+    def get_user_contents(self, db: Session, *, user_id: str, cids: List[Any]) -> List[Content]:
+        if not cids:
+            return []
+        return db.query(self.model).filter(Content.user_id == user_id, Content.cid.in_(cids)).all()
+
+    def iter_by_network(self, db: Session, *, network_id: int, user_id: str, batch_size: int = 200) -> Iterator[Content]:
+        """Stream a network's contents without loading them all into memory."""
+        return db.query(self.model).filter(
+            Content.network_id == network_id,
+            Content.user_id == user_id
+        ).order_by(Content.created_at).yield_per(batch_size)
+
+    def create_with_user(self, db: Session, *, obj_in: ContentCreate, user_id: str, created_at=None, commit: bool = True) -> Content:
+        # Generated here rather than by the database, so an uncommitted row is usable as is
         db_obj = Content(
+            cid=uuid4(),
             network_id=obj_in.network_id,
-            user_id=user_id
+            user_id=user_id,
+            created_at=created_at or datetime.now(timezone.utc)
         )
-        if created_at:
-            db_obj.created_at = created_at
         db_obj.set_encrypted_content(obj_in.content, user_id)
         db.add(db_obj)
+        if not commit:
+            # Caller commits several rows at once, e.g. in a unit_of_work
+            return db_obj
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -0,0 +1,65 @@
+from typing import List, Set, Tuple
+from uuid import UUID
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from crud.base import CRUDBase
+from models.data_version import DataVersion
+from models.network import Network
+from models.content import Content
+
+NETWORKS_SCOPE = "networks"
+
+
+def contents_scope(nid: UUID) -> str:
+    return f"contents:{nid}"
+
+
+class CRUDDataVersion(CRUDBase[DataVersion, DataVersion, DataVersion]):
+    def get_version(self, db: Session, *, user_id: str, scope: str) -> int:
+        version = db.query(DataVersion.version).filter(
+            DataVersion.user_id == user_id, DataVersion.scope == scope).scalar()
+        return version or 0
+
+    def bump(self, db: Session, *, user_id: str, scope: str) -> int:
+        """Atomically increment a scope's version in the current transaction and return it."""
+        stmt = insert(DataVersion).values(user_id=user_id, scope=scope, version=1)
+        return db.connection().execute(stmt.on_conflict_do_update(
+            index_elements=[DataVersion.user_id, DataVersion.scope],
+            set_={"version": DataVersion.version + 1}
+        ).returning(DataVersion.version)).scalar_one()
+
+
+data_version = CRUDDataVersion(DataVersion)
+
+
+def changed_rows(session: Session) -> List[Tuple[object, bool]]:
+    """
+    Networks and contents written by the flush in progress, with a deleted
+    flag. Meant for after_flush hooks, where primary keys are assigned but
+    new/dirty/deleted still describe the flush.
+    """
+    changed = [obj for obj in session.dirty if session.is_modified(obj)]
+    rows = [(obj, False) for obj in [*session.new, *changed]]
+    rows += [(obj, True) for obj in session.deleted]
+    return [(obj, deleted) for obj, deleted in rows if isinstance(obj, (Network, Content))]
+
+
+def _changed_scopes(session: Session) -> Set[Tuple[str, str]]:
+    scopes = set()
+    for obj, deleted in changed_rows(session):
+        if isinstance(obj, Network):
+            scopes.add((obj.user_id, NETWORKS_SCOPE))
+            if deleted:
+                # Contents go with the network through the CASCADE delete
+                scopes.add((obj.user_id, contents_scope(obj.nid)))
+        else:
+            scopes.add((obj.user_id, contents_scope(obj.network_id)))
+    return scopes
+
+
+@event.listens_for(Session, "after_flush")
+def bump_versions(session, flush_context):
+    """Bump listing versions in the same transaction as the write, so ETags can never go stale."""
+    for user_id, scope in _changed_scopes(session):
+        data_version.bump(session, user_id=user_id, scope=scope)
@@ -1,8 +1,11 @@
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from uuid import UUID, uuid4
 from sqlalchemy.orm import Session
 from crud.base import CRUDBase
 from models.network import Network
 from schemas.network import NetworkCreate, NetworkUpdate
+from core.name_index import name_index
 
 
 class CRUDNetwork(CRUDBase[Network, NetworkCreate, NetworkUpdate]):
@@ -11,31 +14,55 @@ class CRUDNetwork(CRUDBase[Network, NetworkCreate, NetworkUpdate]):
             Network.user_id == user_id).all()
         return networks
 
-    def create_with_user(self, db: Session, *, obj_in: NetworkCreate, user_id: str, created_at=None) -> Network:
-        db_obj = Network(user_id=user_id)
-        if created_at:
-            db_obj.created_at = created_at
+    def get_ids_by_user(self, db: Session, *, user_id: str) -> List[UUID]:
+        return [nid for (nid,) in db.query(Network.nid).filter(Network.user_id == user_id)]
+
+    def iter_by_user(self, db: Session, *, user_id: str, batch_size: int = 200) -> Iterator[Network]:
+        """Stream a user's networks without loading them all into memory."""
+        return db.query(self.model).filter(
+            Network.user_id == user_id).order_by(Network.created_at).yield_per(batch_size)
+
+    def create_with_user(self, db: Session, *, obj_in: NetworkCreate, user_id: str, created_at=None, commit: bool = True) -> Network:
+        # Generated here rather than by the database, so an uncommitted row is usable as is
+        db_obj = Network(nid=uuid4(), user_id=user_id,
+                         created_at=created_at or datetime.now(timezone.utc))
         db_obj.set_encrypted_name(obj_in.name, user_id)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
+        name_index.remember(user_id, db_obj.nid, db_obj.name, obj_in.name)
         return db_obj
 
     def get_user_network(self, db: Session, *, user_id: str, nid: int) -> Optional[Network]:
         return db.query(self.model).filter(Network.user_id == user_id, Network.nid == nid).first()
 
+    def get_user_networks(self, db: Session, *, user_id: str, nids: List[UUID]) -> List[Network]:
+        return db.query(self.model).filter(Network.user_id == user_id, Network.nid.in_(nids)).all()
+
     def update(self, db: Session, *, db_obj: Network, obj_in: NetworkUpdate) -> Network:
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
 
-        if "name" in update_data:
-            db_obj.set_encrypted_name(update_data["name"], db_obj.user_id)
-            # Remove name from update_data since we handled it separately
-            del update_data["name"]
+        name = update_data.pop("name", None)
+        if name is not None:
+            db_obj.set_encrypted_name(name, db_obj.user_id)
+
+        db_obj = super().update(db=db, db_obj=db_obj, obj_in=update_data)
+        if name is not None:
+            name_index.remember(db_obj.user_id, db_obj.nid, db_obj.name, name)
+        return db_obj
 
-        return super().update(db=db, db_obj=db_obj, obj_in=update_data)
+    def remove(self, db: Session, *, id: UUID) -> Network:
+        # Read the owner before the commit expires the deleted row
+        db_obj = self.get(db, id=id)
+        user_id = db_obj.user_id if db_obj else None
+        obj = super().remove(db, id=id)
+        if user_id:
+            name_index.forget(user_id, id)
+        return obj
 
 
 network = CRUDNetwork(Network)
@@ -0,0 +1,36 @@
+from typing import Optional
+from uuid import UUID
+from sqlalchemy.orm import Session
+from crud.base import CRUDBase
+from models.network_profile import NetworkProfile
+
+
+class CRUDNetworkProfile(CRUDBase[NetworkProfile, NetworkProfile, NetworkProfile]):
+    def get_user_profile(self, db: Session, *, user_id: str, network_id: UUID) -> Optional[NetworkProfile]:
+        return db.query(self.model).filter(
+            NetworkProfile.network_id == network_id,
+            NetworkProfile.user_id == user_id
+        ).first()
+
+    def save(self, db: Session, *, user_id: str, network_id: UUID, summary: str, note_count: int,
+             covered_seq: Optional[int] = None) -> NetworkProfile:
+        db_obj = self.get_user_profile(db, user_id=user_id, network_id=network_id)
+        if not db_obj:
+            db_obj = NetworkProfile(network_id=network_id, user_id=user_id)
+        db_obj.set_encrypted_summary(summary, user_id)
+        db_obj.note_count = note_count
+        if covered_seq is not None:
+            db_obj.covered_seq = covered_seq
+        db.add(db_obj)
+        db.commit()
+        return db_obj
+
+    def discard(self, db: Session, *, user_id: str, network_id: UUID) -> None:
+        db.query(self.model).filter(
+            NetworkProfile.network_id == network_id,
+            NetworkProfile.user_id == user_id
+        ).delete()
+        db.commit()
+
+
+network_profile = CRUDNetworkProfile(NetworkProfile)
@@ -0,0 +1,31 @@
+from typing import List, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from crud.base import CRUDBase
+from models.content import Content
+from models.vector_outbox import VectorOutbox
+
+
+class CRUDVectorOutbox(CRUDBase[VectorOutbox, VectorOutbox, VectorOutbox]):
+    def enqueue(self, db: Session, *, content_id: UUID, user_id: str) -> VectorOutbox:
+        """Add an entry to the caller's transaction; the caller's commit writes it."""
+        db_obj = VectorOutbox(content_id=content_id, user_id=user_id)
+        db.add(db_obj)
+        return db_obj
+
+    def pending(self, db: Session, *, after_id: int = 0, limit: int = 200) -> List[Tuple[VectorOutbox, Content]]:
+        """Oldest entries after after_id with their contents (deleted contents take their entries along)."""
+        return db.query(VectorOutbox, Content).join(
+            Content, Content.cid == VectorOutbox.content_id
+        ).filter(VectorOutbox.id > after_id).order_by(VectorOutbox.id).limit(limit).all()
+
+    def clear(self, db: Session, *, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        removed = db.query(VectorOutbox).filter(
+            VectorOutbox.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        return removed
+
+
+vector_outbox = CRUDVectorOutbox(VectorOutbox)
@@ -1,37 +1,114 @@
-from sqlalchemy import create_engine, event
+from contextlib import contextmanager
+from typing import List
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+import hashlib
 import os
+import time
+from core.metrics import record_stage
 
 # Database configuration
 SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "./database/db.sqlite")
+# Users are spread over this many SQLite files by a hash of their Firebase UID,
+# each with its own write lock; 1 keeps everything in SQLITE_DB_PATH.
+# Changing it requires tools/rebalance_shards.py while the server is stopped
+SQLITE_SHARD_COUNT = int(os.getenv("SQLITE_SHARD_COUNT", "1"))
 # Ensure the database directory exists
 os.makedirs(os.path.dirname(SQLITE_DB_PATH), exist_ok=True)
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{SQLITE_DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+if SQLITE_SHARD_COUNT < 1:
+    raise ValueError(f"SQLITE_SHARD_COUNT must be at least 1, got {SQLITE_SHARD_COUNT}")
+
+
+def shard_path(shard: int) -> str:
+    """File of a shard; shard 0 is SQLITE_DB_PATH itself, so an unsharded database stays in place"""
+    if shard == 0:
+        return SQLITE_DB_PATH
+    root, ext = os.path.splitext(SQLITE_DB_PATH)
+    return f"{root}.shard{shard}{ext}"
+
+
+def shard_for(user_id: str, shard_count: int = SQLITE_SHARD_COUNT) -> int:
+    """Shard holding all rows of a user; stable across processes, unlike hash()"""
+    digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
 
 # Enable SQLite foreign key support
 
 
-@event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Time every SQL statement for the per-stage latency metrics
+
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    record_stage("sql", time.perf_counter() - conn.info["query_start_time"].pop())
+
+
+def create_shard_engine(path: str) -> Engine:
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    event.listen(engine, "connect", set_sqlite_pragma)
+    event.listen(engine, "before_cursor_execute", start_query_timer)
+    event.listen(engine, "after_cursor_execute", record_query_time)
+    return engine
+
+
+engines: List[Engine] = [create_shard_engine(shard_path(i)) for i in range(SQLITE_SHARD_COUNT)]
+session_factories: List[sessionmaker] = [
+    sessionmaker(autocommit=False, autoflush=False, bind=engine) for engine in engines]
 Base = declarative_base()
 
-# Dependency to get database session
+
+def session_for_user(user_id: str) -> Session:
+    """New session on the user's shard, for work outside a request (background tasks, streams)"""
+    return session_factories[shard_for(user_id)]()
+
+
+def add_missing_columns(engine: Engine):
+    """
+    create_all only creates missing tables; add the columns introduced since
+    a table was created. Such columns need a server default for existing rows.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
 
 
-def get_db():
-    db = SessionLocal()
+@contextmanager
+def unit_of_work(db: Session):
+    """
+    Commit everything written in the block at once, or roll all of it back.
+    Rows created with commit=False carry client-side IDs and timestamps, and
+    stay loaded after the commit, so reading them back needs no refresh.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
-        db.close()
+        db.expire_on_commit = expire_on_commit
@@ -0,0 +1,14 @@
+from fastapi import Depends
+from core.firebase import get_current_user
+from database.db import session_for_user
+
+# Dependency to get a database session on the current user's shard.
+# Kept apart from database.db so scripts can use the engines without Firebase.
+
+
+def get_db(current_user: dict = Depends(get_current_user)):
+    db = session_for_user(current_user["uid"])
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,7 +1,14 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from api.v1.endpoints import networks, query
-from database.db import Base, engine
+from fastapi.responses import PlainTextResponse
+from api.v1.endpoints import networks, query, profiles, transfer, sync
+from database.db import Base, add_missing_columns, engines, session_factories
+from crud import change
+from core.metrics import MetricsMiddleware, render_metrics
+from core.compression import CompressionMiddleware
+from core.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from services import outbox
 
 # FastAPI app instance
 app = FastAPI(
@@ -21,12 +28,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+# Brotli/gzip compression above a size threshold, streaming-aware
+app.add_middleware(CompressionMiddleware)
+
+# On-demand request profiling, only installed when enabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Per-stage latency histograms and the Server-Timing response header
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(
     networks.router, prefix="/api/v1/networks", tags=["networks"])
 app.include_router(query.router, prefix="/api/v1", tags=["query"])
+app.include_router(transfer.router, prefix="/api/v1", tags=["transfer"])
+app.include_router(sync.router, prefix="/api/v1", tags=["sync"])
+if PROFILING_ENABLED:
+    app.include_router(
+        profiles.router, prefix="/api/v1/profiles", tags=["profiles"])
 
 # Basic health check endpoint
 
@@ -35,11 +58,26 @@ app.include_router(query.router, prefix="/api/v1", tags=["query"])
 def health_check():
     return {"status": "healthy", "message": "Service is running"}
 
+# Prometheus scrape endpoint
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Create database tables
 
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    for engine, session_factory in zip(engines, session_factories):
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns(engine)
+        # Give rows that predate the change log a sync sequence number
+        db = session_factory()
+        try:
+            change.backfill(db)
+        finally:
+            db.close()
 
 # Startup event
 
@@ -47,3 +85,5 @@ def init_db():
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # Index contents whose vector write was cut short by a crash or an outage
+    await run_in_threadpool(outbox.replay)
@@ -0,0 +1,22 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import func
+from database.db import Base
+from models.network import UUID
+
+
+class Change(Base):
+    """
+    Latest change of each network or content, ordered per user by seq.
+    Deleted rows stay as tombstones so other devices can sync the delete.
+    """
+    __tablename__ = "changes"
+
+    user_id = Column(String, primary_key=True)  # Firebase UID
+    entity_type = Column(String, primary_key=True)  # "network" or "content"
+    entity_id = Column(UUID, primary_key=True)
+    network_id = Column(UUID, nullable=True)
+    deleted = Column(Boolean, nullable=False, default=False)
+    seq = Column(Integer, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_changes_user_seq", "user_id", "seq"),)
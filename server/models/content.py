@@ -1,8 +1,9 @@
 from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy.orm import relationship
 import uuid
 from models.base import BaseModel
 from utils.encryption import encrypt, decrypt
-from models.network import UUID
+from models.network import Network, UUID
 
 
 class Content(BaseModel):
@@ -14,6 +15,9 @@ class Content(BaseModel):
         "networks.nid", ondelete="CASCADE"), nullable=False)
     user_id = Column(String, nullable=False)  # Firebase UID
 
+    # Lets one flush insert a new network before its contents
+    network = relationship(Network)
+
     def set_encrypted_content(self, content: str, user_token: str):
         """Set the content field with encryption."""
         self.content = encrypt(content, user_token)
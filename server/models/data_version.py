@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from database.db import Base
+
+
+class DataVersion(Base):
+    """Write counter per user and listing scope, used to derive ETags."""
+    __tablename__ = "data_versions"
+
+    user_id = Column(String, primary_key=True)  # Firebase UID
+    scope = Column(String, primary_key=True)  # "networks" or "contents:<nid>"
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+from models.base import BaseModel
+from models.network import UUID
+from utils.encryption import encrypt, decrypt
+
+
+class NetworkProfile(BaseModel):
+    """Rolling summary of everything noted about one network, stored encrypted."""
+    __tablename__ = "network_profiles"
+
+    network_id = Column(UUID, ForeignKey(
+        "networks.nid", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String, nullable=False)  # Firebase UID
+    summary = Column(String, nullable=False)
+    note_count = Column(Integer, nullable=False, default=0)  # Notes folded in so far
+    # The user's change sequence number the last rebuild read; deltas of
+    # writes up to it are already part of the summary
+    covered_seq = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def set_encrypted_summary(self, summary: str, user_token: str):
+        """Set the summary field with encryption."""
+        self.summary = encrypt(summary, user_token)
+
+    def get_decrypted_summary(self, user_token: str) -> str:
+        """Get the decrypted summary field."""
+        return decrypt(self.summary, user_token)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database.db import Base
+from models.content import Content
+from models.network import UUID
+
+
+class VectorOutbox(Base):
+    """
+    Content committed to SQL whose vector is not confirmed yet. Written in the
+    same transaction as the content and removed once it is indexed, so an
+    index write lost to a crash or a vector store outage is replayed later.
+    """
+    __tablename__ = "vector_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_id = Column(UUID, ForeignKey(
+        "contents.cid", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String, nullable=False)  # Firebase UID
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Lets one flush insert the content before its outbox entry
+    content = relationship(Content)
@@ -0,0 +1,50 @@
+import os
+from urllib.parse import urlparse
+import httpx
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.config import Settings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared Chroma server, e.g. http://127.0.0.1:8001. Unset means an embedded
+# PersistentClient in every process.
+CHROMA_SERVER_URL = os.getenv("CHROMA_SERVER_URL")
+# Keep-alive connections to the server per worker process
+CHROMA_SERVER_POOL_SIZE = int(os.getenv("CHROMA_SERVER_POOL_SIZE", "20"))
+CHROMA_SERVER_TIMEOUT_SECONDS = float(os.getenv("CHROMA_SERVER_TIMEOUT_SECONDS", "30"))
+
+
+def create_server_client(url: str = CHROMA_SERVER_URL) -> ClientAPI:
+    """
+    Client for a shared Chroma server, with a bounded keep-alive connection
+    pool and a request timeout instead of chromadb's unbounded defaults.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        # chromadb's HTTP client can only reach servers over TCP
+        raise ValueError(f"CHROMA_SERVER_URL must be an http(s) URL, got {url}")
+
+    ssl = parsed.scheme == "https"
+    client = chromadb.HttpClient(
+        host=parsed.hostname,
+        port=parsed.port or (443 if ssl else 80),
+        ssl=ssl,
+        settings=Settings(anonymized_telemetry=False)
+    )
+
+    # Swap in a pooled session; the client is otherwise used unchanged
+    server = client._server
+    pooled = httpx.Client(
+        headers=server._session.headers,
+        timeout=CHROMA_SERVER_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=CHROMA_SERVER_POOL_SIZE,
+            max_keepalive_connections=CHROMA_SERVER_POOL_SIZE
+        ),
+        transport=httpx.HTTPTransport(retries=1)
+    )
+    server._session.close()
+    server._session = pooled
+    return client
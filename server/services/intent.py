@@ -0,0 +1,174 @@
+"""
+Local ask/save intent classifier in front of determine_action_type.
+
+Clear-cut messages are settled by rules (a trailing question mark, a
+leading "Had coffee with..."-style verb). Other messages go through a small
+logistic regression over hashed word n-grams, trained offline with
+tools/train_intent.py. Both answer in microseconds and report a confidence;
+below INTENT_CONFIDENCE_THRESHOLD callers fall back to the LLM.
+
+Rule confidences are not fixed: training measures how often each rule
+agrees with the labels and stores that in the model file, and
+tools/eval_intent.py reports it. Without a model file the rules stay below
+any sensible threshold, so every message goes to the LLM.
+"""
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+from core.metrics import Counter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Weights written by tools/train_intent.py; without them only the rules run
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "./database/intent_model.json")
+# Local predictions at least this confident skip the LLM
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9"))
+
+INTENT_DECISIONS = Counter(
+    "hae_intent_decisions_total",
+    "Ask/save decisions by the component that made them (rule, model, llm)",
+    ["source"])
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+|\?")
+# Past-tense verbs that only open a note, never a question. Openers such as
+# "will", "is", "remind me", "list" or "just" are left to the model: "Will
+# said..." is a note and "Just wondering what..." a question.
+_SAVE_START = re.compile(
+    r"^(had|met|talked|spoke|caught up|ran into|bumped into|grabbed|went|called|"
+    r"texted|emailed|messaged|visited|saw)\b")
+
+# (name, action, test) on the lowercased, whitespace-collapsed text, in order
+RULES: List[Tuple[str, str, Callable[[str], bool]]] = [
+    ("question_mark", "ask", lambda text: text.endswith("?")),
+    ("save_verb", "save", lambda text: "?" not in text and bool(_SAVE_START.match(text))),
+]
+# Confidence of a rule no training run has measured
+UNCALIBRATED_RULE_CONFIDENCE = 0.75
+
+
+class IntentPrediction(NamedTuple):
+    action: str  # "ask" or "save"
+    confidence: float  # Probability of `action`, 0.5 to 1
+    source: str  # "rule", "model" or "prior"
+
+
+def tokenize(text: str) -> List[str]:
+    return ["<s>"] + _TOKEN_PATTERN.findall(text.lower())
+
+
+def hashed_features(text: str, n_features: int) -> List[int]:
+    """Indexes of the word unigrams and bigrams of a text, hashed into n_features buckets."""
+    tokens = tokenize(text)
+    grams = tokens[1:] + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    # crc32 is stable across processes, unlike the salted built-in hash
+    return sorted({zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams})
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def matching_rule(text: str) -> Optional[Tuple[str, str]]:
+    """(name, action) of the first rule matching a text, if any."""
+    text = normalize_text(text)
+    for name, action, test in RULES:
+        if test(text):
+            return name, action
+    return None
+
+
+def rule_agreement(examples: List[Tuple[str, str]]) -> Dict[str, Dict[str, float]]:
+    """
+    Per rule, how many labeled texts it matches and its agreement with the
+    labels, smoothed towards 1/2 so a rule seen a few times is not trusted
+    blindly: (agreeing + 1) / (matched + 2).
+    """
+    stats = {name: [0, 0] for name, _, _ in RULES}
+    for text, label in examples:
+        rule = matching_rule(text)
+        if rule:
+            stats[rule[0]][0] += 1
+            stats[rule[0]][1] += rule[1] == label
+    return {name: {"matched": matched, "confidence": round((agreeing + 1) / (matched + 2), 4)}
+            for name, (matched, agreeing) in stats.items()}
+
+
+class IntentModel:
+    """Logistic regression over hashed n-grams, predicting P(save), plus measured rule confidences."""
+
+    def __init__(self, weights: Dict[int, float], bias: float, n_features: int,
+                 rule_confidence: Optional[Dict[str, float]] = None):
+        self.weights = weights
+        self.bias = bias
+        self.n_features = n_features
+        self.rule_confidence = rule_confidence or {}
+
+    def probability(self, text: str) -> float:
+        score = self.bias + sum(self.weights.get(i, 0.0)
+                                for i in hashed_features(text, self.n_features))
+        return 1.0 / (1.0 + math.exp(-max(min(score, 30.0), -30.0)))
+
+    def to_dict(self) -> dict:
+        return {
+            "n_features": self.n_features,
+            "bias": self.bias,
+            # Only features seen in training have weights
+            "weights": {str(i): w for i, w in self.weights.items() if w},
+            "rule_confidence": self.rule_confidence,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IntentModel":
+        return cls({int(i): w for i, w in data["weights"].items()},
+                   data["bias"], data["n_features"], data.get("rule_confidence"))
+
+
+def load_model(path: str = INTENT_MODEL_PATH) -> Optional[IntentModel]:
+    try:
+        with open(path) as f:
+            model = IntentModel.from_dict(json.load(f))
+        logger.info(f"Loaded intent model from {path}")
+        return model
+    except FileNotFoundError:
+        logger.info(f"No intent model at {path}, using rules only")
+        return None
+    except Exception as e:
+        logger.error(f"Failed to load intent model from {path}: {str(e)}")
+        return None
+
+
+_model = load_model()
+
+
+def get_intent_model() -> Optional[IntentModel]:
+    return _model
+
+
+def rule_intent(text: str, model: Optional[IntentModel] = None) -> Optional[IntentPrediction]:
+    rule = matching_rule(text)
+    if rule is None:
+        return None
+    name, action = rule
+    confidence = model.rule_confidence.get(name) if model else None
+    return IntentPrediction(action, confidence or UNCALIBRATED_RULE_CONFIDENCE, "rule")
+
+
+def predict_intent(text: str, model: Optional[IntentModel] = None) -> IntentPrediction:
+    """Best local guess at a message's intent; compare its confidence to the threshold."""
+    model = model or _model
+    rule = rule_intent(text, model)
+    if model is None:
+        return rule or IntentPrediction("ask", 0.5, "prior")
+    p_save = model.probability(text)
+    prediction = IntentPrediction("save" if p_save >= 0.5 else "ask", max(p_save, 1.0 - p_save), "model")
+    # A rule stands unless the model is more sure
+    if rule and rule.confidence >= prediction.confidence:
+        return rule
+    return prediction
@@ -1,10 +1,14 @@
 import os
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 import json
 import google.generativeai as genai
 from pydantic import BaseModel
 import logging
+from config import BATCH_EXTRACT_CHUNK_SIZE, PROFILE_MAX_WORDS
+from core.metrics import timed, FALLBACKS
+from core.singleflight import coalesce
+from services.llm_scheduler import llm_scheduler, request_options, LLMUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +30,15 @@ class Message(BaseModel):
     role: str
 
 
+def with_timestamp(text: str, created_at: datetime) -> str:
+    """Prefix a memory with its creation time unless it already starts with one."""
+    if text.startswith("[20"):
+        return text
+    return f"{created_at.strftime('[%Y-%m-%d %H:%M:%S]')} {text}"
+
+
+@coalesce("llm")
+@timed("llm", by_function=True)
 def extract_information(input_text: str) -> ExtractedInfo:
     try:
         model = genai.GenerativeModel('gemini-1.5-flash')
@@ -55,7 +68,8 @@ def extract_information(input_text: str) -> ExtractedInfo:
             - Do not include markdown formatting or code blocks
         """
 
-        response = model.generate_content(prompt)
+        response = llm_scheduler.call(
+            "extract_information", model.generate_content, prompt, request_options=request_options())
         text = response.text.strip()
 
         # Remove markdown code block if present
@@ -82,6 +96,8 @@ def extract_information(input_text: str) -> ExtractedInfo:
 
         return extracted_info
 
+    except LLMUnavailableError:
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse Gemini response as JSON: {
                      str(e)}\nRaw text: {text}")
@@ -92,6 +108,77 @@ def extract_information(input_text: str) -> ExtractedInfo:
         raise Exception(f"Failed to process content: {str(e)}")
 
 
+def _extract_batch_chunk(input_texts: List[str]) -> List[Optional[ExtractedInfo]]:
+    model = genai.GenerativeModel('gemini-1.5-flash')
+    model.temperature = 0
+
+    interactions = "\n".join(
+        f"[{i}] {' '.join(text.split())}" for i, text in enumerate(input_texts))
+
+    prompt = f"""
+        You are a personal CRM assistant. For each numbered interaction below, identify the main person and what happened.
+
+        Interactions:
+{interactions}
+
+        Respond ONLY with a JSON array containing exactly one object per interaction, in this format:
+        [{{ "index": 0, "content": "A concise summary focusing on what happened with this person", "name": "The person's full name" }}]
+
+        Rules:
+        - "index" is the number in brackets before the interaction
+        - If multiple people are mentioned, focus on the most significant person
+        - Extract the most complete version of their name
+        - The content should be a brief, clear summary (aim for 1-2 lines)
+        - Include key facts but omit unnecessary details
+        - Return ONLY the JSON, no other text
+        - Do not include markdown formatting or code blocks
+    """
+
+    response = llm_scheduler.call(
+        "extract_information_batch", model.generate_content, prompt, request_options=request_options())
+    text = response.text.strip()
+
+    # Remove markdown code block and "json" language identifier if present
+    if text.startswith("```") and text.endswith("```"):
+        lines = text.split("\n")
+        if len(lines) > 2:
+            text = "\n".join(lines[1:-1])
+    text = text.replace("```json", "").replace("```", "").strip()
+
+    results: List[Optional[ExtractedInfo]] = [None] * len(input_texts)
+    for item in json.loads(text):
+        try:
+            index = int(item["index"])
+            extracted_info = ExtractedInfo(
+                content=item["content"], name=item["name"])
+        except (KeyError, TypeError, ValueError):
+            logger.error(f"Invalid item in batch extraction response: {item}")
+            continue
+        if 0 <= index < len(results) and extracted_info.name and extracted_info.content:
+            results[index] = extracted_info
+    return results
+
+
+@timed("llm", by_function=True)
+def extract_information_batch(input_texts: List[str]) -> List[Optional[ExtractedInfo]]:
+    """
+    Extract name and summary for many interactions with one structured call
+    per BATCH_EXTRACT_CHUNK_SIZE interactions.
+    Returns one entry per input, None where the model gave no usable answer.
+    """
+    results: List[Optional[ExtractedInfo]] = []
+    for start in range(0, len(input_texts), BATCH_EXTRACT_CHUNK_SIZE):
+        chunk = input_texts[start:start + BATCH_EXTRACT_CHUNK_SIZE]
+        try:
+            results.extend(_extract_batch_chunk(chunk))
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error extracting batch of {len(chunk)} interactions: {str(e)}")
+            results.extend([None] * len(chunk))
+    return results
+
+
 # Split into two constants - static instructions and dynamic content template
 STATIC_INSTRUCTIONS = """
     You are a knowledgeable assistant helping recall information about people from my personal memories.
@@ -123,13 +210,20 @@ MEMORY_CONTEXT_TEMPLATE = """
     {content}
 """
 
+PROFILE_CONTEXT_TEMPLATE = """
+    Profile of {name}, summarizing all my memories so far:
+    {profile}
+"""
+
 
-def answer_question(name: str, question: str, messages: List[Message], content_array: List[str]) -> str:
+@coalesce("llm")
+@timed("llm", by_function=True)
+def answer_question(name: str, question: str, messages: List[Message], content_array: List[str], profile: Optional[str] = None) -> str:
     try:
         # Validate inputs
         if not question or not question.strip():
             raise ValueError("Question cannot be empty")
-        if not content_array:
+        if not content_array and not profile:
             raise ValueError("Content array cannot be empty")
         if not name:
             raise ValueError("Name cannot be empty")
@@ -139,7 +233,7 @@ def answer_question(name: str, question: str, messages: List[Message], content_a
 
         # Combine the content array into a single string
         content = "\n".join(content_array)
-        if not content.strip():
+        if content_array and not content.strip():
             raise ValueError("Content cannot be empty after joining")
 
         # Create chat instance
@@ -147,7 +241,9 @@ def answer_question(name: str, question: str, messages: List[Message], content_a
 
         # Send static instructions first if this is a new conversation
         if not messages:
-            response = chat.send_message(STATIC_INSTRUCTIONS)
+            response = llm_scheduler.call(
+                "answer_question", chat.send_message, STATIC_INSTRUCTIONS,
+                request_options=request_options(), idempotent=False)
             if not response.text or "UNDERSTOOD" not in response.text.upper():
                 logger.error(f"Model did not acknowledge instructions properly: {
                              response.text}")
@@ -159,7 +255,12 @@ def answer_question(name: str, question: str, messages: List[Message], content_a
             date=datetime.now().strftime('%B %d, %Y'),
             content=content
         )
-        context_response = chat.send_message(context)
+        if profile:
+            context = PROFILE_CONTEXT_TEMPLATE.format(
+                name=name, profile=profile) + context
+        context_response = llm_scheduler.call(
+            "answer_question", chat.send_message, context,
+            request_options=request_options(), idempotent=False)
         if not context_response.text:
             logger.error("Empty response when sending context")
             raise ValueError("Failed to process context")
@@ -169,10 +270,14 @@ def answer_question(name: str, question: str, messages: List[Message], content_a
             for message in messages:
                 if not message.content.strip():
                     continue  # Skip empty messages
-                chat.send_message(message.content)
+                llm_scheduler.call(
+                    "answer_question", chat.send_message, message.content,
+                    request_options=request_options(), idempotent=False)
 
         # Finally send the current question and get response
-        response = chat.send_message(question)
+        response = llm_scheduler.call(
+            "answer_question", chat.send_message, question,
+            request_options=request_options(), idempotent=False)
         if not response or not response.text or not response.text.strip():
             logger.error(
                 f"Empty response from Gemini for question about {name}")
@@ -180,12 +285,16 @@ def answer_question(name: str, question: str, messages: List[Message], content_a
 
         return response.text.strip()
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error answering question about {name}: {str(e)}\nQuestion: {
                      question}\nContent array length: {len(content_array)}")
         raise Exception(f"Failed to process query: {str(e)}")
 
 
+@coalesce("llm")
+@timed("llm", by_function=True)
 def summarize_content(input_text: str) -> str:
     try:
         model = genai.GenerativeModel('gemini-1.5-flash')
@@ -204,7 +313,8 @@ def summarize_content(input_text: str) -> str:
             - Return ONLY the summary text, no other text or formatting
         """
 
-        response = model.generate_content(prompt)
+        response = llm_scheduler.call(
+            "summarize_content", model.generate_content, prompt, request_options=request_options())
         summary = response.text.strip()
 
         # Remove any markdown formatting if present
@@ -217,12 +327,69 @@ def summarize_content(input_text: str) -> str:
 
         return summary.strip()
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error summarizing content: {
                      str(e)}\nInput text: {input_text}")
         raise Exception(f"Failed to summarize content: {str(e)}")
 
 
+@timed("llm", by_function=True)
+def update_profile_summary(name: str, summary: str, added: List[str], removed: List[str]) -> str:
+    """
+    Fold added and removed notes into an existing profile summary, so the
+    profile stays current without re-reading a network's whole history.
+    """
+    try:
+        model = genai.GenerativeModel('gemini-1.5-flash')
+        model.temperature = 0
+
+        new_notes = "\n".join(added) or "(none)"
+        removed_notes = "\n".join(removed) or "(none)"
+        prompt = f"""
+            You are a personal CRM assistant. Keep a compact profile of {name} up to date.
+
+            Current profile:
+            {summary or "(empty)"}
+
+            New notes:
+            {new_notes}
+
+            Notes that were removed or replaced:
+            {removed_notes}
+
+            Rules:
+            - Fold the facts from the new notes into the profile
+            - Drop facts that only came from removed or replaced notes
+            - When facts conflict, keep the most recent one according to the timestamps
+            - Keep stable facts (work, family, places, preferences) and notable events with their dates
+            - Keep the profile under {PROFILE_MAX_WORDS} words
+            - Return ONLY the profile text, no other text or formatting
+        """
+
+        response = llm_scheduler.call(
+            "update_profile_summary", model.generate_content, prompt, request_options=request_options())
+        profile = response.text.strip()
+
+        # Remove any markdown formatting if present
+        if profile.startswith("```") and profile.endswith("```"):
+            profile = profile.replace("```", "")
+
+        profile = profile.strip()
+        if not profile:
+            raise ValueError("Empty profile summary")
+        return profile
+
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating profile summary of {name}: {str(e)}")
+        raise Exception(f"Failed to update profile summary: {str(e)}")
+
+
+@coalesce("llm")
+@timed("llm", by_function=True)
 def determine_action_type(input_text: str) -> str:
     try:
         model = genai.GenerativeModel('gemini-1.5-flash')
@@ -244,7 +411,8 @@ def determine_action_type(input_text: str) -> str:
             {{"action": "ask"}} or {{"action": "save"}}
         """
 
-        response = model.generate_content(prompt)
+        response = llm_scheduler.call(
+            "determine_action_type", model.generate_content, prompt, request_options=request_options())
         text = response.text.strip()
 
         # Remove any markdown formatting if present
@@ -265,15 +433,20 @@ def determine_action_type(input_text: str) -> str:
                 return action
             else:
                 logger.error(f"Invalid action type in response: {text}")
+                FALLBACKS.inc(kind="action_type_default")
                 return "ask"  # Default to ask if response is invalid
         except json.JSONDecodeError:
             logger.error(f"Failed to parse response as JSON: {text}")
-            logger.print(f"Defaulting to 'ask' for text: {
-                         input_text[:100]}...")
+            logger.info(f"Defaulting to 'ask' for text: {
+                        input_text[:100]}...")
+            FALLBACKS.inc(kind="action_type_default")
             return "ask"  # Default to ask if JSON parsing fails
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         logger.error(f"Error determining action type: {
                      str(e)}\nInput text: {input_text}")
         logger.info(f"Defaulting to 'ask' for text: {input_text[:100]}...")
+        FALLBACKS.inc(kind="action_type_default")
         return "ask"  # Default to ask on error
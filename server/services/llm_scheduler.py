@@ -0,0 +1,191 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict
+import logging
+from dotenv import load_dotenv
+from core.metrics import Counter, Gauge
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of Gemini calls in flight from this process
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+# How long a call may wait for a free slot before it is rejected
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+# Per-attempt timeout, also passed to the client as the request deadline
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Hedging: fire a duplicate request once a call outlives the observed p95
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# HTTP status codes worth retrying: quota exhaustion and server-side failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Of those, the ones returned before the model ran the request
+REJECTED_STATUS_CODES = {429}
+
+LLM_IN_FLIGHT = Gauge(
+    "hae_llm_in_flight", "Gemini calls currently running")
+LLM_QUEUED = Gauge(
+    "hae_llm_queued", "Gemini calls waiting for a free slot")
+LLM_RETRIES = Counter(
+    "hae_llm_retries_total", "Gemini calls retried after a transient error", ["function"])
+LLM_HEDGES = Counter(
+    "hae_llm_hedges_total", "Hedged duplicate Gemini calls started", ["function"])
+LLM_REJECTIONS = Counter(
+    "hae_llm_rejections_total", "Gemini calls rejected because no slot freed up in time", ["function"])
+
+
+class LLMUnavailableError(Exception):
+    """The LLM could not be reached within the queueing and retry budget."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """Quota, 5xx and timeout errors are transient; everything else is not."""
+    if isinstance(error, TimeoutError):
+        return True
+    # google.api_core exceptions expose the HTTP status as `code`
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+def was_rejected(error: Exception) -> bool:
+    """
+    The request was refused up front, so sending it again cannot apply it
+    twice. A timeout or 5xx may come after the model already processed it.
+    """
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in REJECTED_STATUS_CODES
+
+
+class LLMScheduler:
+    """
+    Shared outbound scheduler for Gemini calls.
+    Caps concurrency, applies per-call timeouts, retries transient failures
+    with jittered exponential backoff and optionally hedges slow calls.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+        call_timeout: float = LLM_CALL_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        hedge_enabled: bool = LLM_HEDGE_ENABLED
+    ):
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.hedge_enabled = hedge_enabled
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        # Room for abandoned (timed-out) attempts to finish in the background
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight * 2, thread_name_prefix="llm")
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._latency_lock = threading.Lock()
+
+    def _record_latency(self, name: str, seconds: float):
+        with self._latency_lock:
+            self._latencies.setdefault(name, deque(maxlen=200)).append(seconds)
+
+    def hedge_delay(self, name: str) -> float:
+        """Observed latency percentile for `name`, or 0 when too few samples."""
+        with self._latency_lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return 0.0
+        index = min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE / 100))
+        return samples[index]
+
+    def _submit(self, fn: Callable, args, kwargs) -> Future:
+        """Run one attempt; its slot is released when the attempt really ends."""
+        LLM_IN_FLIGHT.inc()
+        future = self._executor.submit(fn, *args, **kwargs)
+
+        def release(_):
+            LLM_IN_FLIGHT.dec()
+            self._slots.release()
+        future.add_done_callback(release)
+        return future
+
+    def _attempt(self, name: str, fn: Callable, args, kwargs, hedge: bool) -> Any:
+        LLM_QUEUED.inc()
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            LLM_QUEUED.dec()
+        if not acquired:
+            LLM_REJECTIONS.inc(function=name)
+            raise LLMUnavailableError(f"LLM capacity exhausted for {name}")
+
+        start = time.perf_counter()
+        futures = [self._submit(fn, args, kwargs)]
+        deadline = start + self.call_timeout
+
+        delay = self.hedge_delay(name) if hedge and self.hedge_enabled else 0.0
+        if delay and delay < self.call_timeout:
+            done, _ = wait(futures, timeout=delay)
+            # Only hedge when it does not take a slot from queued work
+            if not done and self._slots.acquire(blocking=False):
+                LLM_HEDGES.inc(function=name)
+                futures.append(self._submit(fn, args, kwargs))
+
+        while futures:
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.perf_counter()),
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{name} timed out after {self.call_timeout}s")
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None or not futures:
+                    result = future.result()
+                    self._record_latency(name, time.perf_counter() - start)
+                    return result
+        raise TimeoutError(f"{name} timed out after {self.call_timeout}s")
+
+    def call(self, name: str, fn: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+        """
+        Call `fn(*args, **kwargs)` under the scheduler's policies.
+        Pass idempotent=False for calls that are not safe to repeat (e.g.
+        stateful chat sends): they are never hedged and only retried when
+        the previous attempt was rejected before it ran.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._attempt(name, fn, args, kwargs, hedge=idempotent)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                retry = is_retryable(e) and (idempotent or was_rejected(e))
+                if attempt >= self.max_retries or not retry:
+                    if is_retryable(e):
+                        raise LLMUnavailableError(
+                            f"{name} failed after {attempt + 1} attempts: {str(e)}") from e
+                    raise
+                # Full jitter exponential backoff
+                backoff = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS,
+                                                LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                logger.warning(f"Retrying {name} in {backoff:.2f}s after error: {str(e)}")
+                LLM_RETRIES.inc(function=name)
+                time.sleep(backoff)
+
+
+# Shared scheduler for all Gemini calls in this process
+llm_scheduler = LLMScheduler()
+
+
+def request_options() -> dict:
+    """Per-request options passed to google.generativeai calls."""
+    return {"timeout": LLM_CALL_TIMEOUT_SECONDS}
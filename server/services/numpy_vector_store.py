@@ -0,0 +1,438 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import logging
+from uuid import UUID
+import numpy as np
+from dotenv import load_dotenv
+from config import N_RESULTS, CROSS_NETWORK_N_RESULTS
+from core.metrics import track
+from services.vector_store import VectorStore, create_embedding_function
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Storage precision of new vector files: float32, float16 or int8 (scalar-quantized)
+NUMPY_VECTOR_DTYPE = os.getenv("NUMPY_VECTOR_DTYPE", "float32")
+# Keep a float32 copy on disk and re-rank the top candidates with it
+NUMPY_VECTOR_RESCORE = os.getenv("NUMPY_VECTOR_RESCORE", "false").lower() == "true"
+# Candidates re-ranked per query, as a multiple of N_RESULTS
+NUMPY_VECTOR_RESCORE_FACTOR = int(os.getenv("NUMPY_VECTOR_RESCORE_FACTOR", "4"))
+# "l2" (squared euclidean, Chroma's default space) or "cosine"
+NUMPY_VECTOR_METRIC = os.getenv("NUMPY_VECTOR_METRIC", "l2")
+# Networks whose memory maps are kept open per process
+NUMPY_VECTOR_MAX_OPEN = int(os.getenv("NUMPY_VECTOR_MAX_OPEN", "1000"))
+
+_META_FILE = "meta.json"
+_LOCK_FILE = ".lock"
+_DTYPES = ("float32", "float16", "int8")
+
+# meta.json key -> (file prefix, dtype); "file" holds rows in the store's dtype
+_COMPONENTS = {
+    "file": ("vectors", None),
+    "scales_file": ("scales", "float32"),
+    "full_file": ("full", "float32"),
+}
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization; returns codes and one scale per row."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class _Segment:
+    """Immutable snapshot of one network's vectors; writers replace it, never mutate it."""
+    __slots__ = ("stamp", "vectors", "scales", "full", "sq_norms", "ids", "metadatas", "created_ts")
+
+    def __init__(self, stamp, components: Dict[str, np.ndarray], ids: List[str], metadatas: List[dict]):
+        self.stamp = stamp
+        self.vectors = components["file"]
+        self.scales = components.get("scales_file")
+        self.full = components.get("full_file")
+        self.ids = ids
+        self.metadatas = metadatas
+        # Rows without a timestamp never match a time range
+        self.created_ts = np.array([meta.get("created_at_ts", np.nan) for meta in metadatas],
+                                   dtype=np.float64)
+        as_float = np.asarray(self.vectors, dtype=np.float32)
+        self.sq_norms = np.einsum("ij,ij->i", as_float, as_float)
+        if self.scales is not None:
+            self.sq_norms *= np.square(self.scales)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact-search backend keeping one contiguous matrix per network in a
+    memory-mapped file, so a query is a single matrix-vector product over
+    that network's rows instead of a filtered walk of a global HNSW index.
+
+    Layout per network directory: vectors-<generation>.bin holding rows of
+    `dtype`, for int8 a scales-<generation>.bin with one float32 scale per
+    row, optionally a full-<generation>.bin float32 copy used only to re-rank
+    candidates, and meta.json naming the current files, row count, document
+    IDs and metadata. Appends write rows past the end and then replace meta.json;
+    deletes write a compacted new generation. Readers holding an old snapshot
+    are never affected, and other processes notice changes through the
+    meta.json stat.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dtype: str = NUMPY_VECTOR_DTYPE,
+        metric: str = NUMPY_VECTOR_METRIC,
+        max_open: int = NUMPY_VECTOR_MAX_OPEN,
+        rescore: bool = NUMPY_VECTOR_RESCORE,
+        rescore_factor: int = NUMPY_VECTOR_RESCORE_FACTOR
+    ):
+        try:
+            if dtype not in _DTYPES:
+                raise ValueError(f"Unsupported NUMPY_VECTOR_DTYPE: {dtype}")
+            if metric not in ("l2", "cosine"):
+                raise ValueError(f"Unsupported NUMPY_VECTOR_METRIC: {metric}")
+            self.directory = directory
+            self.dtype = dtype
+            self.metric = metric
+            self.max_open = max_open
+            # A float32 store is already full precision
+            self.rescore = rescore and dtype != "float32"
+            self.rescore_factor = rescore_factor
+            os.makedirs(directory, exist_ok=True)
+            logger.info(f"Initializing NumPy vector store in {directory} ({dtype}, {metric})")
+
+            self.embedding_function = create_embedding_function()
+            self._segments: "OrderedDict[str, _Segment]" = OrderedDict()
+            self._segments_lock = threading.Lock()
+            self._write_locks: Dict[str, threading.Lock] = {}
+
+        except Exception as e:
+            logger.error(f"Failed to initialize NumPy vector store: {str(e)}")
+            raise
+
+    # Storage
+
+    def _network_dir(self, network_id) -> str:
+        return os.path.join(self.directory, str(UUID(str(network_id))))
+
+    @contextmanager
+    def _write_lock(self, network_id: str):
+        """Serialize writers of one network across threads and processes."""
+        with self._segments_lock:
+            lock = self._write_locks.setdefault(network_id, threading.Lock())
+        with lock:
+            path = self._network_dir(network_id)
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, _LOCK_FILE), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield path
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, _META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, path: str, meta: dict):
+        tmp = os.path.join(path, f".{_META_FILE}.{uuid.uuid4().hex}")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, _META_FILE))
+
+    def _segment(self, network_id) -> Optional[_Segment]:
+        """Current snapshot of a network, reopened only when meta.json changed."""
+        key = str(network_id)
+        path = self._network_dir(key)
+        try:
+            st = os.stat(os.path.join(path, _META_FILE))
+        except FileNotFoundError:
+            with self._segments_lock:
+                self._segments.pop(key, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        with self._segments_lock:
+            segment = self._segments.get(key)
+            if segment is not None and segment.stamp == stamp:
+                self._segments.move_to_end(key)
+                return segment
+
+        meta = self._read_meta(path)
+        if meta is None:
+            return None
+        components = {}
+        for component, (_, dtype) in _COMPONENTS.items():
+            if component not in meta:
+                continue
+            dtype = dtype or meta["dtype"]
+            shape = (meta["count"],) if component == "scales_file" else (meta["count"], meta["dim"])
+            if meta["count"]:
+                components[component] = np.memmap(os.path.join(path, meta[component]), dtype=dtype,
+                                                  mode="r", shape=shape)
+            else:
+                components[component] = np.empty(shape, dtype=dtype)
+        segment = _Segment(stamp, components, meta["ids"], meta["metadatas"])
+
+        with self._segments_lock:
+            self._segments[key] = segment
+            self._segments.move_to_end(key)
+            while len(self._segments) > self.max_open:
+                self._segments.popitem(last=False)
+        return segment
+
+    def _encode(self, vectors: np.ndarray, dtype: str, full: bool) -> Dict[str, np.ndarray]:
+        """Split float32 rows into the on-disk components of a layout."""
+        if dtype == "int8":
+            codes, scales = quantize_int8(vectors)
+            components = {"file": codes, "scales_file": scales}
+        else:
+            components = {"file": np.ascontiguousarray(vectors, dtype=dtype)}
+        if full:
+            components["full_file"] = np.ascontiguousarray(vectors, dtype=np.float32)
+        return components
+
+    def _rewrite(self, path: str, meta: Optional[dict], vectors: np.ndarray, ids: List[str], metadatas: List[dict]):
+        """Write a compacted new generation in the configured layout and switch meta.json to it."""
+        generation = uuid.uuid4().hex
+        new_meta = {
+            "dtype": self.dtype,
+            "dim": int(vectors.shape[1]),
+            "count": len(ids),
+            "ids": ids,
+            "metadatas": metadatas
+        }
+        for key, rows in self._encode(vectors, self.dtype, self.rescore).items():
+            file_name = f"{_COMPONENTS[key][0]}-{generation}.bin"
+            rows.tofile(os.path.join(path, file_name))
+            new_meta[key] = file_name
+        self._write_meta(path, new_meta)
+        if meta is not None:
+            # Open memory maps keep the old inodes alive until they are dropped
+            for key in _COMPONENTS:
+                if key in meta:
+                    os.remove(os.path.join(path, meta[key]))
+
+    def _add_embeddings(self, document_ids: List[str], embeddings: List[List[float]], metadata: List[dict]):
+        by_network: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadata):
+            by_network.setdefault(meta["network_id"], []).append(i)
+
+        for network_id, rows in by_network.items():
+            new_ids = [str(document_ids[i]) for i in rows]
+            new_meta = [metadata[i] for i in rows]
+            new_vectors = np.asarray([embeddings[i] for i in rows], dtype=np.float32)
+
+            with self._write_lock(network_id) as path:
+                meta = self._read_meta(path)
+                if meta is not None and meta["count"] and meta["dim"] != new_vectors.shape[1]:
+                    raise ValueError(f"Embedding dimension {new_vectors.shape[1]} does not match {meta['dim']}")
+
+                replaced = meta is not None and not set(new_ids).isdisjoint(meta["ids"])
+                if meta is None or not meta["count"] or replaced:
+                    # Re-adding an ID replaces it, as an upsert would
+                    old_vectors, old_ids, old_meta = self._existing_rows(path, meta, drop=set(new_ids))
+                    self._rewrite(path, meta,
+                                  np.concatenate([old_vectors, new_vectors]) if len(old_ids) else new_vectors,
+                                  old_ids + new_ids, old_meta + new_meta)
+                    continue
+
+                # Plain append in the network's existing layout; rows past the
+                # old count are invisible until meta.json is replaced. Cut off
+                # rows an interrupted append left behind, so new rows start
+                # right after the last published one
+                encoded = self._encode(new_vectors, meta["dtype"], "full_file" in meta)
+                for key, rows in encoded.items():
+                    with open(os.path.join(path, meta[key]), "r+b") as f:
+                        f.truncate(meta["count"] * (rows.nbytes // len(rows)))
+                        f.seek(0, os.SEEK_END)
+                        f.write(rows.tobytes())
+                self._write_meta(path, {
+                    **meta,
+                    "count": meta["count"] + len(new_ids),
+                    "ids": meta["ids"] + new_ids,
+                    "metadatas": meta["metadatas"] + new_meta
+                })
+
+    def _existing_rows(self, path: str, meta: Optional[dict], drop=frozenset()):
+        if meta is None or not meta["count"]:
+            return np.empty((0, meta["dim"] if meta else 0), dtype=np.float32), [], []
+        vectors = self._read_rows(path, meta)
+        keep = [i for i, doc_id in enumerate(meta["ids"]) if doc_id not in drop]
+        return (vectors[keep],
+                [meta["ids"][i] for i in keep],
+                [meta["metadatas"][i] for i in keep])
+
+    def _read_rows(self, path: str, meta: dict) -> np.ndarray:
+        """All rows as float32, from the full-precision copy when there is one."""
+        def read(key, dtype):
+            return np.fromfile(os.path.join(path, meta[key]), dtype=dtype,
+                               count=meta["count"] * meta["dim"]).reshape(meta["count"], meta["dim"])
+
+        if "full_file" in meta:
+            return read("full_file", np.float32)
+        vectors = read("file", meta["dtype"]).astype(np.float32)
+        if "scales_file" in meta:
+            # Requantizing dequantized rows gives back the same codes
+            scales = np.fromfile(os.path.join(path, meta["scales_file"]), dtype=np.float32,
+                                 count=meta["count"])
+            vectors *= scales[:, None]
+        return vectors
+
+    # Search
+
+    def _distances(self, dots: np.ndarray, sq_norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.metric == "cosine":
+            denominator = np.sqrt(sq_norms) * np.linalg.norm(query)
+            return 1.0 - dots / np.maximum(denominator, 1e-12)
+        return np.maximum(sq_norms - 2.0 * dots + query @ query, 0.0)
+
+
+    def _top(self, segment: _Segment, query: np.ndarray, k: int,
+             created_between: Optional[Tuple[float, float]] = None) -> List[Tuple[float, dict]]:
+        """
+        Best k rows of a segment as (distance, metadata), closest first. With
+        a full-precision copy, the best candidates by quantized distance are
+        re-ranked on exact distances before the top rows are taken. Rows
+        outside created_between are excluded by giving them infinite distance.
+        """
+        dots = np.asarray(segment.vectors @ query, dtype=np.float32)
+        if segment.scales is not None:
+            dots *= segment.scales
+        distances = self._distances(dots, segment.sq_norms, query)
+
+        n_rows = len(segment.ids)
+        if created_between:
+            inside = (segment.created_ts >= created_between[0]) & (segment.created_ts < created_between[1])
+            n_rows = int(inside.sum())
+            if not n_rows:
+                return []
+            distances = np.where(inside, distances, np.float32(np.inf))
+        k = min(k, n_rows)
+        if self.rescore and segment.full is not None:
+            n_candidates = min(n_rows, k * self.rescore_factor)
+            candidates = np.sort(np.argpartition(distances, n_candidates - 1)[:n_candidates])
+            exact = np.asarray(segment.full[candidates], dtype=np.float32)
+            distances = distances.copy()
+            distances[candidates] = self._distances(
+                exact @ query, np.einsum("ij,ij->i", exact, exact), query)
+            top = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        else:
+            top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(float(distances[i]), segment.metadatas[i]) for i in top]
+
+    @staticmethod
+    def _documents(hits: List[Tuple[float, dict]], min_relevance_score: float) -> List[dict]:
+        documents = []
+        for distance, metadata in hits:
+            # Same scoring as the Chroma backend
+            relevance_score = 1 / (1 + distance)
+            if relevance_score >= min_relevance_score:
+                documents.append({
+                    "metadata": metadata,
+                    "relevance_score": relevance_score
+                })
+        return documents
+
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        network_id: UUID,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """Top N_RESULTS of a network by brute force over its matrix"""
+        with track("vector_query"):
+            segment = self._segment(network_id)
+            if segment is None or not segment.ids:
+                return []
+            hits = self._top(segment, np.asarray(query_embedding, dtype=np.float32),
+                             N_RESULTS, created_between)
+        return self._documents(hits, min_relevance_score)
+
+    def query_user_by_embedding(
+        self,
+        query_embedding: List[float],
+        user_id: str,
+        network_ids: Optional[List[UUID]] = None,
+        n_results: int = CROSS_NETWORK_N_RESULTS,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """
+        Top n_results across a user's networks, merging each network's best
+        rows. Without network_ids every network in the store is scanned.
+        """
+        if network_ids is None:
+            network_ids = [name for name in os.listdir(self.directory)
+                           if os.path.isdir(os.path.join(self.directory, name))]
+        query = np.asarray(query_embedding, dtype=np.float32)
+        hits = []
+        with track("vector_query"):
+            for network_id in network_ids:
+                segment = self._segment(network_id)
+                if segment is None or not segment.ids:
+                    continue
+                hits += [(distance, metadata) for distance, metadata in self._top(segment, query, n_results, created_between)
+                         if metadata.get("user_id") == user_id]
+            hits.sort(key=lambda hit: hit[0])
+        return self._documents(hits[:n_results], min_relevance_score)
+
+    # Deletes
+
+    def delete_network_documents(self, network_id: UUID) -> int:
+        """Delete all documents for a specific network, returning how many were removed"""
+        try:
+            key = str(network_id)
+            with self._write_lock(key) as path:
+                meta = self._read_meta(path)
+                count = meta["count"] if meta else 0
+                if meta is not None:
+                    os.remove(os.path.join(path, _META_FILE))
+            shutil.rmtree(path, ignore_errors=True)
+            with self._segments_lock:
+                self._segments.pop(key, None)
+                self._write_locks.pop(key, None)
+            logger.info(f"Deleted {count} documents for network {network_id} from vector store")
+            return count
+
+        except Exception as e:
+            logger.error(f"Error deleting documents from vector store: {str(e)}")
+            raise
+
+    def delete_content_documents(self, network_id: UUID, content_ids: List[UUID]) -> int:
+        """Delete the documents of specific contents, returning how many were removed"""
+        try:
+            targets = {str(cid) for cid in content_ids}
+            if not os.path.exists(os.path.join(self._network_dir(network_id), _META_FILE)):
+                return 0
+            with self._write_lock(str(network_id)) as path:
+                meta = self._read_meta(path)
+                if meta is None:
+                    return 0
+                drop = {doc_id for doc_id, m in zip(meta["ids"], meta["metadatas"])
+                        if m.get("content_id") in targets}
+                if drop:
+                    vectors, ids, metadatas = self._existing_rows(path, meta, drop=drop)
+                    self._rewrite(path, meta, vectors if len(ids) else
+                                  np.empty((0, meta["dim"]), dtype=np.float32), ids, metadatas)
+            logger.info(f"Deleted {len(drop)} documents for contents {
+                        content_ids} from vector store")
+            return len(drop)
+
+        except Exception as e:
+            logger.error(f"Error deleting documents from vector store: {str(e)}")
+            raise
@@ -0,0 +1,90 @@
+"""
+Transactional outbox for vector index writes.
+
+Save flows add a vector_outbox entry for every new content in the same
+commit as the content itself, then index right after the commit. Entries
+are cleared once the vector store has the content; whatever is left (the
+vector store was down, the process died in between) is replayed on startup.
+"""
+import logging
+from typing import List
+from fastapi import BackgroundTasks
+from config import OUTBOX_REPLAY_BATCH_SIZE
+from crud import vector_outbox
+from database.db import session_factories, session_for_user
+from core.metrics import Counter, VECTOR_STORE_ERRORS
+from core.vector_store import get_vector_store
+from models.content import Content
+from models.vector_outbox import VectorOutbox
+from utils.temporal import to_timestamp
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENTRIES = Counter(
+    "hae_vector_outbox_total",
+    "Vector outbox entries by outcome (indexed, deferred, replayed)",
+    ["outcome"])
+
+
+def content_metadata(db_content: Content) -> dict:
+    """Vector store metadata of a content"""
+    return {
+        "network_id": db_content.network_id,
+        "content_id": db_content.cid,
+        "user_id": db_content.user_id,
+        "created_at": db_content.created_at.isoformat(),
+        "created_at_ts": to_timestamp(db_content.created_at)
+    }
+
+
+def clear_entries(user_id: str, ids: List[int]):
+    """Background task: forget entries whose contents are indexed."""
+    with session_for_user(user_id) as db:
+        vector_outbox.clear(db, ids=ids)
+
+
+async def deliver(background_tasks: BackgroundTasks, entries: List[VectorOutbox], documents: List[str], contents: List[Content]):
+    """
+    Index freshly committed contents and clear their outbox entries after the
+    response. On failure the entries stay for the startup replay.
+    """
+    try:
+        await get_vector_store().aupsert(
+            documents=documents, metadata=[content_metadata(c) for c in contents])
+    except Exception as e:
+        logger.error(f"Failed to index content in vector store: {str(e)}")
+        VECTOR_STORE_ERRORS.inc(operation="add")
+        OUTBOX_ENTRIES.inc(len(entries), outcome="deferred")
+        # Don't raise here - the content is saved and its outbox entry kept
+        return
+    OUTBOX_ENTRIES.inc(len(entries), outcome="indexed")
+    # Entries of one request belong to one user, so they sit on one shard
+    background_tasks.add_task(clear_entries, entries[0].user_id, [entry.id for entry in entries])
+
+
+def replay(batch_size: int = OUTBOX_REPLAY_BATCH_SIZE) -> int:
+    """Index every content still in the outbox of every shard, oldest first; returns how many were indexed."""
+    return sum(_replay_shard(session_factory, batch_size) for session_factory in session_factories)
+
+
+def _replay_shard(session_factory, batch_size: int) -> int:
+    vector_store = get_vector_store()
+    replayed, after_id = 0, 0
+    with session_factory() as db:
+        while True:
+            pending = vector_outbox.pending(db, after_id=after_id, limit=batch_size)
+            if not pending:
+                return replayed
+            after_id = pending[-1][0].id
+            try:
+                documents = [c.get_decrypted_content(c.user_id) for _, c in pending]
+                # Adding an already indexed content again is harmless, so a replay can repeat
+                vector_store.add_documents(
+                    documents=documents, metadata=[content_metadata(c) for _, c in pending])
+            except Exception as e:
+                logger.error(f"Failed to replay vector outbox after entry {after_id}: {str(e)}")
+                VECTOR_STORE_ERRORS.inc(operation="outbox_replay")
+                return replayed
+            vector_outbox.clear(db, ids=[entry.id for entry, _ in pending])
+            replayed += len(pending)
+            OUTBOX_ENTRIES.inc(len(pending), outcome="replayed")
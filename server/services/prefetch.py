@@ -0,0 +1,139 @@
+"""
+Speculative retrieval for the question that usually follows /determine_action.
+
+Clients classify a message first and only then send it to /query, so the
+embedding, vector search and note fetch used to wait for the classification
+round trip. When /determine_action is given the selected network, it starts
+that retrieval in the background while the classifier runs and parks the
+task in a short-lived per-user slot. /query claims the slot when it asks the
+same question about the same network and skips straight to the answer.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from crud import content
+from database.db import session_for_user
+from core.metrics import Counter
+from core.plaintext_cache import decrypt_content
+from core.vector_store import get_vector_store
+from services.llm import with_timestamp
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+# How long a prefetched result waits for its /query before it is dropped
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "15"))
+
+PREFETCHES = Counter(
+    "hae_prefetches_total",
+    "Speculative retrievals by outcome (started, hit, miss, discarded, expired, error)",
+    ["outcome"])
+
+# Only somewhat relevant matches, as in /query
+MIN_RELEVANCE_SCORE = 0.3
+
+
+def contents_for_docs(db: Session, user_id: str, nid: UUID, docs: List[dict]) -> List[str]:
+    """Decrypted, timestamped notes for vector hits, in relevance order."""
+    content_ids = [doc["metadata"]["content_id"] for doc in docs]
+    db_contents = content.get_by_ids(db, ids=content_ids, network_id=nid, user_id=user_id)
+    return [with_timestamp(decrypt_content(c, user_id), c.created_at) for c in db_contents]
+
+
+async def _retrieve(user_id: str, nid: UUID, query_text: str, created_between: Optional[Tuple[float, float]]) -> List[str]:
+    docs = await get_vector_store().aquery(
+        query_text=query_text,
+        network_id=nid,
+        min_relevance_score=MIN_RELEVANCE_SCORE,
+        created_between=created_between
+    )
+
+    def fetch():
+        # The request that started the prefetch may be gone, so use an own session
+        with session_for_user(user_id) as db:
+            return contents_for_docs(db, user_id, nid, docs)
+    return await run_in_threadpool(fetch)
+
+
+class _Slot(NamedTuple):
+    key: Tuple[UUID, str, Optional[Tuple[float, float]]]
+    task: asyncio.Task
+    expires_at: float
+
+
+class PrefetchSlots:
+    """One pending retrieval per user, expiring after ttl seconds."""
+
+    def __init__(self, ttl: float = PREFETCH_TTL_SECONDS):
+        self.ttl = ttl
+        # Insertion order is expiry order, since every slot gets the same ttl
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+
+    @staticmethod
+    def _key(nid: UUID, query_text: str, created_between: Optional[Tuple[float, float]]):
+        return (nid, query_text.strip(), created_between)
+
+    def _expire(self, now: float):
+        while self._slots:
+            user_id, slot = next(iter(self._slots.items()))
+            if slot.expires_at > now:
+                break
+            del self._slots[user_id]
+            slot.task.cancel()
+            PREFETCHES.inc(outcome="expired")
+
+    def start(self, user_id: str, nid: UUID, query_text: str, created_between: Optional[Tuple[float, float]] = None):
+        """Start retrieving for a likely question, replacing the user's previous slot."""
+        now = time.monotonic()
+        self._expire(now)
+        self.discard(user_id)
+        task = asyncio.create_task(_retrieve(user_id, nid, query_text, created_between))
+        # Claimed or not, a failed prefetch must not log "exception never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._slots[user_id] = _Slot(self._key(nid, query_text, created_between), task, now + self.ttl)
+        PREFETCHES.inc(outcome="started")
+
+    def discard(self, user_id: str):
+        """Drop the user's slot, e.g. once the message turned out to be a save."""
+        slot = self._slots.pop(user_id, None)
+        if slot:
+            slot.task.cancel()
+            PREFETCHES.inc(outcome="discarded")
+
+    async def claim(self, user_id: str, nid: UUID, query_text: str, created_between: Optional[Tuple[float, float]] = None) -> Optional[List[str]]:
+        """
+        The prefetched notes for exactly this question, waiting for the
+        retrieval if it is still running. None when there is no usable slot.
+        """
+        self._expire(time.monotonic())
+        slot = self._slots.get(user_id)
+        if slot is None:
+            return None
+        if slot.key != self._key(nid, query_text, created_between):
+            PREFETCHES.inc(outcome="miss")
+            return None
+        del self._slots[user_id]
+        try:
+            contents = await slot.task
+        except Exception as e:
+            logger.error(f"Prefetch for network {nid} of user {user_id} failed: {str(e)}")
+            PREFETCHES.inc(outcome="error")
+            return None
+        PREFETCHES.inc(outcome="hit")
+        return contents
+
+
+prefetch_slots = PrefetchSlots()
+
+
+def get_prefetch_slots() -> PrefetchSlots:
+    return prefetch_slots
@@ -0,0 +1,143 @@
+"""
+Rolling per-network profile summaries.
+
+Each network keeps an encrypted profile that is updated by folding in only
+the notes added, edited or deleted since the last update. Updates run as
+background tasks after the write has committed, one at a time per network,
+so /query can pass the profile as compact context next to the top-k notes.
+
+Deltas carry the change sequence number of their write (crud.change). A
+rebuild reads all notes of a network, so it records the sequence number it
+saw and later deltas of writes it already covered are skipped rather than
+folded in twice.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from config import PROFILE_REBUILD_CHUNK_SIZE
+from crud import network, network_profile
+from crud.change import change
+from database.db import session_for_user
+from core.metrics import Counter
+from core.name_index import get_name_index
+from core.plaintext_cache import decrypt_content
+from models.content import Content
+from services.llm import update_profile_summary, with_timestamp
+
+logger = logging.getLogger(__name__)
+
+PROFILE_UPDATES = Counter(
+    "hae_profile_updates_total",
+    "Profile summary updates by kind (delta, rebuild, covered, error)",
+    ["kind"])
+
+
+class _KeyedLocks:
+    """One lock per key, dropped again once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[Tuple[str, UUID], list] = {}
+
+    @contextmanager
+    def hold(self, key: Tuple[str, UUID]):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+_network_locks = _KeyedLocks()
+
+
+def load_profile(db: Session, user_id: str, nid: UUID) -> Optional[str]:
+    """Decrypted profile of a network, or None if it has not been built yet."""
+    db_profile = network_profile.get_user_profile(db, user_id=user_id, network_id=nid)
+    return db_profile.get_decrypted_summary(user_id) if db_profile else None
+
+
+def _rebuild(db: Session, user_id: str, nid: UUID, name: str) -> Tuple[str, int, int]:
+    """
+    Build a profile from all of a network's notes, a chunk per LLM call.
+    Returns the summary, the note count and the sequence number covered.
+    """
+    summary, count, chunk, seq = "", 0, [], 0
+    # One statement, so the sequence number matches exactly the notes read
+    rows = db.query(Content, change.current_seq(user_id)).filter(
+        Content.network_id == nid,
+        Content.user_id == user_id
+    ).order_by(Content.created_at).yield_per(PROFILE_REBUILD_CHUNK_SIZE)
+    for db_content, seq in rows:
+        chunk.append(with_timestamp(decrypt_content(db_content, user_id), db_content.created_at))
+        if len(chunk) == PROFILE_REBUILD_CHUNK_SIZE:
+            summary = update_profile_summary(name, summary, chunk, [])
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        summary = update_profile_summary(name, summary, chunk, [])
+        count += len(chunk)
+    return summary, count, seq or 0
+
+
+def refresh_profile(user_id: str, nid: UUID, added: Optional[List[str]] = None, removed: Optional[List[str]] = None,
+                    seq: Optional[int] = None) -> None:
+    """
+    Background task: fold added and removed notes into a network's profile,
+    or build the profile from all notes if it does not exist yet. `seq` is
+    the change sequence number of the write (change.last_recorded).
+    """
+    added, removed = added or [], removed or []
+    with _network_locks.hold((user_id, nid)):
+        db = session_for_user(user_id)
+        try:
+            db_network = network.get_user_network(db, user_id=user_id, nid=nid)
+            if not db_network:
+                return  # Deleted in the meantime
+            db_profile = network_profile.get_user_profile(db, user_id=user_id, network_id=nid)
+            name = get_name_index().resolve_one(user_id, nid, db_network.name)
+
+            covered_seq = None
+            if db_profile is None:
+                # The committed notes already include this change
+                summary, note_count, covered_seq = _rebuild(db, user_id, nid, name)
+                if not note_count:
+                    return
+                kind = "rebuild"
+            elif (added or removed) and seq is not None and seq <= db_profile.covered_seq:
+                # A rebuild that ran after this write already read its notes
+                PROFILE_UPDATES.inc(kind="covered")
+                return
+            elif added or removed:
+                summary = update_profile_summary(
+                    name, db_profile.get_decrypted_summary(user_id), added, removed)
+                note_count = max(0, db_profile.note_count + len(added) - len(removed))
+                kind = "delta"
+            else:
+                return
+
+            network_profile.save(
+                db, user_id=user_id, network_id=nid, summary=summary, note_count=note_count,
+                covered_seq=covered_seq)
+            PROFILE_UPDATES.inc(kind=kind)
+        except Exception as e:
+            logger.error(f"Failed to update profile of network {
+                         nid} for user {user_id}: {str(e)}")
+            PROFILE_UPDATES.inc(kind="error")
+            # A dropped delta would leave the profile wrong for good; rebuild it next time
+            try:
+                db.rollback()
+                network_profile.discard(db, user_id=user_id, network_id=nid)
+            except Exception as e:
+                logger.error(f"Failed to discard profile of network {nid}: {str(e)}")
+        finally:
+            db.close()
@@ -1,7 +1,10 @@
+import asyncio
 import chromadb
 from chromadb.config import Settings
+import contextvars
 import os
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
 import logging
 from datetime import datetime
 from uuid import UUID
@@ -9,44 +12,107 @@ from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
 from langchain.schema import Document
 from dotenv import load_dotenv
-from config import N_RESULTS
+from config import N_RESULTS, EMBED_BATCH_SIZE, CROSS_NETWORK_N_RESULTS
+from core.metrics import Gauge, track
+from core.singleflight import ThreadSingleFlight, make_key
+from services.chroma_client import CHROMA_SERVER_URL, create_server_client
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Identical embedding requests running at the same time share one upstream call
+_embedding_flight = ThreadSingleFlight("embedding")
+
+# Threads serving the async facade; index I/O beyond this waits in the queue
+VECTOR_STORE_MAX_WORKERS = int(os.getenv("VECTOR_STORE_MAX_WORKERS", "4"))
+
+VECTOR_QUEUED = Gauge(
+    "hae_vector_queued", "Vector store operations waiting for a worker thread")
+VECTOR_IN_FLIGHT = Gauge(
+    "hae_vector_in_flight", "Vector store operations running on a worker thread")
+
+# Shared by every store instance, so the bound holds per process
+_executor = ThreadPoolExecutor(
+    max_workers=VECTOR_STORE_MAX_WORKERS, thread_name_prefix="vector")
+
+
+async def run_in_vector_executor(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking vector store call on the bounded pool without blocking the event loop"""
+    def call():
+        VECTOR_QUEUED.dec()
+        VECTOR_IN_FLIGHT.inc()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            VECTOR_IN_FLIGHT.dec()
+
+    VECTOR_QUEUED.inc()
+    # Copy the context so stage timings still reach the request's Server-Timing
+    future = _executor.submit(contextvars.copy_context().run, call)
+    # A call cancelled before it started never runs to leave the queue itself
+    future.add_done_callback(lambda f: f.cancelled() and VECTOR_QUEUED.dec())
+    return await asyncio.wrap_future(future)
+
+
+def create_embedding_function() -> GoogleGenerativeAIEmbeddings:
+    """Google Gemini embeddings with the API key from the environment"""
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_api_key:
+        raise ValueError(
+            "GEMINI_API_KEY environment variable is not set")
+
+    return GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",  # Gemini's text embedding model
+        google_api_key=gemini_api_key,
+    )
+
+
+def where_filter(*clauses: dict, created_between: Optional[Tuple[float, float]] = None) -> dict:
+    """Chroma where filter matching all clauses and, if given, a [start, end) created_at_ts range"""
+    clauses = list(clauses)
+    if created_between:
+        clauses += [{"created_at_ts": {"$gte": created_between[0]}},
+                    {"created_at_ts": {"$lt": created_between[1]}}]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
 
 class VectorStore:
-    def __init__(self, persist_directory: str = os.getenv("CHROMA_DB_PATH")):
-        """Initialize ChromaDB with persistence using LangChain"""
+    def __init__(self, persist_directory: str = os.getenv("CHROMA_DB_PATH"), server_url: Optional[str] = CHROMA_SERVER_URL):
+        """
+        Initialize ChromaDB using LangChain. With server_url set, all workers
+        share one Chroma server instead of each embedding its own index.
+        """
         try:
             self.persist_directory = persist_directory
-            logger.info(f"Initializing ChromaDB with persistence directory: {
-                        persist_directory}")
+            self.server_url = server_url
+            if server_url:
+                logger.info(f"Connecting to shared ChromaDB server at {server_url}")
+            else:
+                logger.info(f"Initializing ChromaDB with persistence directory: {
+                            persist_directory}")
 
-            if not os.path.exists(persist_directory):
+            if not server_url and not os.path.exists(persist_directory):
                 os.makedirs(persist_directory)
                 logger.info(f"Created persistence directory: {
                             persist_directory}")
 
-            # Initialize Google Gemini embeddings with API key from environment
-            gemini_api_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_api_key:
-                raise ValueError(
-                    "GEMINI_API_KEY environment variable is not set")
-
-            self.embedding_function = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",  # Gemini's text embedding model
-                google_api_key=gemini_api_key,
-            )
+            self.embedding_function = create_embedding_function()
 
             # Initialize Chroma through LangChain
-            self.vectorstore = Chroma(
-                persist_directory=persist_directory,
-                embedding_function=self.embedding_function,
-                collection_name="network_content"
-            )
+            if server_url:
+                self.vectorstore = Chroma(
+                    client=create_server_client(),
+                    embedding_function=self.embedding_function,
+                    collection_name="network_content"
+                )
+            else:
+                self.vectorstore = Chroma(
+                    persist_directory=persist_directory,
+                    embedding_function=self.embedding_function,
+                    collection_name="network_content"
+                )
 
             logger.info(
                 "ChromaDB client initialized successfully with LangChain and Gemini embeddings")
@@ -55,6 +121,20 @@ class VectorStore:
             logger.error(f"Failed to initialize ChromaDB: {str(e)}")
             raise
 
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed documents, sharing the call with identical concurrent requests"""
+        def embed():
+            with track("embed"):
+                return self.embedding_function.embed_documents(documents)
+        return _embedding_flight.do(make_key("documents", documents), embed)
+
+    def embed_query(self, query_text: str) -> List[float]:
+        """Embed a query, sharing the call with identical concurrent requests"""
+        def embed():
+            with track("embed"):
+                return self.embedding_function.embed_query(query_text)
+        return _embedding_flight.do(make_key("query", query_text), embed)
+
     def add_or_update_documents(
         self,
         documents: List[str],
@@ -73,9 +153,14 @@ class VectorStore:
             metadata: Optional list of metadata dicts for each document
         """
         if document_ids is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            document_ids = [f"{str(network_id)}_{timestamp}_{
-                i}" for i in range(len(documents))]
+            # Content IDs are unique; a timestamp-based ID collides when two
+            # saves hit the same network within one second
+            if metadata and all("content_id" in meta for meta in metadata):
+                document_ids = [str(meta["content_id"]) for meta in metadata]
+            else:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                document_ids = [f"{str(network_id)}_{timestamp}_{
+                    i}" for i in range(len(documents))]
 
         if metadata is None:
             metadata = [{"network_id": str(network_id)} for _ in documents]
@@ -87,86 +172,272 @@ class VectorStore:
 
         try:
             # Generate embeddings directly using the embedding function
-            embeddings = self.embedding_function.embed_documents(documents)
+            embeddings = self.embed_documents(documents)
 
-            # Add embeddings and metadata to ChromaDB without storing original text
-            self.vectorstore._collection.add(
-                embeddings=embeddings,
-                ids=document_ids,
-                metadatas=metadata
-            )
+            # Store embeddings and metadata without the original text
+            self._add_embeddings(document_ids, embeddings, metadata)
 
             logger.info(f"Added embeddings for {
-                        len(documents)} documents to ChromaDB for network {network_id}")
+                        len(documents)} documents to the vector store for network {network_id}")
 
         except Exception as e:
             logger.error(f"Error adding embeddings to vector store: {str(e)}")
             logger.error(f"Failed document IDs: {document_ids}")
             raise
 
+    def add_documents(
+        self,
+        documents: List[str],
+        metadata: List[dict],
+        document_ids: Optional[List[str]] = None
+    ):
+        """
+        Add documents that may belong to different networks.
+        Embeds in EMBED_BATCH_SIZE chunks and writes each chunk in one call.
+
+        Args:
+            documents: List of text content to generate embeddings from
+            metadata: Metadata dict per document; must include network_id and content_id
+            document_ids: Optional list of unique IDs, defaults to the content IDs
+        """
+        metadata = [
+            {**meta, "network_id": str(meta["network_id"]),
+             "content_id": str(meta["content_id"])}
+            for meta in metadata
+        ]
+        if document_ids is None:
+            document_ids = [meta["content_id"] for meta in metadata]
+
+        for start in range(0, len(documents), EMBED_BATCH_SIZE):
+            end = start + EMBED_BATCH_SIZE
+            try:
+                embeddings = self.embed_documents(documents[start:end])
+                self._add_embeddings(
+                    document_ids[start:end], embeddings, metadata[start:end])
+            except Exception as e:
+                logger.error(f"Error adding embeddings to vector store: {str(e)}")
+                logger.error(f"Failed document IDs: {document_ids[start:end]}")
+                raise
+
+        logger.info(f"Added embeddings for {len(documents)} documents to the vector store")
+
+    def _add_embeddings(self, document_ids: List[str], embeddings: List[List[float]], metadata: List[dict]):
+        self.vectorstore._collection.add(
+            embeddings=embeddings,
+            ids=document_ids,
+            metadatas=metadata
+        )
+
     def query_documents(
         self,
         query_text: str,
         network_id: UUID,
-        min_relevance_score: float = 0.0
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
     ) -> List[dict]:
         """
-        Query the vector store for relevant documents using LangChain.
+        Query the vector store for relevant documents.
         Returns metadata and relevance scores only, as content is stored encrypted in SQL.
 
         Args:
             query_text: The query text to search for
             network_id: Network ID to filter results (UUID)
             min_relevance_score: Minimum relevance score (0 to 1) for a document to be included
+            created_between: Optional [start, end) range of created_at_ts epoch seconds
 
         Returns:
             List of documents with their metadata and relevance scores, sorted by relevance
         """
         try:
-            logger.info(f"Querying ChromaDB for network {
+            logger.info(f"Querying vector store for network {
                         network_id} with query: '{query_text}'")
 
             # Generate query embedding
-            query_embedding = self.embedding_function.embed_query(query_text)
+            query_embedding = self.embed_query(query_text)
+            documents = self.query_by_embedding(
+                query_embedding, network_id, min_relevance_score, created_between)
+
+            logger.info(
+                f"Found {len(documents)} relevant documents for network {network_id}")
+            return documents
+
+        except Exception as e:
+            logger.error(f"Error querying vector store: {str(e)}")
+            raise
 
-            # Query ChromaDB directly with embedding
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        network_id: UUID,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """Top N_RESULTS documents of a network for an already computed query embedding"""
+        # Query ChromaDB directly with embedding
+        with track("vector_query"):
             results = self.vectorstore._collection.query(
                 query_embeddings=[query_embedding],
                 n_results=N_RESULTS,
-                where={"network_id": str(network_id)},
+                where=where_filter({"network_id": str(network_id)},
+                                   created_between=created_between),
                 include=["metadatas", "distances"]
             )
 
-            documents = []
-            if results["distances"] and results["metadatas"]:
-                for distance, metadata in zip(results["distances"][0], results["metadatas"][0]):
-                    # Convert distance to similarity score
-                    relevance_score = 1 / (1 + distance)
-                    if relevance_score >= min_relevance_score:
-                        documents.append({
-                            "metadata": metadata,
-                            "relevance_score": relevance_score
-                        })
+        documents = []
+        if results["distances"] and results["metadatas"]:
+            for distance, metadata in zip(results["distances"][0], results["metadatas"][0]):
+                # Convert distance to similarity score
+                relevance_score = 1 / (1 + distance)
+                if relevance_score >= min_relevance_score:
+                    documents.append({
+                        "metadata": metadata,
+                        "relevance_score": relevance_score
+                    })
 
-            # Sort by relevance score
-            documents.sort(key=lambda x: x['relevance_score'], reverse=True)
+        # Sort by relevance score
+        documents.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return documents
 
-            logger.info(
-                f"Found {len(documents)} relevant documents for network {network_id}")
-            return documents
+    def query_user_documents(
+        self,
+        query_text: str,
+        user_id: str,
+        network_ids: Optional[List[UUID]] = None,
+        n_results: int = CROSS_NETWORK_N_RESULTS,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """
+        Query all of a user's networks at once: one embedding and one search.
+
+        Args:
+            query_text: The query text to search for
+            user_id: Owner whose documents are searched
+            network_ids: The user's network IDs, for backends without a user filter
+            n_results: Maximum number of documents returned across all networks
+            min_relevance_score: Minimum relevance score (0 to 1) for a document to be included
+            created_between: Optional [start, end) range of created_at_ts epoch seconds
+
+        Returns:
+            List of documents with their metadata and relevance scores, sorted by relevance
+        """
+        try:
+            logger.info(f"Querying vector store across networks of user {
+                        user_id} with query: '{query_text}'")
+            query_embedding = self.embed_query(query_text)
+            return self.query_user_by_embedding(
+                query_embedding, user_id, network_ids, n_results, min_relevance_score, created_between)
 
         except Exception as e:
             logger.error(f"Error querying vector store: {str(e)}")
             raise
 
-    def delete_network_documents(self, network_id: UUID):
-        """Delete all documents for a specific network"""
-        try:
-            self.vectorstore.delete(
-                filter={"network_id": str(network_id)}
+    def query_user_by_embedding(
+        self,
+        query_embedding: List[float],
+        user_id: str,
+        network_ids: Optional[List[UUID]] = None,
+        n_results: int = CROSS_NETWORK_N_RESULTS,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """Top documents across a user's networks, filtered by the user_id metadata"""
+        with track("vector_query"):
+            results = self.vectorstore._collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where_filter({"user_id": user_id}, created_between=created_between),
+                include=["metadatas", "distances"]
             )
+
+        documents = []
+        if results["distances"] and results["metadatas"]:
+            for distance, metadata in zip(results["distances"][0], results["metadatas"][0]):
+                relevance_score = 1 / (1 + distance)
+                if relevance_score >= min_relevance_score:
+                    documents.append({
+                        "metadata": metadata,
+                        "relevance_score": relevance_score
+                    })
+        documents.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return documents
+
+    async def aquery(
+        self,
+        query_text: str,
+        network_id: UUID,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """query_documents on the vector executor"""
+        return await run_in_vector_executor(
+            self.query_documents, query_text, network_id, min_relevance_score, created_between)
+
+    async def aquery_user(
+        self,
+        query_text: str,
+        user_id: str,
+        network_ids: Optional[List[UUID]] = None,
+        n_results: int = CROSS_NETWORK_N_RESULTS,
+        min_relevance_score: float = 0.0,
+        created_between: Optional[Tuple[float, float]] = None
+    ) -> List[dict]:
+        """query_user_documents on the vector executor"""
+        return await run_in_vector_executor(
+            self.query_user_documents, query_text, user_id, network_ids,
+            n_results, min_relevance_score, created_between)
+
+    async def aupsert(
+        self,
+        documents: List[str],
+        metadata: List[dict],
+        network_id: Optional[UUID] = None
+    ):
+        """
+        Index documents on the vector executor. With network_id all documents
+        belong to that network, otherwise each metadata dict names its own.
+        """
+        if network_id is not None:
+            await run_in_vector_executor(
+                self.add_or_update_documents, documents, network_id, None, metadata)
+        else:
+            await run_in_vector_executor(self.add_documents, documents, metadata)
+
+    async def adelete(self, network_id: UUID, content_ids: Optional[List[UUID]] = None) -> int:
+        """Delete a network's documents, or only those of content_ids, on the vector executor"""
+        if content_ids is None:
+            return await run_in_vector_executor(self.delete_network_documents, network_id)
+        return await run_in_vector_executor(self.delete_content_documents, network_id, content_ids)
+
+    def delete_network_documents(self, network_id: UUID) -> int:
+        """Delete all documents for a specific network, returning how many were removed"""
+        try:
+            where = {"network_id": str(network_id)}
+            ids = self.vectorstore._collection.get(where=where, include=[])["ids"]
+            if ids:
+                self.vectorstore._collection.delete(ids=ids)
             logger.info(
-                f"Successfully deleted documents for network {network_id}")
+                f"Deleted {len(ids)} documents for network {network_id} from vector store")
+            return len(ids)
+
+        except Exception as e:
+            logger.error(
+                f"Error deleting documents from vector store: {str(e)}")
+            raise
+
+    def delete_content_documents(self, network_id: UUID, content_ids: List[UUID]) -> int:
+        """Delete the documents of specific contents, returning how many were removed"""
+        try:
+            where = {"$and": [
+                {"network_id": str(network_id)},
+                {"content_id": {"$in": [str(cid) for cid in content_ids]}}
+            ]}
+            ids = self.vectorstore._collection.get(where=where, include=[])["ids"]
+            if ids:
+                self.vectorstore._collection.delete(ids=ids)
+            logger.info(f"Deleted {len(ids)} documents for contents {
+                        content_ids} from vector store")
+            return len(ids)
 
         except Exception as e:
             logger.error(
@@ -0,0 +1,43 @@
+"""
+Tests for Accept-Encoding negotiation.
+
+Run from the `server` directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from core import compression  # noqa: E402
+from core.compression import choose_encoding  # noqa: E402
+
+
+class ChooseEncodingTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(compression, "brotli", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_accepts_gzip(self):
+        for header in ("gzip", "deflate, gzip", "GZIP;q=0.5", "gzip; q=1.0"):
+            self.assertEqual(choose_encoding(header), "gzip", header)
+
+    def test_zero_quality_refuses(self):
+        for header in ("gzip;q=0", "gzip;q=0.0", "gzip; q=0", "gzip;Q=0.000", "identity, gzip;q=0"):
+            self.assertIsNone(choose_encoding(header), header)
+
+    def test_malformed_quality_refuses(self):
+        self.assertIsNone(choose_encoding("gzip;q=high"))
+
+    def test_nothing_accepted(self):
+        self.assertIsNone(choose_encoding(""))
+        self.assertIsNone(choose_encoding("identity"))
+
+
+if __name__ == "__main__":
+    unittest.main()
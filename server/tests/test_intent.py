@@ -0,0 +1,45 @@
+"""
+Tests for the local ask/save rules in front of the LLM.
+
+Run from the `server` directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from services.intent import (  # noqa: E402
+    IntentModel, UNCALIBRATED_RULE_CONFIDENCE, matching_rule, rule_agreement, rule_intent)
+
+
+class RuleTest(unittest.TestCase):
+    def test_ambiguous_openers_match_no_rule(self):
+        for text in ("Will said he is moving to Boston next month",
+                     "Remind me that Sarah is allergic to peanuts",
+                     "List of gifts Sam likes: books, tea",
+                     "Just wondering what Alex does for work",
+                     "What does Alex do for work"):
+            self.assertIsNone(matching_rule(text), text)
+
+    def test_clear_cut_messages_match(self):
+        self.assertEqual(matching_rule("Where does Sam live?"), ("question_mark", "ask"))
+        self.assertEqual(matching_rule("Had  coffee with Sam"), ("save_verb", "save"))
+        self.assertEqual(matching_rule("Met Sam, is she a designer?"), ("question_mark", "ask"))
+
+    def test_confidence_comes_from_the_model_file(self):
+        self.assertEqual(rule_intent("Met Sam").confidence, UNCALIBRATED_RULE_CONFIDENCE)
+        model = IntentModel({}, 0.0, 16, {"save_verb": 0.97})
+        self.assertEqual(rule_intent("Met Sam", model).confidence, 0.97)
+
+    def test_rule_agreement_is_smoothed(self):
+        stats = rule_agreement([("Met Sam", "save"), ("Met Sam at 5", "save"), ("Saw it?", "save")])
+        self.assertEqual(stats["save_verb"], {"matched": 2, "confidence": 0.75})
+        self.assertEqual(stats["question_mark"], {"matched": 1, "confidence": 0.3333})
+
+
+if __name__ == "__main__":
+    unittest.main()
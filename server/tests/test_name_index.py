@@ -0,0 +1,62 @@
+"""
+Tests for matching extracted person names to existing networks.
+
+Run from the `server` directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+import uuid
+from unittest import mock
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from core.name_index import NetworkNameIndex, match_name  # noqa: E402
+
+
+class FindTest(unittest.TestCase):
+    def find(self, name, *existing):
+        nids = {uuid.uuid4(): n for n in existing}
+        index = NetworkNameIndex()
+        with mock.patch.object(index, "names", return_value=nids):
+            match = index.find(None, "user", name)
+        return (nids[match.nid], match.match) if match else None
+
+    def test_exact_ignores_case_accents_and_punctuation(self):
+        self.assertEqual(self.find("josé o'brien", "Jose O'Brien", "Jose"), ("Jose O'Brien", "exact"))
+
+    def test_partial_only_from_short_to_long_name(self):
+        self.assertEqual(self.find("Alex", "Alex Zhang"), ("Alex Zhang", "partial"))
+        self.assertIsNone(self.find("Alex Kim", "Alex"))
+
+    def test_partial_must_be_unique(self):
+        self.assertIsNone(self.find("Alex", "Alex Zhang", "Alex Kim"))
+
+    def test_fuzzy_first_name_with_same_surname(self):
+        self.assertEqual(self.find("Christoper Lee", "Christopher Lee"), ("Christopher Lee", "fuzzy"))
+        self.assertEqual(self.find("Katherine", "Catherine"), ("Catherine", "fuzzy"))
+
+    def test_similar_but_different_people_stay_apart(self):
+        self.assertIsNone(self.find("Alex Zhang", "Alex Chang"))
+        self.assertIsNone(self.find("John Smith", "Joan Smith"))
+        self.assertIsNone(self.find("Mike Chen", "Mike Shen"))
+
+
+class MatchNameTest(unittest.TestCase):
+    def test_names_added_along_the_way_are_matched(self):
+        # As /save/batch does with the networks its earlier items created
+        known = {}
+        zhang = uuid.uuid4()
+        self.assertIsNone(match_name("Alex Zhang", known))
+        known[zhang] = "Alex Zhang"
+        self.assertEqual(match_name("Alex", known), (zhang, "Alex Zhang", "partial"))
+
+    def test_blank_name_matches_nothing(self):
+        self.assertIsNone(match_name(" .", {uuid.uuid4(): "Alex"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the NumPy vector store backend.
+
+Run from the `server` directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+# Only queries by embedding run here, so the key is never used
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from services.numpy_vector_store import NumpyVectorStore  # noqa: E402
+
+
+class SegmentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = NumpyVectorStore(self.tmp.name, dtype="float32", metric="l2")
+        self.network_id = str(uuid.uuid4())
+        self.store._add_embeddings(
+            ["a", "b"], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+            [{"network_id": self.network_id, "content_id": "a", "created_at_ts": 1.0},
+             {"network_id": self.network_id, "content_id": "b", "created_at_ts": 2.0}])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_queries_open_the_network_once(self):
+        with mock.patch.object(self.store, "_read_meta", wraps=self.store._read_meta) as read_meta:
+            first = self.store.query_by_embedding([1.0, 0.0, 0.0], self.network_id)
+            second = self.store.query_by_embedding([1.0, 0.0, 0.0], self.network_id)
+        self.assertEqual(read_meta.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]["metadata"]["content_id"], "a")
+        self.assertEqual(list(self.store._segments), [self.network_id])
+
+    def test_write_reopens_the_network(self):
+        self.store.query_by_embedding([1.0, 0.0, 0.0], self.network_id)
+        self.store._add_embeddings(
+            ["c"], [[0.0, 0.0, 1.0]],
+            [{"network_id": self.network_id, "content_id": "c", "created_at_ts": 3.0}])
+        hits = self.store.query_by_embedding([0.0, 0.0, 1.0], self.network_id)
+        self.assertEqual(hits[0]["metadata"]["content_id"], "c")
+
+
+class InterruptedAppendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = NumpyVectorStore(self.tmp.name, dtype="int8", metric="l2", rescore=True)
+        self.network_id = str(uuid.uuid4())
+        self.add("a", [1.0, 0.0, 0.0, 0.0])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, doc_id, vector):
+        self.store._add_embeddings(
+            [doc_id], [vector], [{"network_id": self.network_id, "content_id": doc_id, "created_at_ts": 1.0}])
+
+    def test_orphaned_rows_are_overwritten(self):
+        # Rows of every component are written, then the process dies before meta.json
+        with mock.patch.object(self.store, "_write_meta", side_effect=OSError("killed")):
+            with self.assertRaises(OSError):
+                self.add("orphan", [0.0, 0.0, 0.0, 9.0])
+        self.add("b", [0.0, 1.0, 0.0, 0.0])
+
+        path = self.store._network_dir(self.network_id)
+        meta = self.store._read_meta(path)
+        self.assertEqual(meta["ids"], ["a", "b"])
+        self.assertEqual(self.store._read_rows(path, meta).tolist(),
+                         [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+        hits = self.store.query_by_embedding([0.0, 1.0, 0.0, 0.0], self.network_id)
+        self.assertEqual(hits[0]["metadata"]["content_id"], "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
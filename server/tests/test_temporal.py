@@ -0,0 +1,59 @@
+"""
+Tests for time ranges parsed from questions.
+
+Run from the `server` directory:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from utils.temporal import TimeRange, parse_time_range  # noqa: E402
+
+NOW = datetime(2026, 10, 19, 15, 30)
+
+
+def span(start, end):
+    return TimeRange(datetime(*start), datetime(*end))
+
+
+class ParseTimeRangeTest(unittest.TestCase):
+    def test_month_and_year(self):
+        self.assertEqual(parse_time_range("What did we do in March?", NOW),
+                         span((2026, 3, 1), (2026, 4, 1)))
+        self.assertEqual(parse_time_range("dinner in may 2025", NOW),
+                         span((2025, 5, 1), (2025, 6, 1)))
+        self.assertEqual(parse_time_range("anything since 2024?", NOW),
+                         span((2024, 1, 1), (2026, 10, 20)))
+
+    def test_years_outside_the_window_are_ignored(self):
+        for text in ("what did we do in 0000?", "in 9999", "may 0000", "since 1850"):
+            self.assertIsNone(parse_time_range(text, NOW), text)
+
+    def test_invalid_year_falls_through_to_a_valid_one(self):
+        self.assertEqual(parse_time_range("in 0000 or in 2025", NOW),
+                         span((2025, 1, 1), (2026, 1, 1)))
+
+    def test_may_as_a_verb_is_not_a_month(self):
+        for text in ("Do you think this may upset Alex?", "Alex may come", "May I ask about Sam?"):
+            self.assertIsNone(parse_time_range(text, NOW), text)
+
+    def test_may_as_a_month(self):
+        for text in ("what did we do in may?", "during may", "last may"):
+            self.assertEqual(parse_time_range(text, NOW), span((2026, 5, 1), (2026, 6, 1)), text)
+        self.assertEqual(parse_time_range("since may", NOW), span((2026, 5, 1), (2026, 10, 20)))
+
+    def test_relative_ranges(self):
+        self.assertEqual(parse_time_range("what happened last month", NOW),
+                         span((2026, 9, 1), (2026, 10, 1)))
+        self.assertEqual(parse_time_range("2 weeks ago", NOW),
+                         span((2026, 10, 5), (2026, 10, 12)))
+
+
+if __name__ == "__main__":
+    unittest.main()
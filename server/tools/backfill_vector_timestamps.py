@@ -0,0 +1,127 @@
+"""
+Add the numeric created_at_ts field to vector metadata written before it
+existed, so time-scoped questions can filter those notes in the vector
+search instead of falling back to SQL.
+
+Timestamps come from the contents table; vectors whose content no longer
+exists are left alone and counted as missing.
+
+Usage (from the `server` directory):
+    python tools/backfill_vector_timestamps.py
+    python tools/backfill_vector_timestamps.py --backend numpy --path ./database/numpy_vectors
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+# Vectors read and updated per page
+PAGE_SIZE = 1000
+
+
+def lookup_timestamps(cids: List[str]) -> Dict[str, float]:
+    """created_at_ts of each content that still exists, keyed by content ID string."""
+    from uuid import UUID
+    from database.db import session_factories
+    from models.content import Content
+    from utils.temporal import to_timestamp
+
+    if not cids:
+        return {}
+    timestamps = {}
+    # A page mixes users, so look in every shard
+    for session_factory in session_factories:
+        db = session_factory()
+        try:
+            rows = db.query(Content.cid, Content.created_at).filter(
+                Content.cid.in_([UUID(cid) for cid in cids])).all()
+            timestamps.update(
+                {str(cid): to_timestamp(created_at) for cid, created_at in rows if created_at})
+        finally:
+            db.close()
+    return timestamps
+
+
+def fill(metadatas: List[dict], counts: Dict[str, int]) -> List[int]:
+    """Set created_at_ts where it is missing; returns the indexes that changed."""
+    pending = [i for i, meta in enumerate(metadatas) if "created_at_ts" not in meta]
+    counts["already_set"] += len(metadatas) - len(pending)
+    timestamps = lookup_timestamps([metadatas[i]["content_id"] for i in pending])
+    changed = []
+    for i in pending:
+        ts = timestamps.get(metadatas[i]["content_id"])
+        if ts is None:
+            counts["missing"] += 1
+            continue
+        metadatas[i]["created_at_ts"] = ts
+        changed.append(i)
+    counts["updated"] += len(changed)
+    return changed
+
+
+def backfill_chroma(path: str, counts: Dict[str, int]):
+    import chromadb
+    from chromadb.config import Settings
+    from services.chroma_client import CHROMA_SERVER_URL, create_server_client
+
+    if CHROMA_SERVER_URL:
+        client = create_server_client()
+    else:
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.get_collection("network_content")
+
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        changed = fill(page["metadatas"], counts)
+        if changed:
+            collection.update(ids=[page["ids"][i] for i in changed],
+                              metadatas=[page["metadatas"][i] for i in changed])
+        offset += len(page["ids"])
+
+
+def backfill_numpy(path: str, counts: Dict[str, int]):
+    from services.numpy_vector_store import NumpyVectorStore
+
+    store = NumpyVectorStore(directory=path)
+    for network_id in sorted(os.listdir(path)):
+        if not os.path.isdir(os.path.join(path, network_id)):
+            continue
+        # Same lock as writers, so no concurrent append is lost
+        with store._write_lock(network_id) as network_dir:
+            meta = store._read_meta(network_dir)
+            if meta and fill(meta["metadatas"], counts):
+                store._write_meta(network_dir, meta)
+
+
+def main(argv=None) -> int:
+    chroma_path = os.getenv("CHROMA_DB_PATH", "./database")
+    parser = argparse.ArgumentParser(description="Backfill created_at_ts in vector metadata")
+    parser.add_argument("--backend", choices=["chroma", "numpy"],
+                        default=os.getenv("VECTOR_STORE_BACKEND", "chroma"))
+    parser.add_argument("--path", help="Chroma persist directory or NumPy store directory")
+    args = parser.parse_args(argv)
+
+    counts = {"updated": 0, "already_set": 0, "missing": 0}
+    if args.backend == "chroma":
+        backfill_chroma(args.path or chroma_path, counts)
+    else:
+        backfill_numpy(args.path or os.getenv(
+            "NUMPY_VECTOR_PATH", os.path.join(chroma_path, "numpy_vectors")), counts)
+    print(json.dumps(counts, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Evaluate the local intent classifier against the LLM.
+
+For each confidence threshold, reports the fraction of determine_action_type
+calls the local classifier would avoid, how often its confident answers
+agree with the LLM label, and the end-to-end agreement (messages below the
+threshold go to the LLM, so they agree by construction). It also reports
+how often each rule agrees with the reference labels next to the confidence
+the model file assigns it; retrain when they drift apart.
+
+Reference labels are the "label" field of each JSON line, or with --llm a
+live determine_action_type call per text (needs GEMINI_API_KEY). With
+--folds K the model is retrained K times on the other folds so every text is
+scored by a model that never saw it; otherwise the saved model is used.
+
+Usage (from the `server` directory):
+    python tools/eval_intent.py --data labeled.jsonl --folds 5
+    python tools/eval_intent.py --data messages.jsonl --llm
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+
+def read_texts(path: str) -> List[Tuple[str, Optional[str]]]:
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                rows.append((record["text"], record.get("label")))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier against the LLM")
+    parser.add_argument("--data", default=os.path.join(SERVER_DIR, "tools", "intent_examples.jsonl"))
+    parser.add_argument("--llm", action="store_true", help="Label every text with a live LLM call")
+    parser.add_argument("--model", help="Model file, defaults to INTENT_MODEL_PATH")
+    parser.add_argument("--folds", type=int, default=0, help="Cross-validate instead of using a saved model")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9, 0.95])
+    args = parser.parse_args(argv)
+
+    from services.intent import load_model, predict_intent, rule_agreement, INTENT_MODEL_PATH, INTENT_CONFIDENCE_THRESHOLD
+
+    rows = read_texts(args.data)
+    if args.llm:
+        from services.llm import determine_action_type
+        rows = [(text, determine_action_type(text)) for text, _ in rows]
+    rows = [(text, label) for text, label in rows if label in ("ask", "save")]
+    if not rows:
+        parser.error(f"no labeled texts in {args.data}")
+
+    # Local predictions, each from a model that did not train on the text when folding
+    if args.folds > 1:
+        from tools.train_intent import fit
+        predictions = [None] * len(rows)
+        for fold in range(args.folds):
+            train = [row for i, row in enumerate(rows) if i % args.folds != fold]
+            model = fit(train, n_features=2 ** 16, epochs=500, learning_rate=2.0, l2=1e-4)
+            for i in range(fold, len(rows), args.folds):
+                predictions[i] = predict_intent(rows[i][0], model)
+    else:
+        model = load_model(args.model or INTENT_MODEL_PATH)
+        predictions = [predict_intent(text, model) for text, _ in rows]
+
+    start = time.perf_counter()
+    for text, _ in rows:
+        predict_intent(text, model)
+    micros = (time.perf_counter() - start) / len(rows) * 1e6
+
+    by_threshold = {}
+    for threshold in args.thresholds:
+        confident = [(p, label) for p, (_, label) in zip(predictions, rows) if p.confidence >= threshold]
+        agree = sum(p.action == label for p, label in confident)
+        by_threshold[str(threshold)] = {
+            "llm_calls_avoided": round(len(confident) / len(rows), 4),
+            "local_agreement": round(agree / len(confident), 4) if confident else None,
+            "overall_agreement": round((agree + len(rows) - len(confident)) / len(rows), 4),
+        }
+
+    sources = {}
+    for p in predictions:
+        sources[p.source] = sources.get(p.source, 0) + 1
+    print(json.dumps({
+        "texts": len(rows),
+        "labels": "llm" if args.llm else "file",
+        "mode": f"{args.folds}-fold" if args.folds > 1 else "saved model",
+        "local_sources": sources,
+        "local_latency_us": round(micros, 2),
+        "configured_threshold": INTENT_CONFIDENCE_THRESHOLD,
+        "rules": rule_agreement(rows),
+        "model_rule_confidence": model.rule_confidence if model else None,
+        "by_threshold": by_threshold,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
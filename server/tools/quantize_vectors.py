@@ -0,0 +1,163 @@
+"""
+Convert stored embeddings into a quantized NumPy vector store.
+
+Reads every embedding from the Chroma collection (or from an existing NumPy
+store), writes them per network into a new NumPy store as int8 or float16,
+and reports recall@N_RESULTS of the converted store against exact
+full-precision search, plus vector bytes on disk before and after.
+
+Recall is measured with perturbed copies of stored vectors as queries, since
+real query embeddings are not kept.
+
+Usage (from the `server` directory):
+    python tools/quantize_vectors.py --dest ./database/numpy_int8 --dtype int8 --rescore
+    python tools/quantize_vectors.py --source numpy --source-path ./database/numpy_vectors \\
+        --dest ./database/numpy_int8 --dtype int8
+
+Then point the server at the result with VECTOR_STORE_BACKEND=numpy,
+NUMPY_VECTOR_PATH=<dest>, NUMPY_VECTOR_DTYPE=<dtype> and, when converted with
+--rescore, NUMPY_VECTOR_RESCORE=true.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+# Rows fetched from Chroma per page
+PAGE_SIZE = 1000
+
+Rows = Tuple[List[str], List[dict], np.ndarray]
+
+
+def read_chroma(path: str) -> Iterator[Tuple[str, Rows]]:
+    """Yield (network_id, rows) for the whole Chroma collection."""
+    import chromadb
+    from chromadb.config import Settings
+    from services.chroma_client import CHROMA_SERVER_URL, create_server_client
+
+    if CHROMA_SERVER_URL:
+        client = create_server_client()
+    else:
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.get_collection("network_content")
+
+    by_network: Dict[str, Tuple[List[str], List[dict], List[List[float]]]] = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings", "metadatas"], limit=PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        for doc_id, meta, embedding in zip(page["ids"], page["metadatas"], page["embeddings"]):
+            ids, metas, vectors = by_network.setdefault(meta["network_id"], ([], [], []))
+            ids.append(doc_id)
+            metas.append(meta)
+            vectors.append(embedding)
+        offset += len(page["ids"])
+
+    for network_id, (ids, metas, vectors) in by_network.items():
+        yield network_id, (ids, metas, np.asarray(vectors, dtype=np.float32))
+
+
+def read_numpy(path: str) -> Iterator[Tuple[str, Rows]]:
+    """Yield (network_id, rows) for every network of a NumPy store."""
+    from services.numpy_vector_store import NumpyVectorStore
+
+    source = NumpyVectorStore(directory=path)
+    for network_id in sorted(os.listdir(path)):
+        network_dir = os.path.join(path, network_id)
+        meta = source._read_meta(network_dir) if os.path.isdir(network_dir) else None
+        if meta and meta["count"]:
+            yield network_id, (meta["ids"], meta["metadatas"], source._read_rows(network_dir, meta))
+
+
+def exact_distances(vectors: np.ndarray, query: np.ndarray, metric: str) -> np.ndarray:
+    vectors = vectors.astype(np.float64)
+    if metric == "cosine":
+        return 1.0 - vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    return ((vectors - query) ** 2).sum(axis=1)
+
+
+def vector_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files if f.endswith(".bin"))
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert embeddings to a quantized NumPy store")
+    parser.add_argument("--source", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--source-path", default=os.getenv("CHROMA_DB_PATH", "./database"),
+                        help="Chroma persist directory or NumPy store directory")
+    parser.add_argument("--dest", required=True, help="Directory of the new NumPy store")
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Also keep float32 copies for re-ranking top candidates")
+    parser.add_argument("--queries", type=int, default=500, help="Sampled queries for the recall check")
+    parser.add_argument("--noise", type=float, default=0.05,
+                        help="Query perturbation, relative to the vector norm")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from config import N_RESULTS
+    from services.numpy_vector_store import NumpyVectorStore
+
+    if os.path.exists(args.dest) and os.listdir(args.dest):
+        parser.error(f"{args.dest} is not empty")
+    dest = NumpyVectorStore(directory=args.dest, dtype=args.dtype, rescore=args.rescore)
+
+    rows = read_chroma(args.source_path) if args.source == "chroma" else read_numpy(args.source_path)
+    originals: Dict[str, Rows] = {}
+    documents = 0
+    for network_id, (ids, metas, vectors) in rows:
+        dest._add_embeddings(ids, vectors.tolist(), metas)
+        originals[network_id] = (ids, metas, vectors)
+        documents += len(ids)
+    print(f"Converted {documents} vectors in {len(originals)} networks", file=sys.stderr)
+
+    # Recall of the converted store against exact float32 search
+    rng = np.random.default_rng(args.seed)
+    picker = random.Random(args.seed)
+    networks = list(originals)
+    hits = expected = 0
+    for _ in range(args.queries if networks else 0):
+        network_id = picker.choice(networks)
+        ids, metas, vectors = originals[network_id]
+        base = vectors[picker.randrange(len(ids))]
+        query = base + rng.standard_normal(base.shape).astype(np.float32) * (
+            args.noise * np.linalg.norm(base) / np.sqrt(base.size))
+        k = min(N_RESULTS, len(ids))
+        exact = np.argsort(exact_distances(vectors, query, dest.metric))[:k]
+        truth = {metas[i]["content_id"] for i in exact}
+        found = {doc["metadata"]["content_id"] for doc in dest.query_by_embedding(query.tolist(), network_id)}
+        hits += len(truth & found)
+        expected += k
+
+    full_bytes = documents * (originals[networks[0]][2].shape[1] if networks else 0) * 4
+    report = {
+        "documents": documents,
+        "networks": len(originals),
+        "dtype": args.dtype,
+        "rescore": args.rescore,
+        f"recall@{N_RESULTS}": round(hits / expected, 4) if expected else None,
+        "float32_bytes": full_bytes,
+        "dest_bytes": vector_bytes(args.dest),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
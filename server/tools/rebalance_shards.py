@@ -0,0 +1,139 @@
+"""
+Move users to the SQLite shard their UID hashes to under SQLITE_SHARD_COUNT.
+
+Every user's rows (networks, contents, profiles, change log, versions and
+vector outbox) live together on one shard. After changing the shard count,
+run this once with the server stopped: it scans every shard file on disk,
+including ones beyond the new count when shrinking, and moves each misplaced
+user in two steps. The user's rows are first copied into the target shard in
+one transaction, replacing any copy left by an interrupted run, and then
+deleted from the source. Rerunning after an interruption is safe.
+
+Vectors are untouched: they are keyed by content ID, not by shard.
+
+Usage (from the `server` directory):
+    SQLITE_SHARD_COUNT=4 python tools/rebalance_shards.py --dry-run
+    SQLITE_SHARD_COUNT=4 python tools/rebalance_shards.py
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+from typing import Dict, List
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+logger = logging.getLogger("rebalance_shards")
+
+
+def existing_shards() -> List[int]:
+    """Indexes of all shard files on disk plus those of the configured count."""
+    from database.db import SQLITE_DB_PATH, SQLITE_SHARD_COUNT
+
+    root, ext = os.path.splitext(SQLITE_DB_PATH)
+    found = {0} if os.path.exists(SQLITE_DB_PATH) else set()
+    pattern = re.compile(re.escape(root) + r"\.shard(\d+)" + re.escape(ext) + "$")
+    for path in glob.glob(f"{glob.escape(root)}.shard*{ext}"):
+        match = pattern.match(path)
+        if match:
+            found.add(int(match.group(1)))
+    return sorted(found | set(range(SQLITE_SHARD_COUNT)))
+
+
+def user_tables():
+    """Tables in foreign key order; all of them are partitioned by user_id."""
+    import models.network, models.content, models.network_profile  # noqa: F401
+    import models.change, models.data_version, models.vector_outbox  # noqa: F401
+    from database.db import Base
+
+    tables = Base.metadata.sorted_tables
+    missing = [t.name for t in tables if "user_id" not in t.c]
+    if missing:
+        raise RuntimeError(f"Tables without user_id cannot be sharded: {missing}")
+    return tables
+
+
+def users_of(engine, tables) -> List[str]:
+    from sqlalchemy import select, union
+
+    with engine.connect() as conn:
+        return sorted(conn.execute(union(*[select(t.c.user_id) for t in tables])).scalars())
+
+
+def move_user(user_id: str, source, target, tables) -> Dict[str, int]:
+    """Copy a user's rows to the target shard, then delete them from the source."""
+    from sqlalchemy import Integer, delete, insert, select
+
+    counts = {}
+    with source.connect() as src, target.begin() as dst:
+        # Clear a partial copy from an interrupted run, children first
+        for table in reversed(tables):
+            dst.execute(delete(table).where(table.c.user_id == user_id))
+        for table in tables:
+            # Integer surrogate keys are per shard; let the target assign new ones
+            columns = [c for c in table.c
+                       if not (c.primary_key and isinstance(c.type, Integer) and c.autoincrement is not False)]
+            rows = [dict(row) for row in src.execute(
+                select(*columns).where(table.c.user_id == user_id)).mappings()]
+            if rows:
+                dst.execute(insert(table), rows)
+            counts[table.name] = len(rows)
+    with source.begin() as src:
+        for table in reversed(tables):
+            src.execute(delete(table).where(table.c.user_id == user_id))
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Move users to their shard under SQLITE_SHARD_COUNT")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which users would move")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
+
+    from database.db import Base, SQLITE_SHARD_COUNT, add_missing_columns, create_shard_engine, shard_for, shard_path
+
+    tables = user_tables()
+    shards = existing_shards()
+    engines = {shard: create_shard_engine(shard_path(shard)) for shard in shards}
+    if not args.dry_run:
+        for shard in range(SQLITE_SHARD_COUNT):
+            Base.metadata.create_all(bind=engines[shard])
+        # Sources and targets must agree on the columns that are copied
+        for shard in shards:
+            if os.path.exists(shard_path(shard)):
+                add_missing_columns(engines[shard])
+
+    summary = {"shard_count": SQLITE_SHARD_COUNT, "moves": {}, "rows": {}}
+    for source in shards:
+        if not os.path.exists(shard_path(source)):
+            continue
+        for user_id in users_of(engines[source], tables):
+            target = shard_for(user_id, SQLITE_SHARD_COUNT)
+            if target == source:
+                continue
+            route = f"{source}->{target}"
+            summary["moves"][route] = summary["moves"].get(route, 0) + 1
+            if args.dry_run:
+                continue
+            for table, n in move_user(user_id, engines[source], engines[target], tables).items():
+                summary["rows"][table] = summary["rows"].get(table, 0) + n
+            logger.info(f"Moved user {user_id} from shard {source} to {target}")
+
+    # Shards beyond the new count are empty now and can be deleted by hand
+    summary["unused_files"] = [shard_path(s) for s in shards
+                               if s >= SQLITE_SHARD_COUNT and os.path.exists(shard_path(s))]
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Re-encrypt stored names, notes and profiles under a new key version while
+the service keeps running.
+
+Rows are read in primary-key order in batches, decrypted and re-encrypted
+across a process pool, and written back with conditional UPDATEs that only
+apply if the ciphertext is still the one that was read, so a concurrent
+edit is never overwritten (it already uses the current key version anyway).
+updated_at is kept as is and the writes bypass the ORM, so listing ETags,
+the sync change log and cached plaintext stay valid. Progress is
+checkpointed after every batch; rerunning resumes where it stopped.
+With SQLITE_SHARD_COUNT > 1 every shard is processed in turn.
+
+The server decrypts both versions throughout. Set ENCRYPTION_MASTER_KEY (and
+ENCRYPTION_KEY_VERSION=2) on the server before running this, so rows written
+during the rollout already use the new key.
+
+Usage (from the `server` directory):
+    python tools/reencrypt.py --workers 4 --batch-size 500
+    python tools/reencrypt.py --dry-run
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+logger = logging.getLogger("reencrypt")
+
+# Row = (primary key, user_id, ciphertext)
+Row = Tuple[str, str, str]
+
+
+def targets():
+    """table name -> (table, primary key column, ciphertext column)"""
+    from models.network import Network
+    from models.content import Content
+    from models.network_profile import NetworkProfile
+
+    return {
+        "networks": (Network.__table__, Network.__table__.c.nid, Network.__table__.c.name),
+        "contents": (Content.__table__, Content.__table__.c.cid, Content.__table__.c.content),
+        "network_profiles": (NetworkProfile.__table__, NetworkProfile.__table__.c.network_id,
+                             NetworkProfile.__table__.c.summary),
+    }
+
+
+def reencrypt_rows(rows: List[Row], version: int) -> List[Tuple[str, str, Optional[str]]]:
+    """Worker: (pk, old ciphertext, new ciphertext or None if it could not be decrypted)."""
+    from utils.encryption import reencrypt
+
+    results = []
+    for pk, user_id, ciphertext in rows:
+        try:
+            results.append((pk, ciphertext, reencrypt(ciphertext, user_id, version)))
+        except Exception:
+            results.append((pk, ciphertext, None))
+    return results
+
+
+def read_batches(name: str, shard: int, after: Optional[str], batch_size: int, version: int) -> Iterator[Tuple[str, List[Row], int]]:
+    """Yield (last primary key scanned, rows still needing re-encryption, rows scanned)."""
+    from sqlalchemy import select
+    from database.db import session_factories
+    from utils.encryption import key_version
+
+    table, pk, column = targets()[name]
+    while True:
+        query = select(pk, table.c.user_id, column).order_by(pk).limit(batch_size)
+        if after is not None:
+            query = query.where(pk > after)
+        # A short session per batch, so no read lock is held while the server writes
+        with session_factories[shard]() as db:
+            rows = db.execute(query).all()
+        if not rows:
+            return
+        after = str(rows[-1][0])
+        yield after, [(str(r[0]), r[1], r[2]) for r in rows if key_version(r[2]) != version], len(rows)
+
+
+def apply_batch(name: str, shard: int, results: List[Tuple[str, str, Optional[str]]]) -> Tuple[int, int]:
+    """Write re-encrypted values where the row is unchanged; returns (updated, conflicts)."""
+    from sqlalchemy import bindparam
+    from database.db import session_factories
+
+    table, pk, column = targets()[name]
+    params = [{"b_pk": row_pk, "b_old": old, "b_new": new}
+              for row_pk, old, new in results if new is not None and new != old]
+    if not params:
+        return 0, 0
+    stmt = table.update().where(
+        pk == bindparam("b_pk"), column == bindparam("b_old")
+    ).values({column.name: bindparam("b_new"), "updated_at": table.c.updated_at})
+    with session_factories[shard]() as db:
+        updated = db.execute(stmt, params).rowcount
+        db.commit()
+    return updated, len(params) - updated
+
+
+def load_checkpoint(path: str, version: int) -> dict:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("target_version") == version:
+            return checkpoint
+        logger.warning(f"Checkpoint {path} is for another key version, starting over")
+    except FileNotFoundError:
+        pass
+    return {"target_version": version, "tables": {}}
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+
+def run_table(name: str, shard: int, state: dict, pool: ProcessPoolExecutor, args, checkpoint: dict):
+    in_flight = deque()
+
+    def finish_oldest():
+        last_key, scanned, future = in_flight.popleft()
+        results = future.result()
+        updated, conflicts = apply_batch(name, shard, results)
+        state["scanned"] += scanned
+        state["updated"] += updated
+        state["conflicts"] += conflicts
+        state["failed"] += sum(new is None for _, _, new in results)
+        state["last_key"] = last_key
+        save_checkpoint(args.checkpoint, checkpoint)
+        if args.pause:
+            time.sleep(args.pause)  # Leave room for the server's own writes
+
+    for last_key, rows, scanned in read_batches(name, shard, state["last_key"], args.batch_size, args.version):
+        in_flight.append((last_key, scanned, pool.submit(reencrypt_rows, rows, args.version)))
+        # Bounded window: workers stay busy without reading the whole table ahead
+        if len(in_flight) >= args.workers * 2:
+            finish_oldest()
+        logger.info(f"{name} (shard {shard}): {state['scanned']} scanned, {state['updated']} re-encrypted")
+    while in_flight:
+        finish_oldest()
+    state["done"] = True
+    save_checkpoint(args.checkpoint, checkpoint)
+
+
+def count_pending(name: str, version: int, batch_size: int) -> Dict[str, int]:
+    from database.db import SQLITE_SHARD_COUNT
+
+    scanned = pending = 0
+    for shard in range(SQLITE_SHARD_COUNT):
+        for _, rows, batch_scanned in read_batches(name, shard, None, batch_size, version):
+            scanned += batch_scanned
+            pending += len(rows)
+    return {"scanned": scanned, "pending": pending}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-encrypt stored data under a new key version")
+    parser.add_argument("--version", type=int, default=2, choices=[1, 2], help="Target key version")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep after each batch")
+    parser.add_argument("--checkpoint", default="./database/reencrypt_checkpoint.json")
+    parser.add_argument("--tables", nargs="+", default=["networks", "contents", "network_profiles"])
+    parser.add_argument("--dry-run", action="store_true", help="Only count rows still to re-encrypt")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
+
+    from utils.encryption import ENCRYPTION_MASTER_KEY
+    from database.db import SQLITE_SHARD_COUNT
+    if args.version == 2 and not ENCRYPTION_MASTER_KEY:
+        parser.error("ENCRYPTION_MASTER_KEY must be set to re-encrypt to key version 2")
+
+    if args.dry_run:
+        print(json.dumps({name: count_pending(name, args.version, args.batch_size)
+                          for name in args.tables}, indent=2))
+        return 0
+
+    checkpoint = load_checkpoint(args.checkpoint, args.version)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for shard in range(SQLITE_SHARD_COUNT):
+            for name in args.tables:
+                # Shard 0 keeps the plain table name of an unsharded database
+                key = name if shard == 0 else f"{name}:shard{shard}"
+                state = checkpoint["tables"].setdefault(key, {
+                    "last_key": None, "done": False, "scanned": 0,
+                    "updated": 0, "conflicts": 0, "failed": 0})
+                if not state["done"]:
+                    run_table(name, shard, state, pool, args, checkpoint)
+    print(json.dumps(checkpoint, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
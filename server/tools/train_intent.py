@@ -0,0 +1,98 @@
+"""
+Train the local ask/save intent model used in front of determine_action_type.
+
+Reads JSON lines with "text" and "label" ("ask" or "save"), fits a logistic
+regression over hashed word n-grams with full-batch gradient descent,
+measures how often each rule agrees with the labels, and writes both where
+the server loads them (INTENT_MODEL_PATH).
+
+Labels can come from hand labeling or from logged LLM decisions; see
+tools/eval_intent.py for measuring the result against the LLM.
+
+Usage (from the `server` directory):
+    python tools/train_intent.py --data tools/intent_examples.jsonl --output ./database/intent_model.json
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+
+def read_examples(path: str) -> List[Tuple[str, str]]:
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("label") in ("ask", "save"):
+                    examples.append((record["text"], record["label"]))
+    return examples
+
+
+def fit(examples: List[Tuple[str, str]], n_features: int, epochs: int, learning_rate: float, l2: float):
+    from services.intent import IntentModel, hashed_features, rule_agreement
+
+    X = np.zeros((len(examples), n_features), dtype=np.float32)
+    for row, (text, _) in enumerate(examples):
+        X[row, hashed_features(text, n_features)] = 1.0
+    y = np.array([label == "save" for _, label in examples], dtype=np.float32)
+
+    weights = np.zeros(n_features, dtype=np.float64)
+    bias = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(X @ weights + bias)))
+        error = p - y
+        weights -= learning_rate * (X.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+
+    used = np.flatnonzero(X.any(axis=0))
+    rule_confidence = {name: stats["confidence"] for name, stats in rule_agreement(examples).items()}
+    return IntentModel({int(i): float(weights[i]) for i in used}, bias, n_features, rule_confidence)
+
+
+def main(argv=None) -> int:
+    from services.intent import INTENT_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("--data", default=os.path.join(SERVER_DIR, "tools", "intent_examples.jsonl"),
+                        help="JSON lines with text and label")
+    parser.add_argument("--output", default=INTENT_MODEL_PATH)
+    parser.add_argument("--features", type=int, default=2 ** 16, help="Hash buckets")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--learning-rate", type=float, default=2.0)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    args = parser.parse_args(argv)
+
+    examples = read_examples(args.data)
+    if not examples:
+        parser.error(f"no labeled examples in {args.data}")
+    model = fit(examples, args.features, args.epochs, args.learning_rate, args.l2)
+
+    correct = sum((model.probability(text) >= 0.5) == (label == "save") for text, label in examples)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(model.to_dict(), f)
+    print(json.dumps({
+        "examples": len(examples),
+        "save_fraction": round(sum(label == "save" for _, label in examples) / len(examples), 3),
+        "features_used": len(model.weights),
+        "training_accuracy": round(correct / len(examples), 4),
+        "rule_confidence": model.rule_confidence,
+        "output": args.output,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,30 @@
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from base64 import b64encode, b64decode
+from functools import lru_cache
 import os
+from dotenv import load_dotenv
+from core.metrics import timed
+
+load_dotenv()
+
+# Server secret that per-user keys are derived from (key version 2)
+ENCRYPTION_MASTER_KEY = os.getenv("ENCRYPTION_MASTER_KEY", "")
+# Key version used for new ciphertexts: 1 is the legacy padded-UID key, 2 needs the master key
+ENCRYPTION_KEY_VERSION = int(os.getenv(
+    "ENCRYPTION_KEY_VERSION", "2" if ENCRYPTION_MASTER_KEY else "1"))
+# Derived keys kept in memory, one per user
+ENCRYPTION_KEY_CACHE_SIZE = int(os.getenv("ENCRYPTION_KEY_CACHE_SIZE", "10000"))
+
+# Version 1 ciphertexts carry no prefix
+_V2_PREFIX = "v2:"
+_HKDF_SALT = b"hae-user-key"
+
+if ENCRYPTION_KEY_VERSION not in (1, 2):
+    raise ValueError(f"Unsupported ENCRYPTION_KEY_VERSION: {ENCRYPTION_KEY_VERSION}")
+if ENCRYPTION_KEY_VERSION == 2 and not ENCRYPTION_MASTER_KEY:
+    raise ValueError("ENCRYPTION_KEY_VERSION=2 requires ENCRYPTION_MASTER_KEY")
 
 
 def pad_key(key: str) -> bytes:
@@ -12,11 +35,29 @@ def pad_key(key: str) -> bytes:
     return bytes(result)
 
 
-def encrypt(data: str, user_token: str) -> str:
-    """Encrypt data using AES-GCM with the user's token as key."""
+@lru_cache(maxsize=ENCRYPTION_KEY_CACHE_SIZE)
+def derive_key(user_token: str) -> bytes:
+    """Per-user AES-256 key derived from the master key with HKDF-SHA256."""
+    if not ENCRYPTION_MASTER_KEY:
+        raise ValueError("ENCRYPTION_MASTER_KEY is not set")
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=_HKDF_SALT,
+        info=f"hae:v2:{user_token}".encode('utf-8'),
+    ).derive(ENCRYPTION_MASTER_KEY.encode('utf-8'))
+
+
+def key_version(encrypted_data: str) -> int:
+    """Key version a ciphertext was written with."""
+    return 2 if encrypted_data.startswith(_V2_PREFIX) else 1
+
+
+def encrypt(data: str, user_token: str, version: int = None) -> str:
+    """Encrypt data using AES-GCM with the user's key of the given (default: current) version."""
     try:
-        # Pad the key to 32 bytes
-        key = pad_key(user_token)
+        version = version or ENCRYPTION_KEY_VERSION
+        key = derive_key(user_token) if version == 2 else pad_key(user_token)
 
         # Generate a random 96-bit nonce
         nonce = os.urandom(12)
@@ -28,17 +69,21 @@ def encrypt(data: str, user_token: str) -> str:
         ciphertext = aesgcm.encrypt(nonce, data.encode('utf-8'), None)
 
         # Combine nonce and ciphertext and encode to base64
-        combined = nonce + ciphertext
-        return b64encode(combined).decode('utf-8')
+        combined = b64encode(nonce + ciphertext).decode('utf-8')
+        return _V2_PREFIX + combined if version == 2 else combined
     except Exception as e:
         raise Exception(f"Encryption error: {str(e)}")
 
 
+@timed("decrypt")
 def decrypt(encrypted_data: str, user_token: str) -> str:
-    """Decrypt data using AES-GCM with the user's token as key."""
+    """Decrypt data using AES-GCM with the user's key of the ciphertext's version."""
     try:
-        # Pad the key to 32 bytes
-        key = pad_key(user_token)
+        if encrypted_data.startswith(_V2_PREFIX):
+            key = derive_key(user_token)
+            encrypted_data = encrypted_data[len(_V2_PREFIX):]
+        else:
+            key = pad_key(user_token)
 
         # Decode the base64 data
         combined = b64decode(encrypted_data)
@@ -55,3 +100,11 @@ def decrypt(encrypted_data: str, user_token: str) -> str:
         return plaintext.decode('utf-8')
     except Exception as e:
         raise Exception(f"Decryption error: {str(e)}")
+
+
+def reencrypt(encrypted_data: str, user_token: str, version: int = None) -> str:
+    """Re-encrypt a ciphertext under another key version; unchanged if already there."""
+    version = version or ENCRYPTION_KEY_VERSION
+    if key_version(encrypted_data) == version:
+        return encrypted_data
+    return encrypt(decrypt(encrypted_data, user_token), user_token, version)
@@ -0,0 +1,162 @@
+"""
+Time ranges in natural-language questions ("last month", "in March",
+"3 weeks ago") for filtering notes by creation time.
+
+Notes are stored with naive wall-clock timestamps, so ranges are computed in
+the asker's local time and returned naive, and epoch values are taken from
+the wall-clock reading (see to_timestamp).
+"""
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import NamedTuple, Optional, Tuple
+
+_MONTHS = {name: i for i, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], start=1)}
+_MONTH_PATTERN = "|".join(_MONTHS) + "|" + "|".join(
+    name[:3] for name in _MONTHS if name != "may") + "|sept"
+
+_NUMBERS = {"a": 1, "an": 1, "one": 1, "two": 2, "couple of": 2, "a couple of": 2,
+            "three": 3, "few": 3, "a few": 3, "four": 4, "five": 5, "six": 6,
+            "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12}
+_NUMBER_PATTERN = r"\d{1,3}|" + "|".join(sorted(_NUMBERS, key=len, reverse=True))
+_UNIT_PATTERN = r"(day|week|month|year)s?"
+
+_RELATIVE = re.compile(r"\b(today|yesterday|(this|last|past|previous) (week|month|year))\b")
+_LAST_N = re.compile(rf"\b(?:last|past|previous) ({_NUMBER_PATTERN}) {_UNIT_PATTERN}\b")
+_AGO = re.compile(rf"\b({_NUMBER_PATTERN}) {_UNIT_PATTERN} ago\b")
+_MONTH = re.compile(rf"\b(in|during|since|last|this)? ?({_MONTH_PATTERN})\.?(?:,? (\d{{4}}))?\b")
+_YEAR = re.compile(r"\b(in|during|since) (\d{4})\b")
+
+# Four-digit numbers outside [_MIN_YEAR, next year] are not years worth filtering by
+_MIN_YEAR = 1900
+
+
+class TimeRange(NamedTuple):
+    """Half-open [start, end) range of naive local datetimes."""
+    start: datetime
+    end: datetime
+
+    def timestamps(self) -> Tuple[float, float]:
+        return to_timestamp(self.start), to_timestamp(self.end)
+
+
+def to_timestamp(value: datetime) -> float:
+    """
+    Epoch seconds of a datetime's wall-clock reading, ignoring any offset.
+    SQLite keeps created_at without its offset, so this is the value that
+    orders consistently with the SQL column.
+    """
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _year(text: str, today: date) -> Optional[int]:
+    year = int(text)
+    return year if _MIN_YEAR <= year <= today.year + 1 else None
+
+
+def _span(start: date, end: date) -> TimeRange:
+    return TimeRange(datetime.combine(start, time()), datetime.combine(end, time()))
+
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBERS[text]
+
+
+# Rolling lengths for "past 3 months", "2 years ago" and the like
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def _shift(day: date, unit: str, n: int) -> date:
+    return day - timedelta(days=_UNIT_DAYS[unit] * n)
+
+
+def _unit_start(day: date, unit: str) -> date:
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    if unit == "month":
+        return day.replace(day=1)
+    if unit == "year":
+        return date(day.year, 1, 1)
+    return day
+
+
+def _relative(match: re.Match, today: date, tomorrow: date) -> TimeRange:
+    if match.group(1) == "today":
+        return _span(today, tomorrow)
+    if match.group(1) == "yesterday":
+        return _span(today - timedelta(days=1), today)
+    which, unit = match.group(2), match.group(3)
+    start = _unit_start(today, unit)
+    if which == "this":
+        return _span(start, tomorrow)
+    if which == "past":
+        # "the past month" is a rolling window, "last month" the calendar one
+        return _span(_shift(today, unit, 1), tomorrow)
+    if unit == "week":
+        return _span(start - timedelta(weeks=1), start)
+    if unit == "month":
+        return _span(_add_months(start, -1), start)
+    return _span(date(today.year - 1, 1, 1), start)
+
+
+def _month(match: re.Match, today: date, tomorrow: date) -> Optional[TimeRange]:
+    word, name, year = match.group(1), match.group(2), match.group(3)
+    if not word and not year:
+        return None  # A bare "may" or "march" is too ambiguous
+    if name == "may" and word == "this" and not year:
+        return None  # "this may upset him" names no month
+    month = _MONTHS.get(name) or next(m for full, m in _MONTHS.items() if full.startswith(name))
+    if year:
+        year = _year(year, today)
+        if year is None:
+            return None
+        start = date(year, month, 1)
+    elif word == "this":
+        start = date(today.year, month, 1)
+    else:
+        # The most recent such month, this year's if it has started
+        start = date(today.year if month <= today.month else today.year - 1, month, 1)
+        if word == "last" and month == today.month:
+            start = date(today.year - 1, month, 1)
+    if word == "since":
+        return _span(start, tomorrow)
+    return _span(start, _add_months(start, 1))
+
+
+def parse_time_range(text: str, now: datetime) -> Optional[TimeRange]:
+    """
+    The time range a question is scoped to, or None if it names none.
+    `now` is the asker's current local time.
+    """
+    text = " ".join(text.lower().split())
+    today = now.date()
+    tomorrow = today + timedelta(days=1)
+
+    match = _LAST_N.search(text)
+    if match:
+        return _span(_shift(today, match.group(2), _number(match.group(1))), tomorrow)
+    match = _AGO.search(text)
+    if match:
+        unit = match.group(2)
+        start = _shift(today, unit, _number(match.group(1)))
+        return _span(start, min(_shift(start, unit, -1), tomorrow))
+    match = _RELATIVE.search(text)
+    if match:
+        return _relative(match, today, tomorrow)
+    for match in _MONTH.finditer(text):
+        time_range = _month(match, today, tomorrow)
+        if time_range:
+            return time_range
+    for match in _YEAR.finditer(text):
+        year = _year(match.group(2), today)
+        if year is None:
+            continue
+        start = date(year, 1, 1)
+        return _span(start, tomorrow if match.group(1) == "since" else date(start.year + 1, 1, 1))
+    return None